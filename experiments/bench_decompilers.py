@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmark: all PAC decompiler implementations side by side
+
+Runs every decompiler in pac/ over the same inputs, stage by stage:
+- load        read the PAC file
+- extract     domain count map, d_ipaddr and special
+- decompress  LZP data and mask, then the domain groups
+
+Inputs are pac.pac plus synthetic PAC files with the domain list scaled
+(regenerated with pac_encoder). Each (implementation, input) pair runs in
+a child process, so a crash or import error is recorded instead of ending
+the run, and the process peak RSS belongs to that implementation alone.
+Stages run twice: once for wall time, once under tracemalloc for the peak
+of Python allocations.
+
+Every stage output is normalized (dotted IPs, CIDR strings, expanded domain
+groups) and checksummed. pac_decompiler_refined is the reference: its output
+matches the JavaScript FindProxyForURL (experiments/test_pac_rule_engine.py),
+so a matching checksum means a correct stage. For decompress, the share of
+domain groups equal to the reference is reported as well.
+
+Usage:
+    python3 experiments/bench_decompilers.py [pac_file] [-o report.json]
+    python3 experiments/bench_decompilers.py --scales 0.5,2,4 --baseline old.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+STAGES = ('load', 'extract', 'decompress')
+REFERENCE = 'pac_decompiler_refined'
+
+
+class Implementation(NamedTuple):
+    module: str
+    class_name: str
+    stages: Dict[str, Tuple[str, ...]]     # stage -> decompiler methods, in order
+    structure_attr: str                    # {zone: {length: count}} after extract
+    ip_attr: str
+    cidr_attr: str
+    compressed_groups: bool                # groups still need patternexpand
+
+
+_LEGACY_STAGES = {
+    'load': ('load_pac_file',),
+    'extract': ('extract_domains', 'extract_ip_list', 'extract_special_cidrs'),
+    'decompress': ('extract_lzp_data', 'decompress_all_domains'),
+}
+_CURRENT_STAGES = {
+    'load': ('load_pac_file',),
+    'extract': ('extract_domains_structure', 'extract_ip_addresses', 'extract_special_cidrs'),
+    'decompress': ('extract_lzp_data', 'decompress_domains'),
+}
+
+IMPLEMENTATIONS = {
+    'lzp_decompiler': Implementation(
+        'lzp_decompiler', 'CompletePACDecompiler', _LEGACY_STAGES,
+        'domains', 'd_ipaddr', 'special', True),
+    'lzp_decompiler_final': Implementation(
+        'lzp_decompiler_final', 'FinalPACDecompiler',
+        dict(_LEGACY_STAGES, decompress=('extract_lzp_data', 'decompress_all_domains_improved')),
+        'domains', 'd_ipaddr', 'special', True),
+    'lzp_decompiler_fixed': Implementation(
+        'lzp_decompiler_fixed', 'CompletePACDecompiler', _LEGACY_STAGES,
+        'domains', 'd_ipaddr', 'special', True),
+    'pac_decompiler_fixed': Implementation(
+        'pac_decompiler_fixed', 'FixedPACDecompiler', _CURRENT_STAGES,
+        'domains', 'd_ipaddr_decoded', 'special_cidrs', False),
+    'pac_decompiler_refined': Implementation(
+        'pac_decompiler_refined', 'RefinedPACDecompiler', _CURRENT_STAGES,
+        'domains_structure', 'd_ipaddr_decoded', 'special_cidrs', False),
+    # extract_lzp_data() also decompresses
+    'pac_decompiler_advanced': Implementation(
+        'pac_decompiler_advanced', 'AdvancedPACDecompiler',
+        dict(_LEGACY_STAGES, decompress=('extract_lzp_data',)),
+        'domains', 'd_ipaddr', 'special', True),
+}
+
+
+def checksum(value: Any) -> str:
+    """Short SHA-256 of a JSON-serializable value"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def _normalize_cidr(cidr: Any) -> str:
+    if isinstance(cidr, dict):
+        return f"{cidr.get('ip')}/{cidr.get('cidr_bits')}"
+    if isinstance(cidr, (list, tuple)) and len(cidr) == 2:
+        return f"{cidr[0]}/{cidr[1]}"
+    return str(cidr)
+
+
+def stage_output(impl: Implementation, decompiler: Any, stage: str) -> Any:
+    """Implementation-independent view of what a stage produced"""
+    if stage == 'load':
+        return decompiler.pac_content
+    if stage == 'extract':
+        structure = getattr(decompiler, impl.structure_attr, {}) or {}
+        return {
+            'structure': {zone: {str(length): count for length, count in lengths.items()}
+                          for zone, lengths in structure.items() if isinstance(lengths, dict)},
+            'ips': [str(ip) for ip in getattr(decompiler, impl.ip_attr, [])],
+            'cidrs': [_normalize_cidr(cidr) for cidr in getattr(decompiler, impl.cidr_attr, [])],
+        }
+    return group_outputs(impl, decompiler)
+
+
+def group_outputs(impl: Implementation, decompiler: Any) -> Dict[str, str]:
+    """'zone/length' -> expanded group data after decompress"""
+    from pac_decompiler_refined import expand_patterns
+
+    groups = {}
+    for zone, lengths in (decompiler.domains or {}).items():
+        if not isinstance(lengths, dict):
+            continue
+        for length, data in lengths.items():
+            data = str(data)
+            groups[f"{zone}/{length}"] = expand_patterns(data) if impl.compressed_groups else data
+    return groups
+
+
+def peak_rss_kb() -> int:
+    """
+    Peak resident set size of this process in KiB
+    ru_maxrss survives exec() on Linux and would report the parent's peak,
+    so VmHWM is preferred where /proc exists.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_worker(name: str, pac_file: str) -> Dict[str, Any]:
+    """Runs one implementation on one input (inside the child process)"""
+    import importlib
+
+    impl = IMPLEMENTATIONS[name]
+    result: Dict[str, Any] = {'status': 'ok', 'stages': {}}
+    try:
+        cls = getattr(importlib.import_module(impl.module), impl.class_name)
+    except Exception as e:
+        return {'status': 'error', 'error': f"import: {type(e).__name__}: {e}", 'stages': {}}
+
+    # Pass 1: wall time and outputs
+    decompiler = cls(pac_file)
+    groups = {}
+    try:
+        for stage in STAGES:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for method in impl.stages[stage]:
+                    getattr(decompiler, method)()
+            elapsed = time.perf_counter() - start
+            output = stage_output(impl, decompiler, stage)
+            result['stages'][stage] = {'seconds': round(elapsed, 6), 'checksum': checksum(output)}
+            if stage == 'decompress':
+                groups = {key: checksum(value) for key, value in output.items()}
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{stage}: {type(e).__name__}: {e}"
+
+    # Pass 2: peak Python allocations per stage
+    decompiler = cls(pac_file)
+    tracemalloc.start()
+    try:
+        for stage in list(result['stages']):
+            tracemalloc.reset_peak()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for method in impl.stages[stage]:
+                    getattr(decompiler, method)()
+            result['stages'][stage]['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    except Exception:
+        pass
+    finally:
+        tracemalloc.stop()
+
+    result['max_rss_kb'] = peak_rss_kb()
+    result['groups'] = groups
+    return result
+
+
+def run_child(name: str, pac_file: str, timeout: float) -> Dict[str, Any]:
+    """Runs run_worker() in a fresh interpreter"""
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', name, pac_file],
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'status': 'error', 'error': f"timeout after {timeout:.0f}s", 'stages': {}}
+    if proc.returncode != 0 or not proc.stdout.strip():
+        lines = proc.stderr.strip().splitlines() or [f"exit code {proc.returncode}"]
+        return {'status': 'error', 'error': lines[-1], 'stages': {}}
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def make_inputs(pac_file: str, scales: List[float], tmp: str) -> List[Dict[str, Any]]:
+    """pac_file itself plus re-encoded copies with the domain list scaled"""
+    from pac_encoder import build_pac
+    from pac_snapshot import open_engine
+
+    engine = open_engine(pac_file)
+    domains = sorted(f"{engine.patterns.expand(record)}.{zone}"
+                     for (zone, _), records in engine.groups.items() for record in records)
+    inputs = [{'name': os.path.basename(pac_file), 'path': pac_file, 'domains': len(domains)}]
+
+    with open(pac_file, 'r', encoding='utf-8') as f:
+        template = f.read()
+    for scale in scales:
+        if scale == 1:
+            continue
+        if scale < 1:
+            scaled = domains[::max(1, round(1 / scale))]
+        else:
+            # Extra copies with a numbered label in front: same zones, new names
+            scaled = list(domains)
+            for copy in range(1, int(scale)):
+                scaled += [f"{copy}{domain}" for domain in domains]
+        path = os.path.join(tmp, f"synthetic-x{scale:g}.pac")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(build_pac(template, scaled))
+        inputs.append({'name': f"synthetic-x{scale:g}", 'path': path, 'domains': len(scaled)})
+
+    for item in inputs:
+        item['bytes'] = os.path.getsize(item['path'])
+    return inputs
+
+
+def compare_to_reference(results: List[Dict[str, Any]]) -> None:
+    """Adds matches_reference per stage and group accuracy, in place"""
+    reference = {r['input']: r for r in results if r['implementation'] == REFERENCE}
+    for result in results:
+        ref = reference.get(result['input'])
+        groups = result.pop('groups', None) or {}
+        if ref is None or ref['status'] != 'ok':
+            continue
+        for stage, data in result['stages'].items():
+            data['matches_reference'] = data['checksum'] == ref['stages'][stage]['checksum']
+        ref_groups = ref.get('ref_groups', {})
+        result['groups_total'] = len(ref_groups)
+        result['groups_matching'] = sum(1 for key, value in groups.items()
+                                        if ref_groups.get(key) == value)
+
+
+def print_table(results: List[Dict[str, Any]], baseline: Dict[Tuple[str, str], float]) -> None:
+    print(f"{'implementation':<26} {'input':<20} " +
+          ' '.join(f"{stage:>11}" for stage in STAGES) +
+          f" {'peak MB':>8} {'RSS MB':>7} {'groups ok':>10}")
+    for result in results:
+        name = f"{result['implementation']:<26} {result['input']:<20}"
+        if result['status'] != 'ok':
+            print(f"{name} ✗ {result['error']}")
+            continue
+        cells = []
+        for stage in STAGES:
+            data = result['stages'].get(stage)
+            if data is None:
+                cells.append(f"{'-':>11}")
+                continue
+            mark = '✓' if data.get('matches_reference') else '✗'
+            cells.append(f"{data['seconds'] * 1000:>8.1f}ms{mark}")
+        peak = max((d.get('peak_bytes', 0) for d in result['stages'].values()), default=0)
+        groups = (f"{result['groups_matching']}/{result['groups_total']}"
+                  if 'groups_total' in result else '-')
+        line = (f"{name} {' '.join(cells)} {peak / 1e6:>8.1f} "
+                f"{result['max_rss_kb'] / 1024:>7.1f} {groups:>10}")
+
+        previous = baseline.get((result['implementation'], result['input']))
+        if previous:
+            total = sum(d['seconds'] for d in result['stages'].values())
+            line += f"  {total / previous:.2f}x vs baseline"
+        print(line)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark all PAC decompiler implementations")
+    parser.add_argument('pac_file', nargs='?', default=os.path.join(PAC_DIR, 'pac.pac'))
+    default_output = os.path.join(tempfile.gettempdir(), 'decompiler_bench.json')
+    parser.add_argument('-o', '--output', default=default_output,
+                        help=f"JSON report (default: {default_output})")
+    parser.add_argument('--scales', default='0.5,2',
+                        help="domain list scales for synthetic inputs (default: 0.5,2)")
+    parser.add_argument('--only', help="comma-separated implementations to run")
+    parser.add_argument('--baseline', help="earlier JSON report to compare total times against")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds per run (default: 600)")
+    parser.add_argument('--worker', nargs=2, metavar=('IMPLEMENTATION', 'PAC_FILE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(*args.worker)))
+        return
+
+    names = args.only.split(',') if args.only else list(IMPLEMENTATIONS)
+    if REFERENCE not in names:
+        names.append(REFERENCE)
+    scales = [float(scale) for scale in args.scales.split(',') if scale]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = make_inputs(args.pac_file, scales, tmp)
+        for item in inputs:
+            print(f"✓ {item['name']}: {item['domains']:,} domains, {item['bytes']:,} bytes",
+                  file=sys.stderr)
+            for name in names:
+                result = run_child(name, item['path'], args.timeout)
+                result.update(implementation=name, input=item['name'])
+                if name == REFERENCE:
+                    result['ref_groups'] = result.get('groups', {})
+                results.append(result)
+    compare_to_reference(results)
+    for result in results:
+        result.pop('ref_groups', None)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            for old in json.load(f)['results']:
+                if old['status'] == 'ok':
+                    baseline[(old['implementation'], old['input'])] = sum(
+                        d['seconds'] for d in old['stages'].values())
+    print_table(results, baseline)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'reference': REFERENCE,
+        'inputs': [{key: item[key] for key in ('name', 'domains', 'bytes')} for item in inputs],
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"✓ Report written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LZP encoder throughput and compression ratio
+
+Re-encodes the domain, d_ipaddr and special data of a PAC file, then
+reports encode/decode throughput, the LZP compression ratio and the size
+of the regenerated PAC against a size limit (1 MiB by default).
+
+Usage:
+    python3 experiments/bench_lzp_encoder.py [pac_file] [limit_bytes]
+"""
+
+import os
+import sys
+import time
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import LZPDecompressor, RefinedPACDecompiler, expand_patterns
+from pac_encoder import LZPEncoder, b2a, build_pac, group_domains
+from pac_lzp import CursorLZPDecoder
+from pac_rule_engine import PacRuleEngine
+
+
+def main():
+    pac_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PAC_DIR, 'pac.pac')
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 20
+
+    engine = PacRuleEngine.from_pac_file(pac_file)
+    decompiler = RefinedPACDecompiler(pac_file, verbose=False)
+    decompiler.decompile(decompress=False)
+    domains = [f"{expand_patterns(record)}.{zone}"
+               for (zone, _), records in engine.groups.items() for record in records]
+    cidrs = [f"{cidr['ip']}/{cidr['cidr_bits']}" for cidr in decompiler.special_cidrs]
+
+    start = time.perf_counter()
+    groups = group_domains(domains)
+    stream = b''.join(''.join(records).encode('latin-1')
+                      for lengths in groups.values() for records in lengths.values())
+    group_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoder = LZPEncoder()
+    encoder.write(stream)
+    data, mask = encoder.finish()
+    encode_time = time.perf_counter() - start
+    mask_text = b2a(mask)
+
+    start = time.perf_counter()
+    decoded = CursorLZPDecoder(data, LZPDecompressor().a2b(mask_text)).read(len(stream))
+    decode_time = time.perf_counter() - start
+    assert decoded == stream, "round trip failed"
+
+    with open(pac_file, 'r', encoding='utf-8') as f:
+        template = f.read()
+    start = time.perf_counter()
+    content = build_pac(template, domains, engine.ip_index.to_dotted(), cidrs)
+    build_time = time.perf_counter() - start
+
+    megabytes = len(stream) / 1e6
+    compressed = len(data) + len(mask_text)
+    print(f"{len(domains):,} domains, {len(stream):,} byte record stream")
+    print(f"  group + patternreplace: {group_time * 1000:8.1f} ms")
+    print(f"  LZP encode:             {encode_time * 1000:8.1f} ms ({megabytes / encode_time:.2f} MB/s)")
+    print(f"  LZP decode:             {decode_time * 1000:8.1f} ms ({megabytes / decode_time:.2f} MB/s)")
+    print(f"  build_pac total:        {build_time * 1000:8.1f} ms")
+    print(f"  domains_lzp {len(data):,} + mask_lzp {len(mask_text):,} characters: "
+          f"ratio {len(stream) / compressed:.2f}x")
+
+    size = len(content.encode('utf-8'))
+    status = "✓" if size <= limit else "✗"
+    print(f"{status} PAC size {size:,} bytes (upstream {os.path.getsize(pac_file):,}, "
+          f"limit {limit:,}, headroom {limit - size:,})")
+
+
+if __name__ == "__main__":
+    main()
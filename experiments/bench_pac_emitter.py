@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upstream vs emitted FindProxyForURL under Node.js
+
+Emits the optimized PAC for a PAC file, then times script load (including
+the first call, which decodes the upstream file) and the average
+FindProxyForURL call on listed, www/subdomain and unlisted hosts.
+dnsResolve fails for every host, as on a client without DNS.
+
+Usage:
+    python3 experiments/bench_pac_emitter.py [pac_file] [rounds]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_emitter import emit_pac
+from pac_snapshot import open_engine
+
+NODE_BENCH = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [hostsFile, rounds, ...files] = process.argv.slice(2);
+const hosts = fs.readFileSync(hostsFile, 'utf8').split('\n').filter(Boolean);
+for (const file of files) {
+  const ctx = {dnsResolve: () => null, isInNet: () => false};
+  vm.createContext(ctx);
+  let start = process.hrtime.bigint();
+  vm.runInContext(fs.readFileSync(file, 'utf8'), ctx);
+  ctx.FindProxyForURL('http://example.com/', 'example.com');
+  const load = Number(process.hrtime.bigint() - start) / 1e6;
+  start = process.hrtime.bigint();
+  for (let r = 0; r < +rounds; r++)
+    for (const h of hosts) ctx.FindProxyForURL('http://' + h + '/', h);
+  const call = Number(process.hrtime.bigint() - start) / 1e3 / (+rounds * hosts.length);
+  console.log(`${file.split('/').pop().padEnd(12)} load ${load.toFixed(1).padStart(8)} ms, ` +
+              `${call.toFixed(2).padStart(8)} us per call, ${fs.statSync(file).size} bytes`);
+}
+"""
+
+
+def main():
+    pac_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PAC_DIR, 'pac.pac')
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    if shutil.which('node') is None:
+        print("✗ Node.js is required")
+        sys.exit(1)
+
+    engine = open_engine(pac_file)
+    hosts = []
+    for (zone, _), records in engine.groups.items():
+        for record in list(records)[:5]:
+            name = engine.patterns.expand(record) + '.' + zone
+            hosts.extend([name, 'www.' + name, 'cdn.' + name, f"not-{len(hosts)}.{zone}"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fast_pac = os.path.join(tmp, 'fast.pac')
+        with open(fast_pac, 'w', encoding='utf-8') as f:
+            f.write(emit_pac(engine))
+        hosts_file = os.path.join(tmp, 'hosts.txt')
+        with open(hosts_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(hosts))
+        bench_js = os.path.join(tmp, 'bench.js')
+        with open(bench_js, 'w', encoding='utf-8') as f:
+            f.write(NODE_BENCH)
+
+        print(f"{len(hosts):,} hosts x {rounds} rounds")
+        subprocess.run(['node', bench_js, hosts_file, str(rounds), pac_file, fast_pac], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential str.replace patternexpand vs single-pass expand_patterns
+
+Expands every domain group of a PAC file with both implementations and
+prints the best of several runs.
+
+Usage:
+    python3 experiments/bench_patternexpand.py [pac_file] [repeat]
+"""
+
+import os
+import sys
+import time
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import DOMAIN_PATTERNS, expand_patterns
+from pac_stream import iter_domain_groups
+
+
+def sequential_expand(s):
+    for key, value in DOMAIN_PATTERNS:
+        s = s.replace(key, value)
+    return s
+
+
+def best_time(function, groups, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for group in groups:
+            function(group)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    pac_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PAC_DIR, 'pac.pac')
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    groups = [raw.decode('latin-1') for _, _, raw in iter_domain_groups(pac_file)]
+    total = sum(len(group) for group in groups)
+    print(f"{len(groups)} groups, {total:,} characters, best of {repeat}")
+
+    sequential = best_time(sequential_expand, groups, repeat)
+    single_pass = best_time(expand_patterns, groups, repeat)
+    print(f"  sequential str.replace: {sequential * 1000:8.1f} ms")
+    print(f"  single-pass expand:     {single_pass * 1000:8.1f} ms")
+    print(f"  speedup: {sequential / single_pass:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the Bloom filter domain group backend
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_bloom import (BloomGroups, false_positive_rate, filter_size, footprint,
+                       open_bloom_engine)
+from pac_rule_engine import blocked_domains
+from pac_snapshot import ensure_snapshot, load_snapshot
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    assert ensure_snapshot(PAC_FILE) is not None
+    return load_snapshot(PAC_FILE)
+
+
+def test_filter_size():
+    assert filter_size(0, 0.01) == (0, 0)
+    bits, hashes = filter_size(1000, 0.001)
+    assert hashes == 10 and 14000 <= bits <= 14400 and bits % 8 == 0
+    # Beyond 16 hashes the filter grows instead
+    bits, hashes = filter_size(1000, 1e-7)
+    assert hashes == 16 and bits > filter_size(1000, 1e-6)[0]
+    with pytest.raises(ValueError):
+        filter_size(10, 1.0)
+
+
+@pytest.mark.parametrize('fp_rate', [0.01, 0.001])
+def test_no_false_negatives_and_rate(snapshot, fp_rate):
+    bloom = BloomGroups.from_groups(snapshot.groups, fp_rate)
+    for key, table in snapshot.groups.items():
+        group = bloom[key]
+        assert len(group) == len(table)
+        assert all(record in group for record in table)
+        assert 'x' * (key[1] + 1) not in group
+
+    exact = {key: frozenset(table) for key, table in snapshot.groups.items()}
+    measured = false_positive_rate(bloom, exact, probes=50000)
+    assert measured < 2 * fp_rate
+
+    bloom_heap, _ = footprint(bloom)
+    exact_heap, _ = footprint(exact)
+    assert bloom_heap * 10 < exact_heap
+
+
+def test_confirmed_engine_is_exact(snapshot):
+    engine = open_bloom_engine(PAC_FILE, fp_rate=0.05, confirm=True)
+    assert isinstance(engine.groups, BloomGroups)
+    rng = random.Random(8)
+    hosts = rng.sample(blocked_domains(snapshot), 3000)
+    hosts += [f"{rng.getrandbits(40):x}.{host}" for host in hosts[:1000]]
+    hosts += [f"x{rng.getrandbits(40):x}.{host.rpartition('.')[2]}" for host in hosts[:3000]]
+    assert [engine.classify(host) for host in hosts] == [snapshot.classify(host) for host in hosts]
+
+    _, mapped = footprint(engine.groups)
+    assert mapped == sum(len(table) * table.width for table in snapshot.groups.values())
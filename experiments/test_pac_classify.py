@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming batch hostname classifier CLI
+"""
+
+import os
+import subprocess
+import sys
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_classify import extract_host, iter_chunks
+
+HOSTS = [
+    'twitter.com',
+    'https://www.facebook.com/some/page',
+    'localhost',
+    'http://example.invalid:8080/',
+    '',
+    'http://[::1',
+    'RuTracker.ORG',
+]
+
+
+def test_extract_host():
+    assert extract_host('https://www.facebook.com/page?q=1\n') == 'www.facebook.com'
+    assert extract_host('http://Example.COM:8080/') == 'example.com'
+    assert extract_host('  rutracker.org \n') == 'rutracker.org'
+    assert extract_host('RuTracker.ORG') == extract_host('http://RuTracker.ORG/') == 'rutracker.org'
+    assert extract_host('http://[::1/') is None
+    assert extract_host('\n') == ''
+
+
+def test_iter_chunks():
+    chunks = list(iter_chunks(iter(range(7)), 3))
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def run_cli(*args):
+    return subprocess.run(
+        [sys.executable, os.path.join(PAC_DIR, 'pac_classify.py'),
+         os.path.join(PAC_DIR, 'pac.pac'), *args],
+        input='\n'.join(HOSTS) + '\n', capture_output=True, text=True, check=True,
+    )
+
+
+def test_cli_streams_in_order():
+    single = run_cli('-j', '1')
+    pooled = run_cli('-j', '2', '--chunk-size', '2')
+
+    assert single.stdout == pooled.stdout
+    assert single.stdout.splitlines() == [
+        'twitter.com\tFBTW',
+        'www.facebook.com\tFBTW',
+        'localhost\tDIRECT',
+        'example.invalid\tDIRECT',
+        'rutracker.org\tPROXY',
+    ]
+    for result in (single, pooled):
+        # Blank and malformed lines are not counted as classified
+        assert 'Classified 5 hosts' in result.stderr
+        assert 'Skipped 1 malformed URLs' in result.stderr
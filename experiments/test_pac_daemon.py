@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the Unix socket classification daemon
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_classify import extract_host
+from pac_daemon import MAX_LINE, ClassifyDaemon, query, remove_stale_socket
+from pac_rule_engine import PacRuleEngine, blocked_domains
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PacRuleEngine.from_pac_file(PAC_FILE)
+
+
+@pytest.fixture
+def daemon(engine, tmp_path):
+    """Daemon serving on a socket in tmp_path from a background event loop"""
+    daemon = ClassifyDaemon(engine, cache_size=1000)
+    path = str(tmp_path / 'pac.sock')
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(daemon.serve(path, stop=stop),), daemon=True)
+    thread.start()
+    for _ in range(500):
+        if os.path.exists(path):
+            break
+        threading.Event().wait(0.01)
+    daemon.path = path
+    yield daemon
+    loop.call_soon_threadsafe(stop.set)
+    thread.join(5)
+    loop.close()
+    assert not os.path.exists(path)
+
+
+def test_verdicts_match_engine(daemon, engine):
+    rng = random.Random(4)
+    hosts = rng.sample(blocked_domains(engine), 2000)
+    hosts += ['www.' + host for host in hosts[:500]] + ['cdn1.' + host for host in hosts[:500]]
+    hosts += ['example.com', 'localhost', '10.0.0.1', ''] + sorted(engine.fbtw)[:5]
+    hosts += [f"https://{host}/path" for host in hosts[:100]]
+    rng.shuffle(hosts)
+    # Large enough that request and response buffers fill up at the same time
+    hosts = hosts * 20
+
+    verdicts = query(daemon.path, hosts)
+    assert verdicts == [engine.classify(extract_host(host)) for host in hosts]
+
+
+def test_pipelining_and_stats(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(daemon.path)
+        sock.sendall(b'example.com\nrutracker.org\nexample.com\n!stats\nlast.example.com')
+        sock.shutdown(socket.SHUT_WR)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    lines = response.decode('utf-8').splitlines()
+    assert lines[:3] == ['example.com\tDIRECT', 'rutracker.org\tPROXY', 'example.com\tDIRECT']
+    assert lines[4] == 'last.example.com\tDIRECT'
+    stats = json.loads(lines[3])
+    assert stats['requests'] == 3
+    assert stats['host_cache'] == {'hits': 1, 'misses': 2, 'size': 2, 'max_size': 1000}
+    # last.example.com reuses the cached example.com shost
+    assert daemon.stats()['shost_cache']['hits'] == 1
+
+
+def test_malformed_line_keeps_connection(daemon):
+    # urlsplit raises on an unclosed IPv6 bracket
+    hosts = ['RuTracker.ORG', 'http://[::1', 'example.com']
+    assert query(daemon.path, hosts) == ['PROXY', 'ERROR', 'DIRECT']
+    assert daemon.stats()['errors'] == 1
+
+
+def test_overlong_line_answers_complete_lines_first(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(daemon.path)
+        # One write, so the complete lines and the overlong tail arrive in the same read
+        sock.sendall(b'rutracker.org\nexample.com\n' + b'a' * (MAX_LINE + 1))
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    assert response.decode('utf-8').splitlines() == ['rutracker.org\tPROXY', 'example.com\tDIRECT']
+    assert daemon.stats()['requests'] == 2
+
+
+def test_counters_across_threads(engine):
+    daemon = ClassifyDaemon(engine, cache_size=1000)
+    threads = [threading.Thread(target=lambda: [daemon.answer([b'example.com', b'http://[::1'])
+                                               for _ in range(500)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = daemon.stats()
+    assert (stats['requests'], stats['errors'], stats['batches']) == (8000, 4000, 4000)
+
+
+def test_remove_stale_socket(tmp_path):
+    path = tmp_path / 'file'
+    path.write_text('x')
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(str(path))
+    remove_stale_socket(str(tmp_path / 'missing'))
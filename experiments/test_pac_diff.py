@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the PAC generation diff
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_diff import OP_ADDED, OP_REMOVED, diff_engines, diff_pac_files, merge_diff, write_ndjson
+from pac_ip_index import int_to_ip
+from pac_rule_engine import PacRuleEngine
+from pac_snapshot import open_engine
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PacRuleEngine.from_pac_file(PAC_FILE)
+
+
+def test_merge_diff():
+    assert list(merge_diff([1, 3, 5, 7], [2, 3, 7, 8, 9])) == \
+        [(OP_REMOVED, 1), (OP_ADDED, 2), (OP_REMOVED, 5), (OP_ADDED, 8), (OP_ADDED, 9)]
+    assert list(merge_diff([], ['a'])) == [(OP_ADDED, 'a')]
+    assert list(merge_diff(['a', 'b'], ['a', 'b'])) == []
+
+
+def test_same_file_has_no_changes(tmp_path):
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        content = f.read()
+    old_path, new_path = tmp_path / 'old.pac', tmp_path / 'new.pac'
+    old_path.write_text(content, encoding='utf-8')
+    # A new generation header alone does not change any rule
+    new_path.write_text(content.replace('// Generated on', '// Generated again on', 1), encoding='utf-8')
+    assert list(diff_pac_files(str(old_path), str(new_path))) == []
+    # A diff is read-only
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['new.pac', 'old.pac']
+
+
+def test_ip_and_cidr_changes(tmp_path, engine):
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        content = f.read()
+    new_content = content.replace('["68.171.224.0", 19],', '["10.1.0.0", 16],["10.2.0.0", 15],', 1)
+    # d_ipaddr is delta-encoded: one more entry adds 10 to the last address
+    end = new_content.index('"', new_content.index('var d_ipaddr = "') + len('var d_ipaddr = "'))
+    new_content = new_content[:end] + 'a ' + new_content[end:]
+
+    old_path, new_path = tmp_path / 'old.pac', tmp_path / 'new.pac'
+    old_path.write_text(content, encoding='utf-8')
+    new_path.write_text(new_content, encoding='utf-8')
+
+    out = io.StringIO()
+    counts = write_ndjson(diff_pac_files(str(old_path), str(new_path)), out)
+    changes = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    last_ip = int(engine.ip_index.values[-1])
+    assert changes == [
+        {'section': 'ips', 'op': '+', 'value': int_to_ip(last_ip + 10)},
+        {'section': 'cidrs', 'op': '+', 'value': ['10.1.0.0/16', '10.2.0.0/15'],
+         'first': '10.1.0.0', 'last': '10.3.255.255'},
+        {'section': 'cidrs', 'op': '-', 'value': ['68.171.224.0/19'],
+         'first': '68.171.224.0', 'last': '68.171.255.255'},
+    ]
+    assert counts['cidrs'] == {'added': 1, 'removed': 1}
+    assert counts['domains'] == {'added': 0, 'removed': 0}
+
+
+def test_domain_changes(tmp_path, engine):
+    pac_copy = tmp_path / 'pac.pac'
+    pac_copy.write_bytes(open(PAC_FILE, 'rb').read())
+    warm = open_engine(str(pac_copy))
+
+    groups = dict(engine.groups)
+    removed = sorted(groups[('ru', 5)])[0]
+    groups[('ru', 5)] = frozenset(groups[('ru', 5)]) - {removed}
+    groups[('zz', 3)] = frozenset(['abc'])
+    changed = PacRuleEngine(groups, engine.ip_index, engine.ip_matcher, engine.fbtw,
+                            engine.fbtw_rules, engine.blocked_rules, engine.shost_pattern)
+
+    assert list(diff_engines(warm, engine)) == []
+    changes = list(diff_engines(warm, changed))
+    assert [(c['op'], c['zone']) for c in changes] == [(OP_REMOVED, 'ru'), (OP_ADDED, 'zz')]
+    assert changes[1]['value'] == 'abc.zz'
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the optimized PAC emitter
+
+When Node.js is available, the emitted FindProxyForURL is run next to the
+upstream one on the same hosts and resolver.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_emitter import emit_pac
+from pac_ip_index import int_to_ip
+from pac_rule_engine import PacRuleEngine, ip_ranges
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+# Runs two PAC files on the same hosts; dnsResolve from a JSON map, real isInNet
+NODE_HARNESS = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [pacA, pacB, hostsFile, dnsFile] = process.argv.slice(2);
+const dns = JSON.parse(fs.readFileSync(dnsFile, 'utf8'));
+const hosts = fs.readFileSync(hostsFile, 'utf8').split('\n').filter(Boolean);
+const run = (file) => {
+  const ctx = {
+    dnsResolve: (h) => dns[h] || null,
+    isInNet: (ip, net, mask) => {
+      if (!ip) return false;
+      const n = (s) => s.split('.').reduce((a, b) => a * 256 + +b, 0);
+      return ((n(ip) & n(mask)) >>> 0) === ((n(net) & n(mask)) >>> 0);
+    },
+  };
+  vm.createContext(ctx);
+  vm.runInContext(fs.readFileSync(file, 'utf8'), ctx);
+  return hosts.map((h) => ctx.FindProxyForURL('http://' + h + '/', h));
+};
+console.log(JSON.stringify([run(pacA), run(pacB)]));
+"""
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PacRuleEngine.from_pac_file(PAC_FILE)
+
+
+def test_emit_pac(engine):
+    content = emit_pac(engine, source='pac.pac')
+    assert content.startswith('// Generated by pac_emitter.py from pac.pac')
+    assert 'function FindProxyForURL(url, host)' in content
+    assert '"twitter.com":1' in content
+    assert json.dumps(engine.blocked_rules) in content
+    assert 'patternreplace' not in content and 'indexOf' not in content
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='Node.js not available')
+def test_matches_javascript(engine, tmp_path):
+    hosts = []
+    for (zone, _), records in sorted(engine.groups.items()):
+        for record in sorted(records)[:2]:
+            name = engine.patterns.expand(record) + '.' + zone
+            hosts.extend([name, 'www.' + name, 'cdn.static.' + name])
+    hosts += ['twitter.com', 'www.x.com', 'localhost', '1.2.3.4', 'a.b.msk.ru',
+              'example.invalid', 'porn-not-listed-0.com']
+
+    # Hosts resolving to both ends of, and just outside, some address ranges
+    dns = {}
+    for first, last in ip_ranges(engine)[::40]:
+        for value in (first - 1, first, last, last + 1):
+            host = f"ip-{value}.example"
+            dns[host] = int_to_ip(value)
+            hosts.append(host)
+
+    fast_pac = tmp_path / 'fast.pac'
+    fast_pac.write_text(emit_pac(engine), encoding='utf-8')
+    (tmp_path / 'harness.js').write_text(NODE_HARNESS, encoding='utf-8')
+    (tmp_path / 'hosts.txt').write_text('\n'.join(hosts), encoding='utf-8')
+    (tmp_path / 'dns.json').write_text(json.dumps(dns), encoding='utf-8')
+
+    result = subprocess.run(
+        ['node', str(tmp_path / 'harness.js'), PAC_FILE, str(fast_pac),
+         str(tmp_path / 'hosts.txt'), str(tmp_path / 'dns.json')],
+        capture_output=True, text=True, check=True,
+    )
+    upstream, fast = json.loads(result.stdout)
+    assert fast == upstream
+    assert fast.count(engine.blocked_rules) > len(hosts) // 2
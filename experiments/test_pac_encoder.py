@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the PAC encoder (LZP, mask, d_ipaddr) against the decoders
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import LZPDecompressor, RefinedPACDecompiler, expand_patterns
+from pac_encoder import LZPEncoder, b2a, build_pac, encode_ip_list, group_domains
+from pac_ip_index import IPAddressIndex
+from pac_lzp import CursorLZPDecoder
+from pac_rule_engine import PacRuleEngine
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def decode(data, mask, count):
+    mask_text = LZPDecompressor().a2b(b2a(mask))
+    return CursorLZPDecoder(data, mask_text).read(count)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_lzp_round_trip(seed):
+    rng = random.Random(seed)
+    alphabet = b'abcdefgh.-' if seed % 2 else bytes(range(256))
+    stream = bytes(rng.choice(alphabet) for _ in range(rng.randrange(0, 5000)))
+    stream += stream[:rng.randrange(0, 2000)]
+
+    encoder = LZPEncoder()
+    position = 0
+    while position < len(stream):
+        step = rng.randrange(1, 50)
+        encoder.write(stream[position:position + step])
+        position += step
+    data, mask = encoder.finish()
+
+    assert len(data) <= len(stream)
+    assert decode(data, mask, len(stream)) == stream
+
+
+def test_mask_alphabet_round_trip():
+    rng = random.Random(7)
+    for _ in range(200):
+        mask = bytes(rng.choice([0, 1, 4, 8, 16, 128, 255, rng.randrange(256)])
+                     for _ in range(rng.randrange(0, 40))) + b'\x01\x01'
+        assert LZPDecompressor().a2b(b2a(mask)) == mask.decode('latin-1')
+
+
+def test_ip_list():
+    ips = ['10.0.0.1', '1.2.3.4', '10.0.0.1', '255.255.255.255', '0.0.0.0']
+    index = IPAddressIndex.from_base36([s for s in encode_ip_list(ips).split(' ') if s])
+    assert index.to_dotted() == ['0.0.0.0', '1.2.3.4', '10.0.0.1', '255.255.255.255']
+
+
+def test_group_order_and_validation():
+    groups = group_domains(['porn.10', 'a.com', 'ab.2', 'xx.com', 'b.com'])
+    assert list(groups) == ['2', '10', 'com']
+    assert groups['10'] == {2: ['!A']}
+    assert groups['com'] == {1: ['a', 'b'], 2: ['xx']}
+    for bad in ('localhost', 'Ex"ample.com', 'a b.com'):
+        with pytest.raises(ValueError):
+            group_domains([bad])
+
+
+def test_pac_round_trip(tmp_path):
+    engine = PacRuleEngine.from_pac_file(PAC_FILE)
+    decompiler = RefinedPACDecompiler(PAC_FILE, verbose=False)
+    assert decompiler.decompile(decompress=False)
+
+    domains = [f"{expand_patterns(record)}.{zone}"
+               for (zone, _), records in engine.groups.items() for record in records]
+    cidrs = [f"{cidr['ip']}/{cidr['cidr_bits']}" for cidr in decompiler.special_cidrs]
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        template = f.read()
+    content = build_pac(template, domains, engine.ip_index.to_dotted(), cidrs[::-1])
+
+    new_pac = tmp_path / 'new.pac'
+    new_pac.write_text(content, encoding='utf-8')
+    rebuilt = PacRuleEngine.from_pac_file(str(new_pac))
+
+    # Upstream has one empty group where its stream runs out
+    assert rebuilt.groups == {key: records for key, records in engine.groups.items() if records}
+    assert list(rebuilt.ip_index.values) == list(engine.ip_index.values)
+    assert list(rebuilt.ip_matcher.iter_intervals()) == list(engine.ip_matcher.iter_intervals())
+    assert rebuilt.fbtw == engine.fbtw and rebuilt.blocked_rules == engine.blocked_rules
+    assert len(content) < len(template)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming NDJSON exporter
+"""
+
+import gzip
+import json
+import os
+import sys
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_export import export_pac, iter_records, shard_paths
+from pac_rule_engine import PacRuleEngine
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def test_records_cover_whole_file():
+    engine = PacRuleEngine.from_pac_file(PAC_FILE)
+    expected = sorted(f"{engine.patterns.expand(record)}.{zone}"
+                      for (zone, _), records in engine.groups.items()
+                      for record in records if '\x00' not in record)
+
+    sections = {'domains': [], 'ips': [], 'cidrs': []}
+    for record in iter_records(PAC_FILE):
+        sections[record['section']].append(record)
+
+    domains = sections['domains']
+    assert sorted(record['value'] for record in domains) == expected
+    assert all(record['value'].endswith('.' + record['zone']) for record in domains)
+
+    ips = [record['value'] for record in sections['ips']]
+    assert len(ips) == 6179
+    assert ips == sorted(ips, key=lambda ip: tuple(map(int, ip.split('.'))))
+    assert [record['value'] for record in sections['cidrs']][0] == '68.171.224.0/19'
+    assert len(sections['cidrs']) == 8
+
+
+def test_gzip_shards_round_trip(tmp_path):
+    output = str(tmp_path / 'pac.ndjson.gz')
+    counts = export_pac(PAC_FILE, output, shards=3)
+
+    paths = shard_paths(output, 3)
+    assert [os.path.basename(path) for path in paths] == [
+        'pac.0.ndjson.gz', 'pac.1.ndjson.gz', 'pac.2.ndjson.gz']
+
+    lines = []
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines.append(f.read().splitlines())
+    # Round-robin keeps the shards within one record of each other
+    assert max(map(len, lines)) - min(map(len, lines)) <= 1
+    assert sum(map(len, lines)) == sum(counts.values())
+
+    # Interleaving the shards back gives the unsharded stream
+    merged = [json.loads(line) for i in range(len(lines[0]))
+              for shard in lines if i < len(shard) for line in [shard[i]]]
+    assert merged == list(iter_records(PAC_FILE))
+
+    plain = str(tmp_path / 'pac.ndjson')
+    assert export_pac(PAC_FILE, plain) == counts
+    with open(plain, encoding='utf-8') as f:
+        assert sum(1 for _ in f) == sum(counts.values())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the nftables and ipset file generator
+"""
+
+import io
+import os
+import random
+import sys
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_firewall import pac_prefixes, write_elements, write_ipset, write_nft
+from pac_routes import format_cidrs
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def test_elements_match_cidr_list():
+    rng = random.Random(11)
+    prefixes = [(rng.getrandbits(32), rng.randrange(33)) for _ in range(20000)]
+    prefixes += [(0, 0), (0xFFFFFFFF, 32)]
+    out = io.StringIO()
+    # Small chunks exercise the chunk boundaries
+    assert write_elements(out, prefixes, "%d.%d.%d.%d/%d\n", chunk_size=333) == len(prefixes)
+    assert out.getvalue() == ''.join(format_cidrs(prefixes))
+
+
+def test_nft_file():
+    prefixes = pac_prefixes(PAC_FILE)
+    out = io.StringIO()
+    assert write_nft(out, prefixes, name='blocked', table='filter', family='ip') == len(prefixes)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == '#!/usr/sbin/nft -f'
+    assert 'flush set ip filter blocked' in lines
+    start = lines.index('add element ip filter blocked {')
+    assert lines[-1] == '}'
+    elements = [line.strip().rstrip(',') for line in lines[start + 1:-1]]
+    assert elements == [cidr.strip() for cidr in format_cidrs(prefixes)]
+
+    empty = io.StringIO()
+    write_nft(empty, [])
+    assert 'add element' not in empty.getvalue()
+
+
+def test_ipset_file():
+    prefixes = pac_prefixes(PAC_FILE, max_prefixes=500)
+    assert len(prefixes) <= 500
+    out = io.StringIO()
+    write_ipset(out, prefixes, name='pac')
+    lines = out.getvalue().splitlines()
+    assert lines[1].startswith('create pac hash:net family inet ')
+    assert lines[3] == 'flush pac-new'
+    assert lines[-2:] == ['swap pac-new pac', 'destroy pac-new']
+    adds = [line for line in lines if line.startswith('add ')]
+    assert adds == [f"add pac-new {cidr.strip()}" for cidr in format_cidrs(prefixes)]
+
+
+def test_no_zero_length_prefix():
+    # hash:net rejects /0, so even the smallest budget stops at /1
+    prefixes = pac_prefixes(PAC_FILE, max_prefixes=2)
+    assert len(prefixes) <= 2
+    assert all(prefix_bits >= 1 for _, prefix_bits in prefixes)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the sorted uint32 d_ipaddr index and the IP interval matcher
+
+Every test runs with NumPy (when installed) and with the array('I') fallback.
+"""
+
+import os
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+import pac_ip_index
+from pac_decompiler_refined import IPAddressDecoder, RefinedPACDecompiler
+from pac_ip_index import (IP_SOURCE_CIDR, IP_SOURCE_LIST, IPAddressIndex,
+                          IPIntervalMatcher, cidr_to_range, ip_to_int,
+                          range_to_cidrs)
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if pac_ip_index.np is None:
+            pytest.skip('NumPy not installed')
+    else:
+        monkeypatch.setattr(pac_ip_index, 'np', None)
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def raw_ips():
+    decompiler = RefinedPACDecompiler(os.path.join(PAC_DIR, 'pac.pac'), verbose=False)
+    decompiler.load_pac_file()
+    decompiler.extract_ip_addresses()
+    return decompiler.d_ipaddr_raw
+
+
+def test_matches_legacy_decoder(backend, raw_ips):
+    index = IPAddressIndex.from_base36(raw_ips)
+    assert len(index) == len(raw_ips)
+    assert index.to_dotted() == IPAddressDecoder.decode_ip_list(raw_ips)
+    assert index.to_dotted(2) == ['1.179.201.18', '2.57.184.180']
+
+
+def test_membership(backend, raw_ips):
+    index = IPAddressIndex.from_base36(raw_ips)
+    assert '1.179.201.18' in index
+    assert ip_to_int('1.179.201.18') in index
+    assert '1.179.201.19' not in index
+    assert 'not-an-ip' not in index
+
+    queries = [ip_to_int('1.179.201.18'), 0, 0xFFFFFFFF, ip_to_int('2.57.184.180')]
+    assert list(index.contains_many(queries)) == [True, False, False, True]
+
+
+def test_from_values_sorts_and_dedupes(backend):
+    index = IPAddressIndex.from_values([30, 10, 20, 10])
+    assert [int(v) for v in index.values] == [10, 20, 30]
+    assert list(IPAddressIndex.from_values([]).contains_many([1])) == [False]
+    with pytest.raises(ValueError):
+        IPAddressIndex.from_values([1 << 32])
+
+
+def test_interval_matcher_provenance(backend):
+    ips = IPAddressIndex.from_values([ip_to_int('10.0.0.5'), ip_to_int('10.0.0.6'),
+                                      ip_to_int('192.168.1.1')])
+    cidrs = [{'ip': '10.0.0.0', 'cidr_bits': 29}, {'ip': '10.0.0.4', 'cidr_bits': 30}]
+    matcher = IPIntervalMatcher.from_sources(ips, cidrs)
+
+    assert list(matcher.iter_intervals()) == [
+        (ip_to_int('10.0.0.0'), ip_to_int('10.0.0.4'), IP_SOURCE_CIDR),
+        (ip_to_int('10.0.0.5'), ip_to_int('10.0.0.6'), IP_SOURCE_CIDR | IP_SOURCE_LIST),
+        (ip_to_int('10.0.0.7'), ip_to_int('10.0.0.7'), IP_SOURCE_CIDR),
+        (ip_to_int('192.168.1.1'), ip_to_int('192.168.1.1'), IP_SOURCE_LIST),
+    ]
+    queries = [ip_to_int(ip) for ip in ('10.0.0.1', '10.0.0.6', '10.0.0.8', '192.168.1.1', '0.0.0.0')]
+    expected = [IP_SOURCE_CIDR, IP_SOURCE_CIDR | IP_SOURCE_LIST, 0, IP_SOURCE_LIST, 0]
+    assert [matcher.lookup(q) for q in queries] == expected
+    assert list(matcher.lookup_many(queries)) == expected
+
+
+def test_interval_matcher_matches_scan(backend, raw_ips):
+    index = IPAddressIndex.from_base36(raw_ips)
+    cidrs = [{'ip': '68.171.224.0', 'cidr_bits': 19}, {'ip': '185.104.45.0', 'cidr_bits': 24}]
+    matcher = IPIntervalMatcher.from_sources(index, cidrs)
+    ranges = [cidr_to_range(c['ip'], c['cidr_bits']) for c in cidrs]
+
+    listed = [int(v) for v in index.values[::50]]
+    queries = listed + [v + 1 for v in listed] + [ip_to_int('68.171.250.9'), ip_to_int('185.104.46.0')]
+    for value, flags in zip(queries, matcher.lookup_many(queries)):
+        in_list = index.contains(value)
+        in_cidr = any(start <= value <= end for start, end in ranges)
+        assert flags == (IP_SOURCE_LIST if in_list else 0) | (IP_SOURCE_CIDR if in_cidr else 0)
+
+
+def test_range_to_cidrs():
+    assert range_to_cidrs(*cidr_to_range('68.171.224.0', 19)) == [(ip_to_int('68.171.224.0'), 19)]
+    assert range_to_cidrs(1, 6) == [(1, 32), (2, 31), (4, 31), (6, 32)]
+    assert range_to_cidrs(0, 0xFFFFFFFF) == [(0, 0)]
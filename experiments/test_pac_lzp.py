@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the cursor-based LZP decoder
+
+The reference is the literal port of the PAC unlzp loop, which re-slices
+the data, mask and leftover strings after every call.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_fixed import FixedLZPDecompressor
+from pac_decompiler_refined import RefinedPACDecompiler
+from pac_lzp import CursorLZPDecoder
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def slicing_reads(data, mask, counts):
+    """FindProxyForURL's domains loop, ported literally"""
+    lzp = FixedLZPDecompressor()
+    leftover = ''
+    for count in counts:
+        if len(leftover) < count:
+            output, data_used, mask_used = lzp.unlzp(data, mask, max(8192, count))
+            data = data[data_used:]
+            mask = mask[mask_used:]
+            leftover += output
+        yield leftover[:count]
+        leftover = leftover[count:]
+
+
+@pytest.fixture(scope='module')
+def decompiler():
+    decompiler = RefinedPACDecompiler(PAC_FILE, verbose=False)
+    assert decompiler.decompile()
+    return decompiler
+
+
+def test_matches_slicing_loop(decompiler):
+    counts = [count for domain_dict in decompiler.domains_structure.values()
+              for count in domain_dict.values()]
+    decoder = CursorLZPDecoder(decompiler.domains_lzp, decompiler.mask_lzp_decoded)
+    expected = slicing_reads(decompiler.domains_lzp, decompiler.mask_lzp_decoded, counts)
+
+    for count, reference in zip(counts, expected):
+        assert decoder.read(count).decode('latin-1') == reference
+
+
+def test_matches_decompiler_groups(decompiler):
+    decoder = CursorLZPDecoder(decompiler.domains_lzp, decompiler.mask_lzp_decoded)
+    for zone, domain_dict in decompiler.domains_structure.items():
+        for length, count in domain_dict.items():
+            assert decoder.read(count).decode('latin-1') == decompiler.domains_raw[zone][length]
+
+
+def test_random_streams_and_short_data():
+    rng = random.Random(5)
+    for _ in range(20):
+        data = ''.join(chr(rng.randrange(256)) for _ in range(rng.randrange(1, 3000)))
+        mask = ''.join(chr(rng.randrange(256)) for _ in range(rng.randrange(1, 800)))
+        counts = [rng.choice([1, 7, 100, 9000]) for _ in range(10)]
+
+        decoder = CursorLZPDecoder(data, mask)
+        actual = [decoder.read(count).decode('latin-1') for count in counts]
+        assert actual == list(slicing_reads(data, mask, counts))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the seekable LZP checkpoint index
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import RefinedPACDecompiler
+from pac_encoder import build_pac
+from pac_lzp_index import LZPCheckpointIndex, apply_table_diff, table_diff
+from pac_patterns import PatternTable
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def decompiler():
+    decompiler = RefinedPACDecompiler(PAC_FILE, verbose=False)
+    assert decompiler.decompile()
+    return decompiler
+
+
+@pytest.fixture
+def pac_copy(tmp_path):
+    path = str(tmp_path / 'pac.pac')
+    shutil.copyfile(PAC_FILE, path)
+    return path
+
+
+def test_table_diff_roundtrip():
+    old = bytes(range(256)) * 4
+    new = bytearray(old)
+    new[3], new[700], new[1023] = 0, 1, 7
+    positions, values = table_diff(old, bytes(new))
+    assert len(values) == 3
+
+    table = bytearray(old)
+    apply_table_diff(table, positions, values)
+    assert table == new
+
+
+def test_every_zone_matches_full_decode(decompiler, pac_copy):
+    LZPCheckpointIndex.build(pac_copy).save()
+    index = LZPCheckpointIndex.open(pac_copy)
+
+    # Out of order on purpose: each zone is decoded from its own checkpoint
+    for zone in reversed(list(decompiler.domains_structure)):
+        groups = index.decode_zone(zone)
+        assert {length: raw.decode('latin-1') for length, raw in groups.items()} == \
+            decompiler.domains_raw[zone]
+
+
+def test_index_keyed_by_content(pac_copy):
+    index = LZPCheckpointIndex.open(pac_copy)
+    assert os.path.exists(LZPCheckpointIndex.index_path(pac_copy))
+    assert LZPCheckpointIndex.load(pac_copy) is not None
+
+    with open(pac_copy, 'a') as f:
+        f.write('\n// updated\n')
+    assert LZPCheckpointIndex.load(pac_copy) is None
+    assert LZPCheckpointIndex.open(pac_copy).content_hash != index.content_hash
+
+
+def test_unknown_zone(pac_copy):
+    with pytest.raises(KeyError):
+        LZPCheckpointIndex.build(pac_copy).decode_zone('no-such-zone')
+
+
+def test_cli_uses_the_pac_pattern_table(tmp_path):
+    domains = ['mycasino.com', 'casinotube.com', 'tubeshop.com', 'casino.net']
+    table = PatternTable([('!A', 'casino'), ('B', 'tube')])
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        template = f.read()
+    pac_file = tmp_path / 'learned.pac'
+    pac_file.write_text(build_pac(template, domains, patterns=table), encoding='utf-8')
+
+    result = subprocess.run([sys.executable, os.path.join(PAC_DIR, 'pac_lzp_index.py'),
+                             str(pac_file), 'com'],
+                            capture_output=True, text=True, check=True)
+    assert sorted(result.stdout.split()) == sorted(domains[:3])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for byte-level mask decoding and the bit-unpacked mask index
+
+Every index test runs with NumPy (when installed) and with the array('I')
+fallback.
+"""
+
+import os
+import random
+import re
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+import pac_mask_index
+from pac_encoder import b2a, build_pac
+from pac_lzp import CursorLZPDecoder
+from pac_mask_index import MASK_PATTERNS, MaskIndex, decode_mask
+from pac_stream import read_lzp_sections
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+def js_a2b(a):
+    """Line-by-line port of the PAC's a2b(patternreplace(a, true))"""
+    for key, value in MASK_PATTERNS:
+        a = key.join(a.split(value))
+    e = {char: i for i, char in enumerate(BASE64)}
+    f = g = 0
+    h = bytearray()
+    j = len(a)
+    for c in range(j):
+        f = (f << 6) + e[a[c]]
+        g += 6
+        while g >= 8:
+            g -= 8
+            d = 255 & (f >> g)
+            if d or j - 2 > c:
+                h.append(d)
+    return bytes(h)
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if pac_mask_index.np is None:
+            pytest.skip('NumPy not installed')
+    else:
+        monkeypatch.setattr(pac_mask_index, 'np', None)
+    return request.param
+
+
+@pytest.fixture(scope='module')
+def sections():
+    return read_lzp_sections(PAC_FILE)
+
+
+def test_decode_mask_matches_javascript():
+    with open(PAC_FILE, 'rb') as f:
+        content = f.read()
+    encoded = re.search(rb'var\s+mask_lzp\s*=\s*"([^"]+)";', content).group(1).replace(b'\\\n', b'')
+    assert decode_mask(encoded) == js_a2b(encoded.decode('ascii'))
+
+    rng = random.Random(5)
+    for size in (1, 2, 3, 7, 64, 65):
+        for _ in range(30):
+            # Zero bytes at the end exercise the tail quirk
+            mask = bytes(rng.choice([0, 0, 255, rng.randrange(256)]) for _ in range(size))
+            encoded = b2a(mask).encode('ascii')
+            assert decode_mask(encoded) == js_a2b(encoded.decode('ascii'))
+
+
+def test_bits_and_prefix(backend):
+    index = MaskIndex(bytes([0b00000001, 0b11111111, 0b00000000]))
+    assert list(index.bits) == [1, 0, 0, 0, 0, 0, 0, 0] + [1] * 8 + [0] * 8
+    assert list(index.literal_prefix[:9]) == [0, 0, 1, 2, 3, 4, 5, 6, 7]
+    assert index.output_size == 24 and index.literal_count == 15
+    assert index.data_offset(16) == 7
+    assert index.cursors(19) == (10, 2, 3)
+    assert index.output_limit(7) == 16
+    assert index.output_limit(100) == 24
+    with pytest.raises(IndexError):
+        index.data_offset(25)
+
+
+def test_data_offsets_match_decoder(backend, sections):
+    _, data, mask = sections
+    index = MaskIndex(mask)
+    decoder = CursorLZPDecoder(data, mask)
+    for _ in range(40):
+        decoder.unlzp(8192)
+        assert index.data_offset(8 * decoder.mask_pos) == decoder.data_pos
+
+
+def test_validate(backend, sections, tmp_path):
+    structure, data, mask = sections
+    index = MaskIndex(mask)
+    offsets = list(index.group_offsets(structure))
+    assert offsets[0][2:] == (0, 0)
+    assert offsets[-1][:2] == ('dating', 8)
+
+    # Upstream quirk: the mask ends inside the last group
+    problems = index.validate(structure, len(data))
+    assert any('(dating, 8)' in problem for problem in problems)
+
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        template = f.read()
+    path = tmp_path / 'generated.pac'
+    path.write_text(build_pac(template, [f"host{i}.example.ru" for i in range(5000)]),
+                    encoding='utf-8')
+    structure, data, mask = read_lzp_sections(str(path))
+    index = MaskIndex(mask)
+    assert index.validate(structure, len(data)) == []
+    assert index.literal_count == len(data)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass patternexpand
+
+The reference is the previous implementation: one str.replace pass per
+DOMAIN_PATTERNS entry, in order.
+"""
+
+import os
+import random
+import sys
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import DOMAIN_PATTERNS, RefinedPACDecompiler, expand_patterns
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def sequential_expand(s):
+    for key, value in DOMAIN_PATTERNS:
+        s = s.replace(key, value)
+    return s
+
+
+def test_values_cannot_cascade():
+    code_chars = {key for key, _ in DOMAIN_PATTERNS if len(key) == 1} | {'!'}
+    assert not any(set(value) & code_chars for _, value in DOMAIN_PATTERNS)
+
+
+def test_full_pac_output():
+    decompiler = RefinedPACDecompiler(PAC_FILE, verbose=False)
+    assert decompiler.decompile()
+
+    groups = 0
+    for domain_dict in decompiler.domains_raw.values():
+        for raw in domain_dict.values():
+            assert expand_patterns(raw) == sequential_expand(raw)
+            groups += 1
+    assert groups == decompiler.stats['total_domain_groups']
+
+
+def test_random_strings():
+    alphabet = ''.join(key for key, _ in DOMAIN_PATTERNS if len(key) == 1) + '!!!abcxyz.-\x00'
+    rng = random.Random(8)
+    for _ in range(2000):
+        s = ''.join(rng.choice(alphabet) for _ in range(rng.randrange(0, 40)))
+        assert expand_patterns(s) == sequential_expand(s)
+    assert expand_patterns('!!A!') == '!porn!'
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for pattern tables and the corpus-driven pattern learner
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import DEFAULT_PATTERN_TABLE, DOMAIN_PATTERNS, RefinedPACDecompiler
+from pac_diff import diff_engines
+from pac_encoder import build_pac
+from pac_pattern_learner import learn_patterns, measure
+from pac_patterns import PatternTable
+from pac_rule_engine import PacRuleEngine
+from pac_sections import parse_js_literal
+from pac_snapshot import open_engine
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+WORDS = ['porn', 'kino', 'film', 'casino', 'online', 'stream', 'tube', 'bet', 'shop', 'vpn']
+
+
+def make_corpus(count, seed=3):
+    rng = random.Random(seed)
+    domains = set()
+    while len(domains) < count:
+        host = ''.join(rng.choice(WORDS) for _ in range(rng.randrange(1, 4)))
+        if rng.random() < 0.3:
+            host += str(rng.randrange(100))
+        domains.add(f"{host}.{rng.choice(['com', 'ru', 'net', 'org'])}")
+    return sorted(domains)
+
+
+def test_table_from_pac():
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        content = f.read()
+    table = PatternTable.from_pac(content)
+    assert table == DEFAULT_PATTERN_TABLE
+    assert list(parse_js_literal(table.to_js()).items()) == DOMAIN_PATTERNS
+    assert table.compress('pornhub') == '!Ahub' and table.expand('!Ahub') == 'pornhub'
+
+    with pytest.raises(ValueError):
+        PatternTable([('A', 'in'), ('B', 'Ax')])
+    with pytest.raises(ValueError):
+        PatternTable([('!', 'in')])
+
+
+def test_learned_table():
+    domains = make_corpus(2000)
+    table = learn_patterns(domains)
+    codes = [code for code, _ in table]
+
+    # !X codes first, like the upstream table
+    assert codes[0].startswith('!') and not codes[-1].startswith('!')
+    assert any(value in WORDS for _, value in table)
+    for domain in domains:
+        host = domain.rsplit('.', 1)[0]
+        assert table.expand(table.compress(host)) == host
+
+    learned = measure(domains, table)
+    plain = measure(domains, PatternTable([]))
+    assert learned['stream'] < plain['stream']
+    assert learned['total'] < plain['total']
+
+
+def test_pac_with_learned_table(tmp_path):
+    domains = make_corpus(3000)
+    table = learn_patterns(domains)
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        template = f.read()
+
+    default_pac = tmp_path / 'default.pac'
+    learned_pac = tmp_path / 'learned.pac'
+    default_pac.write_text(build_pac(template, domains), encoding='utf-8')
+    learned_pac.write_text(build_pac(template, domains, patterns=table), encoding='utf-8')
+
+    decompiler = RefinedPACDecompiler(str(learned_pac), verbose=False)
+    assert decompiler.decompile()
+    assert decompiler.pattern_table == table
+    names = set()
+    for zone, groups in decompiler.domains.items():
+        for length, data in groups.items():
+            # Expanded records are not fixed-width: re-split the compressed group
+            raw = decompiler.domains_raw[zone][length]
+            names.update(f"{table.expand(raw[i:i + length])}.{zone}" for i in range(0, len(raw), length))
+    assert names == set(domains)
+
+    engine = open_engine(str(learned_pac))
+    assert engine.patterns == table
+    assert all(engine.classify(domain) == 'PROXY' for domain in domains[::7])
+    assert engine.classify('example.com') == 'DIRECT'
+
+    assert list(diff_engines(PacRuleEngine.from_pac_file(str(default_pac)), engine)) == []
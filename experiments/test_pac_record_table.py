@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for sorted fixed-width record tables
+"""
+
+import os
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+import pac_record_table
+from pac_record_table import SortedRecordTable
+from pac_rule_engine import PacRuleEngine
+from pac_stream import iter_domain_groups
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pac_record_table, 'np', None)
+    return request.param
+
+
+def test_record_table():
+    table = SortedRecordTable(b'xx' + b'abcabdzzz', 2, 3, 3)
+    assert [record for record in table] == ['abc', 'abd', 'zzz']
+    assert 'abd' in table and 'zzz' in table
+    assert 'abe' not in table and 'ab' not in table and 'abф' not in table
+
+
+def test_from_block(backend):
+    # Unsorted, duplicated, a trailing partial record
+    table = SortedRecordTable.from_block('zzzabcabdabcab', 3)
+    assert list(table) == ['abc', 'abd', 'zzz']
+    assert len(table) == 3 and table.nbytes == 9
+    assert table.tobytes() == b'abcabdzzz'
+    assert table == SortedRecordTable(b'xx' + b'abcabdzzz', 2, 3, 3)
+    assert table != SortedRecordTable(b'abcabd', 0, 2, 3)
+
+    assert list(SortedRecordTable.from_block(b'b\x00a\x00b\x00', 2)) == ['a\x00', 'b\x00']
+    assert len(SortedRecordTable.from_block('ab', 3)) == 0
+
+
+def test_groups_match_split_records(backend):
+    domains = list(iter_domain_groups(PAC_FILE))
+    groups = PacRuleEngine.build_groups(domains)
+    for zone, length, data in domains:
+        if isinstance(data, bytes):
+            data = data.decode('latin-1')
+        records = {data[i:i + length] for i in range(0, len(data) - length + 1, length)}
+        table = groups[(zone, int(length))]
+        assert list(table) == sorted(records)
+        assert all(record in table for record in list(records)[:5])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the dnsmasq/unbound config generator
+"""
+
+import io
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_resolver import SuffixTrie, pack_lines, write_dnsmasq, write_unbound
+from pac_rule_engine import PacRuleEngine, blocked_domains
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def test_suffix_trie():
+    names = ['news.i.ua', 'i.ua', 'mail.i.ua', 'example.com', 'a.b.example.org',
+             'b.example.org', 'EXAMPLE.com.', 'x.example.net']
+    for order in (names, names[::-1], sorted(names)):
+        trie = SuffixTrie(order)
+        assert list(trie) == ['example.com', 'x.example.net', 'b.example.org', 'i.ua']
+        assert len(trie) == 4
+    assert trie.covers('deep.news.i.ua') and trie.covers('i.ua')
+    assert not trie.covers('ua') and not trie.covers('example.net')
+    assert not trie.add('www.example.com')
+
+
+def test_trie_matches_brute_force():
+    rng = random.Random(2)
+    labels = ['a', 'b', 'c', 'ru']
+    names = {'.'.join(rng.choice(labels) for _ in range(rng.randint(1, 4))) for _ in range(300)}
+    kept = {name for name in names
+            if not any('.'.join(name.split('.')[i:]) in names for i in range(1, name.count('.') + 1))}
+    assert sorted(SuffixTrie(names)) == sorted(kept)
+
+
+@pytest.fixture(scope='module')
+def names():
+    return list(SuffixTrie(blocked_domains(PacRuleEngine.from_pac_file(PAC_FILE))))
+
+
+def test_dnsmasq(names):
+    out = io.StringIO()
+    lines = write_dnsmasq(out, names, nftset='4#inet#pac#blocked', servers=['10.0.0.53'])
+    text = out.getvalue().splitlines()
+    assert len(text) == lines + 1
+    nftset = [line for line in text if line.startswith('nftset=')]
+    assert all(len(line) <= 1024 for line in text)
+    assert all(line.endswith('/4#inet#pac#blocked') for line in nftset)
+    listed = [name for line in nftset for name in line.split('/')[1:-1]]
+    assert listed == names
+    assert 'blog.i.ua' not in listed and 'i.ua' in listed
+    servers = [line for line in text if line.startswith('server=/')]
+    assert [name for line in servers for name in line.split('/')[1:-1]] == names
+    assert list(pack_lines('ipset=', ['a.ru', 'b.ru', 'c.ru'], 'set', limit=20)) == [
+        'ipset=/a.ru/b.ru/set\n', 'ipset=/c.ru/set\n']
+
+
+def test_unbound(names):
+    out = io.StringIO()
+    write_unbound(out, names[:3], zone_type='always_nxdomain',
+                  forward_addrs=['10.0.0.53', '10.0.0.54'])
+    assert out.getvalue().splitlines()[1:6] == [
+        'server:',
+        f'    local-zone: "{names[0]}." always_nxdomain',
+        f'    local-zone: "{names[1]}." always_nxdomain',
+        f'    local-zone: "{names[2]}." always_nxdomain',
+        'forward-zone:']
+    assert out.getvalue().count('forward-addr: 10.0.0.54') == 3
+    with pytest.raises(ValueError):
+        write_unbound(io.StringIO(), names)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for CIDR-collapsed route export
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_ip_index import ip_to_int
+from pac_routes import collapse_prefixes, exact_prefixes, format_cidrs, format_ip_route
+from pac_rule_engine import PacRuleEngine, ip_ranges
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def size(prefix):
+    return 1 << (32 - prefix[1])
+
+
+def contains(outer, inner):
+    return outer[0] <= inner[0] and inner[0] + size(inner) <= outer[0] + size(outer)
+
+
+@pytest.fixture(scope='module')
+def ranges():
+    return ip_ranges(PacRuleEngine.from_pac_file(PAC_FILE))
+
+
+def test_exact_prefixes(ranges):
+    prefixes = exact_prefixes(ranges)
+    assert sum(map(size, prefixes)) == sum(end - start + 1 for start, end in ranges)
+    # Aligned and disjoint
+    assert all(network % size((network, bits)) == 0 for network, bits in prefixes)
+    assert all(a[0] + size(a) <= b[0] for a, b in zip(prefixes, prefixes[1:]))
+    assert exact_prefixes([(ip_to_int('10.0.0.1'), ip_to_int('10.0.0.6'))]) == [
+        (ip_to_int('10.0.0.1'), 32), (ip_to_int('10.0.0.2'), 31),
+        (ip_to_int('10.0.0.4'), 31), (ip_to_int('10.0.0.6'), 32)]
+
+
+@pytest.mark.parametrize('budget', [1, 7, 100, 1000, 3000])
+def test_collapse_within_budget(ranges, budget):
+    prefixes = exact_prefixes(ranges)
+    collapsed, extra = collapse_prefixes(prefixes, budget)
+    assert len(collapsed) <= budget
+    assert all(a[0] + size(a) <= b[0] for a, b in zip(collapsed, collapsed[1:]))
+    assert sum(map(size, collapsed)) == sum(map(size, prefixes)) + extra
+
+    # Every listed prefix is inside exactly one collapsed prefix
+    i = 0
+    for prefix in prefixes:
+        while not contains(collapsed[i], prefix):
+            i += 1
+    assert collapse_prefixes(prefixes, len(prefixes)) == (prefixes, 0)
+
+
+def test_collapse_takes_cheapest_merge():
+    # Two /32 pairs one address apart merge for free; the far one stays
+    prefixes = [(10, 32), (11, 32), (12, 31), (1 << 24, 32)]
+    assert collapse_prefixes(prefixes, 2) == ([(8, 29), (1 << 24, 32)], 4)
+    rng = random.Random(3)
+    values = sorted(rng.sample(range(1 << 20), 500))
+    prefixes = [(value, 32) for value in values]
+    collapsed, extra = collapse_prefixes(prefixes, 50)
+    assert len(collapsed) <= 50 and extra > 0
+
+
+def test_collapse_min_bits():
+    # Prefixes in both halves of the address space only merge into /0
+    prefixes = [(1, 32), (1 << 30, 32), (3 << 30, 32)]
+    assert collapse_prefixes(prefixes, 1) == ([(0, 0)], (1 << 32) - 3)
+    assert collapse_prefixes(prefixes, 2, min_bits=1) == ([(0, 1), (3 << 30, 32)], (1 << 31) - 2)
+    with pytest.raises(ValueError):
+        collapse_prefixes(prefixes, 1, min_bits=1)
+
+
+def test_formats():
+    prefixes = [(ip_to_int('68.171.224.0'), 19), (ip_to_int('1.179.201.18'), 32)]
+    assert list(format_cidrs(prefixes)) == ['68.171.224.0/19\n', '1.179.201.18/32\n']
+    assert list(format_ip_route(prefixes[:1], via='10.0.0.1', table='100')) == [
+        'route replace 68.171.224.0/19 via 10.0.0.1 table 100\n']
+    with pytest.raises(ValueError):
+        list(format_ip_route(prefixes))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for the native FindProxyForURL rule engine
+
+Checks the engine against known verdicts from pac/pac.pac and, when Node.js
+is available, against the JavaScript FindProxyForURL itself.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import LZPDecompressor
+from pac_patterns import PatternTable
+from pac_record_table import SortedRecordTable
+from pac_rule_engine import (IP_SOURCE_CIDR, IP_SOURCE_LIST, PacRuleEngine,
+                             VERDICT_DIRECT, VERDICT_FBTW, VERDICT_PROXY, blocked_domains,
+                             ip_ranges)
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+# Minimal PAC runtime for Node.js: dnsResolve from a JSON map, real isInNet
+NODE_HARNESS = r"""
+const fs = require('fs');
+const [pacFile, hostsFile, dnsFile] = process.argv.slice(2);
+const dns = JSON.parse(fs.readFileSync(dnsFile, 'utf8'));
+global.dnsResolve = (h) => dns[h] || null;
+global.isInNet = (ip, net, mask) => {
+  if (!ip) return false;
+  const n = (s) => s.split('.').reduce((a, b) => a * 256 + +b, 0);
+  return ((n(ip) & n(mask)) >>> 0) === ((n(net) & n(mask)) >>> 0);
+};
+require('vm').runInThisContext(fs.readFileSync(pacFile, 'utf8'));
+const hosts = fs.readFileSync(hostsFile, 'utf8').split('\n').filter(Boolean);
+console.log(JSON.stringify(hosts.map((h) => FindProxyForURL('http://' + h + '/', h))));
+"""
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PacRuleEngine.from_pac_file(PAC_FILE)
+
+
+def sample_hosts(engine, per_group=2):
+    """Real blocked names from every group, plus subdomain and www variants"""
+    expander = LZPDecompressor()
+    hosts = []
+    for (zone, length), records in sorted(engine.groups.items()):
+        for record in sorted(records)[:per_group]:
+            if '\x00' in record:
+                continue
+            name = expander.patternexpand(record) + '.' + zone
+            hosts.extend([name, 'www.' + name, 'cdn.static.' + name])
+    return hosts
+
+
+def test_fbtw_hosts(engine):
+    assert engine.classify('twitter.com') == VERDICT_FBTW
+    assert engine.classify('www.facebook.com') == VERDICT_FBTW
+    assert engine.find_proxy('https://x.com/', 'x.com') == engine.fbtw_rules
+
+
+def test_direct_hosts(engine):
+    assert engine.classify('localhost') == VERDICT_DIRECT
+    assert engine.classify('example.invalid') == VERDICT_DIRECT
+    assert engine.find_proxy('http://localhost/', 'localhost') == 'DIRECT'
+
+
+def test_blocked_domains(engine):
+    checked = 0
+    for host in sample_hosts(engine):
+        shost = engine.short_host(host)
+        if host.startswith('cdn.static.') and shost != engine.short_host(host[11:]):
+            # The shost regex keeps three labels here: not the listed name
+            continue
+        expected = VERDICT_FBTW if shost in engine.fbtw else VERDICT_PROXY
+        assert engine.classify(host) == expected, host
+        checked += 1
+    assert checked > 10000
+
+
+def test_blocked_domain_names(engine):
+    names = blocked_domains(engine)
+    assert names == sorted(set(names))
+    assert len(names) == sum(len(records) for records in engine.groups.values())
+    for name in names[::997]:
+        assert engine.match_domain(name)
+
+
+def test_ip_ranges(engine):
+    ranges = ip_ranges(engine)
+    assert all(first <= last for first, last in ranges)
+    # Disjoint and not adjacent: every gap holds at least one address
+    assert all(a[1] + 1 < b[0] for a, b in zip(ranges, ranges[1:]))
+    for first, last in ranges[::50]:
+        assert engine.ip_matcher.lookup(first) and engine.ip_matcher.lookup(last)
+        assert not engine.ip_matcher.lookup(first - 1)
+        assert not engine.ip_matcher.lookup(last + 1)
+
+
+def test_learned_pattern_table(engine):
+    patterns = PatternTable([('!A', 'tracker')])
+    assert engine.compress_host('rutracker') != 'ru!A'
+    groups = {('org', 4): SortedRecordTable.from_block('ru!A', 4)}
+    learned = PacRuleEngine(groups, engine.ip_index, engine.ip_matcher, engine.fbtw,
+                            engine.fbtw_rules, engine.blocked_rules, engine.shost_pattern,
+                            patterns=patterns)
+    assert learned.compress_host('rutracker') == 'ru!A'
+    assert learned.classify('rutracker.org') == VERDICT_PROXY
+    assert learned.classify('rutracker.net') == VERDICT_DIRECT
+
+
+def test_ip_rules_need_resolver(engine):
+    blocked_ip = engine.ip_index.to_dotted(1)[0]
+    resolved = PacRuleEngine.from_pac_file(PAC_FILE, resolver=lambda host: blocked_ip)
+
+    assert engine.classify('resolves-to-blocked.example') == VERDICT_DIRECT
+    assert resolved.classify('resolves-to-blocked.example') == VERDICT_PROXY
+    # Address literals are never resolved by FindProxyForURL
+    assert resolved.classify(blocked_ip) == VERDICT_DIRECT
+    assert resolved.match_ip('68.171.230.1')
+    assert not resolved.match_ip('68.171.192.1')
+    assert resolved.ip_source(blocked_ip) == IP_SOURCE_LIST
+    assert resolved.ip_source('68.171.230.1') == IP_SOURCE_CIDR
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='Node.js not available')
+def test_matches_javascript(engine):
+    hosts = sample_hosts(engine, per_group=1)
+    hosts += ['twitter.com', 'localhost', '1.2.3.4', 'a.b.msk.ru', 'ip-special.example']
+    dns = {'ip-special.example': '74.82.70.1'}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for name, content in (('harness.js', NODE_HARNESS),
+                              ('hosts.txt', '\n'.join(hosts)),
+                              ('dns.json', json.dumps(dns))):
+            paths[name] = os.path.join(tmp, name)
+            with open(paths[name], 'w', encoding='utf-8') as f:
+                f.write(content)
+        result = subprocess.run(
+            ['node', paths['harness.js'], PAC_FILE, paths['hosts.txt'], paths['dns.json']],
+            capture_output=True, text=True, check=True,
+        )
+
+    expected = json.loads(result.stdout)
+    resolved = PacRuleEngine.from_pac_file(PAC_FILE, resolver=dns.get)
+    actual = [resolved.find_proxy('http://' + host + '/', host) for host in hosts]
+    assert actual == expected
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass PAC section parser
+"""
+
+import os
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import RefinedPACDecompiler
+from pac_sections import PacSyntaxError, decode_js_string, parse_js_literal, parse_pac_sections
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+def test_pac_file_sections():
+    with open(PAC_FILE, 'r', encoding='utf-8') as f:
+        content = f.read()
+    sections = parse_pac_sections(content)
+
+    assert content[sections['d_ipaddr'].start:].startswith('var d_ipaddr')
+    assert content[sections['domains'].start:].startswith('domains = {')
+    assert sections['FindProxyForURL'].kind == 'function'
+    assert sections['FindProxyForURL'].text(content).rstrip().endswith('return "DIRECT";')
+    assert sections['HASH_MASK'].value is None
+    assert sections['TABLE_LEN_BITS'].value == 18
+
+    assert sections['domains'].value['porn'][3] == 27
+    assert sections['special'].value[0] == ['68.171.224.0', 19]
+    assert sections['d_ipaddr'].value[-1] == ''
+    assert '\\\n' not in sections['domains_lzp'].value
+
+
+def test_literals():
+    assert parse_js_literal('{"a": {1: 2, 3: 4}, b: [1, -2, "x", true, null]}') == \
+        {'a': {1: 2, 3: 4}, 'b': [1, -2, 'x', True, None]}
+    assert parse_js_literal('"a b\\\nc".split(" ")') == ['a', 'bc']
+    assert decode_js_string(r"'\x41B\n\'\\'") == "AB\n'\\"
+    with pytest.raises(PacSyntaxError):
+        parse_js_literal('[1, 2')
+
+
+def test_deep_nesting_is_a_syntax_error():
+    nested = '[' * 5000 + ']' * 5000
+    with pytest.raises(PacSyntaxError):
+        parse_js_literal(nested)
+    # A section that is not a usable literal keeps its offsets only
+    sections = parse_pac_sections(f'var x = {nested}; var y = 1;')
+    assert sections['x'].value is None and sections['y'].value == 1
+    value = parse_js_literal('[' * 50 + ']' * 50)
+    for _ in range(49):
+        value = value[0]
+    assert value == []
+
+
+def test_regex_literals_and_comments_in_functions():
+    content = (
+        '/* {"not": "a section"} */\n'
+        'function f(host) { if (/[{"]\\//.test(host)) { return "}"; } // }\n'
+        '  return 1 / 2 / 3; }\n'
+        'var after = ["ok"];\n'
+    )
+    sections = parse_pac_sections(content)
+    assert list(sections) == ['f', 'after']
+    assert sections['after'].value == ['ok']
+
+
+def test_code_is_never_evaluated(tmp_path):
+    pac_file = tmp_path / 'evil.pac'
+    pac_file.write_text('domains = {"x": __import__("os").system("exit 1")};\n'
+                        'function FindProxyForURL(url, host) { return "DIRECT"; }\n')
+    decompiler = RefinedPACDecompiler(str(pac_file), verbose=False)
+    assert decompiler.load_pac_file()
+    assert decompiler.sections['domains'].value is None
+    assert not decompiler.extract_domains_structure()
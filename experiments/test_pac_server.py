@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the local PAC server
+"""
+
+import gzip
+import http.client
+import os
+import sys
+import threading
+from email.utils import formatdate
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_server import (PacServer, PacStore, accepts_gzip, etag_matches, load_pac_file,
+                        parse_rules)
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+with open(PAC_FILE, 'rb') as _f:
+    PAC_BYTES = _f.read()
+
+
+@pytest.fixture(scope='module')
+def server():
+    store = PacStore(parse_rules([r'Trident|MSIE=upstream']))
+    load_pac_file(store, PAC_FILE)
+    server = PacServer(('127.0.0.1', 0), store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(server, path='/proxy.pac', method='GET', **headers):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+    connection.request(method, path, headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_variants_and_encodings(server):
+    response, body = fetch(server)
+    assert response.status == 200
+    assert response.getheader('Content-Type') == 'application/x-ns-proxy-autoconfig'
+    assert b'var blocked_hosts' in body
+    assert response.getheader('Vary') == 'User-Agent, Accept-Encoding'
+
+    response, body = fetch(server, **{'User-Agent': 'Mozilla/5.0 (Trident/7.0)',
+                                      'Accept-Encoding': 'gzip, deflate'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert gzip.decompress(body) == PAC_BYTES
+
+    response, body = fetch(server, '/upstream.pac')
+    assert body == PAC_BYTES
+    response, body = fetch(server, '/upstream.pac', method='HEAD')
+    assert body == b'' and int(response.getheader('Content-Length')) == len(PAC_BYTES)
+    assert fetch(server, '/other.pac')[0].status == 404
+
+
+def test_conditional_requests(server):
+    plain, _ = fetch(server, '/fast.pac')
+    compressed, _ = fetch(server, '/fast.pac', **{'Accept-Encoding': 'gzip'})
+    etag = plain.getheader('ETag')
+    assert etag.startswith('"') and etag != compressed.getheader('ETag')
+
+    response, body = fetch(server, '/fast.pac', **{'If-None-Match': f'"x", W/{etag}'})
+    assert response.status == 304 and body == b''
+    assert response.getheader('ETag') == etag
+    # The plain ETag does not validate the gzip body
+    response, _ = fetch(server, '/fast.pac', **{'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert response.status == 200
+
+    last_modified = plain.getheader('Last-Modified')
+    assert fetch(server, **{'If-Modified-Since': last_modified})[0].status == 304
+    assert fetch(server, **{'If-Modified-Since': formatdate(0, usegmt=True)})[0].status == 200
+    # If-None-Match wins over If-Modified-Since
+    assert fetch(server, **{'If-None-Match': '"x"',
+                            'If-Modified-Since': last_modified})[0].status == 200
+
+
+def test_helpers():
+    assert etag_matches('*', '"a"') and etag_matches(' "b" , "a"', '"a"')
+    assert not etag_matches('"ab"', '"a"')
+    store = PacStore(parse_rules(['Firefox=upstream', '.*=fast']))
+    assert store.variant_for('Mozilla Firefox/128') == 'upstream'
+    assert store.variant_for('curl/8') == 'fast'
+    with pytest.raises(ValueError):
+        parse_rules(['no-variant'])
+    assert PacStore().variants == {}
+    # Unknown variants fail before any PAC is built
+    with pytest.raises(ValueError):
+        PacStore(parse_rules(['Firefox=slow']))
+    with pytest.raises(ValueError):
+        PacStore(default_variant='slow')
+
+
+def test_accept_encoding(server):
+    assert accepts_gzip('gzip;q=0.5') and accepts_gzip('deflate, GZIP ; Q=1')
+    assert not accepts_gzip('gzip;q=0') and not accepts_gzip('gzip; q=0.000, deflate')
+    assert accepts_gzip('*') and accepts_gzip('br, *;q=0.1')
+    assert not accepts_gzip('*, gzip;q=0') and not accepts_gzip('*;q=0')
+    assert not accepts_gzip('') and not accepts_gzip('deflate, br')
+
+    for header, encoding in (('gzip;q=0.5', 'gzip'), ('gzip;q=0', None), ('*', 'gzip')):
+        response, _ = fetch(server, '/fast.pac', **{'Accept-Encoding': header})
+        assert response.getheader('Content-Encoding') == encoding
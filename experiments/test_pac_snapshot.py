@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled rule snapshot (mmap warm start)
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+import pac_snapshot
+from pac_rule_engine import PacRuleEngine
+from pac_snapshot import load_snapshot, open_engine, snapshot_path
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PacRuleEngine.from_pac_file(PAC_FILE)
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def pac_copy(request, tmp_path, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pac_snapshot, 'np', None)
+    path = str(tmp_path / 'pac.pac')
+    shutil.copyfile(PAC_FILE, path)
+    return path
+
+
+def test_warm_start_matches_engine(engine, pac_copy):
+    open_engine(pac_copy)
+    assert os.path.exists(snapshot_path(pac_copy))
+    warm = load_snapshot(pac_copy)
+    assert warm is not None
+
+    hosts = ['twitter.com', 'localhost', 'rutracker.org', 'example.invalid']
+    for (zone, length), records in sorted(engine.groups.items())[::10]:
+        hosts.extend(f"{record}.{zone}" for record in sorted(records)[:3])
+    assert [warm.classify(host) for host in hosts] == [engine.classify(host) for host in hosts]
+
+    for ip in engine.ip_index.to_dotted(50) + ['68.171.230.1', '10.0.0.1']:
+        assert warm.ip_source(ip) == engine.ip_source(ip)
+    assert len(warm.ip_index) == len(engine.ip_index)
+    assert warm.fbtw == engine.fbtw
+
+
+def test_snapshot_keyed_by_content(pac_copy):
+    open_engine(pac_copy)
+    with open(pac_copy, 'a') as f:
+        f.write('\n// updated\n')
+    assert load_snapshot(pac_copy) is None
+    assert open_engine(pac_copy) is not None
+    assert load_snapshot(pac_copy) is not None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the generator-based domain group stream
+"""
+
+import os
+import sys
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+from pac_decompiler_refined import RefinedPACDecompiler
+from pac_stream import iter_domain_groups, read_lzp_sections
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+
+@pytest.fixture(scope='module')
+def decompiler():
+    decompiler = RefinedPACDecompiler(PAC_FILE, verbose=False)
+    assert decompiler.decompile()
+    return decompiler
+
+
+def test_sections_match_decompiler(decompiler):
+    structure, data, mask = read_lzp_sections(PAC_FILE)
+    assert structure == decompiler.domains_structure
+    assert data == decompiler.domains_lzp.encode('latin-1')
+    assert mask == decompiler.mask_lzp_decoded.encode('latin-1')
+
+
+def test_groups_match_decompiler(decompiler):
+    groups = iter_domain_groups(PAC_FILE)
+    zone, length, raw = next(groups)
+    assert zone == next(iter(decompiler.domains_structure))
+    assert raw.decode('latin-1') == decompiler.domains_raw[zone][length]
+
+    count = 1
+    for zone, length, raw in groups:
+        assert raw.decode('latin-1') == decompiler.domains_raw[zone][length]
+        count += 1
+    assert count == decompiler.stats['total_domain_groups']
+
+
+def test_escapes_match_decompiler(tmp_path):
+    with open(PAC_FILE, 'rb') as f:
+        content = f.read()
+    # Re-escape a few characters of domains_lzp and mask_lzp
+    for name in (b'domains_lzp', b'mask_lzp'):
+        start = content.index(b'"', content.index(b'var ' + name)) + 1
+        char = content[start:start + 1]
+        escaped = b'\\x%02x' % ord(char) + b'\\u%04X' % content[start + 1]
+        content = content[:start] + escaped + content[start + 2:]
+    pac_file = tmp_path / 'escaped.pac'
+    pac_file.write_bytes(content)
+
+    assert read_lzp_sections(str(pac_file))[1:] == read_lzp_sections(PAC_FILE)[1:]
+    # The decompiler reads the literals through pac_sections
+    escaped = RefinedPACDecompiler(str(pac_file), verbose=False)
+    assert escaped.decompile(decompress=False) and escaped.extract_lzp_data()
+    _, data, mask = read_lzp_sections(str(pac_file))
+    assert data == escaped.domains_lzp.encode('latin-1')
+    assert mask == escaped.mask_lzp_decoded.encode('latin-1')
+
+    pac_file.write_bytes(content.replace(b'var domains_lzp = "', b'var domains_lzp = "\\u0416', 1))
+    with pytest.raises(ValueError):
+        read_lzp_sections(str(pac_file))
+
+
+def test_missing_sections(tmp_path):
+    pac_file = tmp_path / 'empty.pac'
+    pac_file.write_text('function FindProxyForURL(url, host) { return "DIRECT"; }\n')
+    with pytest.raises(ValueError):
+        list(iter_domain_groups(str(pac_file)))
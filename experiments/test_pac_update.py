@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the conditional PAC updater (against a local stub HTTP server)
+"""
+
+import gzip
+import os
+import sys
+import threading
+import time
+import urllib.error
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PAC_DIR = os.path.join(os.path.dirname(__file__), '..', 'pac')
+sys.path.insert(0, PAC_DIR)
+
+import pac_update
+from pac_snapshot import load_snapshot
+from pac_update import (UPDATE_NOT_MODIFIED, UPDATE_THROTTLED, UPDATE_UNCHANGED,
+                        UPDATE_UPDATED, PacUpdater, parse_retry_after)
+
+PAC_FILE = os.path.join(PAC_DIR, 'pac.pac')
+
+with open(PAC_FILE, 'rb') as _f:
+    PAC_BYTES = _f.read()
+
+
+class StubPacServer:
+    """Serves one PAC body with an ETag; records request headers"""
+
+    def __init__(self):
+        self.body = PAC_BYTES
+        self.etag = '"v1"'
+        self.status = 200
+        self.extra_headers = {}
+        self.gzip = False
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(dict(self.headers))
+                if stub.status != 200:
+                    self.send_response(stub.status)
+                    for name, value in stub.extra_headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == stub.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = gzip.compress(stub.body) if stub.gzip else stub.body
+                self.send_response(200)
+                self.send_header('ETag', stub.etag)
+                self.send_header('Content-Length', str(len(body)))
+                if stub.gzip:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/proxy.pac"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    stub = StubPacServer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def updater(server, tmp_path):
+    return PacUpdater(server.url, str(tmp_path / 'pac.pac'), user_agent='test-agent/1.0', min_interval=0)
+
+
+def test_download_and_not_modified(server, updater, monkeypatch):
+    assert updater.update() == UPDATE_UPDATED
+    assert open(updater.pac_path, 'rb').read() == PAC_BYTES
+    assert load_snapshot(updater.pac_path) is not None
+    engine = updater.engine
+    assert engine.classify('rutracker.org') == 'PROXY'
+
+    # 304 must not decode anything
+    monkeypatch.setattr(pac_update.PacRuleEngine, 'from_pac_file', None)
+    assert updater.update() == UPDATE_NOT_MODIFIED
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    assert server.requests[-1]['User-Agent'] == 'test-agent/1.0'
+    assert updater.engine is engine
+
+    # A new ETag with the same bytes only refreshes the validators
+    server.etag = '"v2"'
+    assert updater.update() == UPDATE_UNCHANGED
+    assert PacUpdater(server.url, updater.pac_path).meta['etag'] == '"v2"'
+
+
+def test_new_content_swaps_engine(server, updater):
+    assert updater.update() == UPDATE_UPDATED
+    old_engine = updater.engine
+    swapped = []
+    updater.on_update = swapped.append
+
+    server.body = PAC_BYTES.replace(b'var special = [\n', b'var special = [\n["10.1.0.0", 16],', 1)
+    server.etag = '"v2"'
+    server.gzip = True
+    assert updater.update() == UPDATE_UPDATED
+    assert swapped == [updater.engine] and updater.engine is not old_engine
+    assert updater.engine.match_ip('10.1.2.3') and not old_engine.match_ip('10.1.2.3')
+    assert load_snapshot(updater.pac_path).match_ip('10.1.2.3')
+
+
+def test_bad_responses_keep_current_file(server, updater):
+    assert updater.update() == UPDATE_UPDATED
+
+    server.etag = '"empty"'
+    server.body = b''
+    with pytest.raises(ValueError):
+        updater.update()
+    server.body = b'function FindProxyForURL(url, host) { return "DIRECT"; }'
+    with pytest.raises(ValueError):
+        updater.update()
+    assert open(updater.pac_path, 'rb').read() == PAC_BYTES
+    assert not os.path.exists(updater.pac_path + '.download')
+
+
+def test_rate_limits(server, updater):
+    updater.min_interval = 3600
+    assert updater.update() == UPDATE_UPDATED
+    count = len(server.requests)
+    assert updater.update() == UPDATE_THROTTLED
+    assert len(server.requests) == count
+
+    updater.min_interval = 0
+    server.status = 429
+    server.extra_headers = {'Retry-After': '120'}
+    with pytest.raises(urllib.error.HTTPError):
+        updater.update(force=True)
+    assert updater.seconds_until_allowed() > 100
+    assert updater.update() == UPDATE_THROTTLED
+
+    # HTTP-date form
+    server.status = 503
+    server.extra_headers = {'Retry-After': formatdate(time.time() + 600, usegmt=True)}
+    with pytest.raises(urllib.error.HTTPError):
+        updater.update(force=True)
+    assert 500 < updater.seconds_until_allowed() <= 600
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120', 0) == 120
+    assert parse_retry_after('Thu, 01 Jan 1970 00:02:00 GMT', 60) == 60
+    assert parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT', 60) == 0
+    assert parse_retry_after('soon', 0) is None and parse_retry_after('', 0) is None
@@ -10,6 +10,8 @@ import json
 import sys
 from typing import List, Tuple, Dict, Any
 
+from pac_sections import parse_js_literal
+
 
 class ImprovedLZPDecompressor:
     """Улучшенная реализация LZP декомпиляции"""
@@ -170,7 +172,7 @@ class FinalPACDecompiler:
             domains_match = re.search(r'domains = (\{.*?\});', self.pac_content, re.DOTALL)
             if domains_match:
                 domains_str = domains_match.group(1)
-                self.domains = eval(domains_str)
+                self.domains = parse_js_literal(domains_str)
                 print(f"✓ Извлечено {len(self.domains)} зон с доменами")
             else:
                 print("⚠ Секция domains не найдена")
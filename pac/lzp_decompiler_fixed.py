@@ -10,6 +10,8 @@ import json
 import sys
 from typing import List, Tuple, Dict, Any
 
+from pac_sections import parse_js_literal
+
 
 class LZPDecompressor:
     """Полная реализация LZP декомпиляции"""
@@ -169,7 +171,7 @@ class CompletePACDecompiler:
             if domains_match:
                 domains_str = domains_match.group(1)
                 # Преобразуем в Python dict
-                self.domains = eval(domains_str)
+                self.domains = parse_js_literal(domains_str)
                 print(f"✓ Извлечено {len(self.domains)} зон с доменами")
             else:
                 print("⚠ Секция domains не найдена")
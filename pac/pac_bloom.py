@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Bloom Filter Domain Groups
+Low-memory membership backend for PacRuleEngine.groups
+
+The exact backends keep every compressed record: as str objects in
+frozensets (over 100 bytes per record on the heap), as bytes in sorted
+record tables (the record width) or in the memory-mapped rule snapshot
+(record bytes, resident once touched). BloomGroups keeps one
+Bloom filter per (zone, length) group instead, all packed into a single
+bytearray:
+- bits per record and hash count follow from the false-positive rate
+  (1.44 * log2(1/p) bits, ceil(log2(1/p)) hashes: 15 bits at 0.1%)
+- one BLAKE2b digest per lookup, cut into independent 32-bit hashes
+  (double hashing h1 + i * h2 repeats the same bit patterns in the many
+  groups of one to three records and misses the target rate tenfold)
+- a false positive can only turn DIRECT into PROXY, never the reverse
+
+With confirm=True positives are checked against the snapshot's sorted
+record table, so verdicts are exact again while the filters keep most
+lookups of unlisted hosts off the mapped pages.
+
+Bloom groups answer membership only; tools that list records (emitter,
+diff, exporters) need an exact backend.
+
+Usage:
+    engine = open_bloom_engine('pac.pac', fp_rate=0.001)
+    python3 pac_bloom.py pac.pac --fp-rate 0.01 0.001 0.0001
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import random
+import sys
+import time
+from array import array
+from collections.abc import Mapping
+from typing import Callable, Container, Dict, Iterator, List, Optional, Tuple
+
+from pac_ip_index import UINT32_TYPECODE
+from pac_rule_engine import PacRuleEngine
+from pac_record_table import SortedRecordTable
+from pac_snapshot import ensure_snapshot, load_snapshot, open_engine
+from pac_stream import iter_domain_groups
+
+DEFAULT_FP_RATE = 0.001
+
+# 32-bit hashes in one 64-byte BLAKE2b digest
+MAX_HASHES = 16
+
+_LN2_SQUARED = math.log(2) ** 2
+
+
+def filter_size(count: int, fp_rate: float) -> Tuple[int, int]:
+    """(bits, hashes) of a Bloom filter for count items, bits rounded up to whole bytes"""
+    if not 0 < fp_rate < 1:
+        raise ValueError(f"false-positive rate must be between 0 and 1: {fp_rate}")
+    if count == 0:
+        return 0, 0
+    bits = math.ceil(-count * math.log(fp_rate) / _LN2_SQUARED)
+    bits = max(8, bits + -bits % 8)
+    hashes = max(1, math.ceil(-math.log2(fp_rate)))
+    if hashes > MAX_HASHES:
+        # Fewer hashes than optimal: more bits keep the rate
+        hashes = MAX_HASHES
+        bits = math.ceil(-MAX_HASHES / math.log(1 - fp_rate ** (1 / MAX_HASHES)) * count)
+        bits += -bits % 8
+    return bits, hashes
+
+
+def _hashes(key: bytes, count: int) -> memoryview:
+    """count independent 32-bit hashes of a key"""
+    return memoryview(hashlib.blake2b(key, digest_size=4 * count).digest()).cast(UINT32_TYPECODE)
+
+
+class BloomGroup:
+    """One group's filter: a view into BloomGroups.bits"""
+
+    __slots__ = ('owner', 'index', 'confirm')
+
+    def __init__(self, owner: 'BloomGroups', index: int, confirm: Optional[Container[str]]):
+        self.owner = owner
+        self.index = index
+        self.confirm = confirm
+
+    def __len__(self) -> int:
+        return self.owner.counts[self.index]
+
+    def __contains__(self, record: str) -> bool:
+        owner, index = self.owner, self.index
+        size = owner.sizes[index]
+        if size == 0 or len(record) != owner.widths[index]:
+            return False
+        try:
+            hashes = _hashes(record.encode('latin-1'), owner.hash_counts[index])
+        except UnicodeEncodeError:
+            return False
+        bits, base = owner.bits, owner.offsets[index]
+        for value in hashes:
+            bit = value % size
+            if not bits[base + (bit >> 3)] >> (bit & 7) & 1:
+                return False
+        return self.confirm is None or record in self.confirm
+
+
+class BloomGroups(Mapping):
+    """
+    (zone, length) -> BloomGroup for all groups, in one bit array
+
+    Per group only a byte offset, a size in bits, a hash count and the
+    record count are kept (parallel arrays, indexed through one dict).
+    """
+
+    def __init__(self, fp_rate: float = DEFAULT_FP_RATE,
+                 confirm: Optional[Mapping[Tuple[str, int], Container[str]]] = None):
+        self.fp_rate = fp_rate
+        self.confirm = confirm
+        self.index: Dict[Tuple[str, int], int] = {}
+        self.bits = bytearray()
+        self.offsets = array(UINT32_TYPECODE)
+        self.sizes = array(UINT32_TYPECODE)
+        self.counts = array(UINT32_TYPECODE)
+        self.widths = array('H')
+        self.hash_counts = array('B')
+
+    @classmethod
+    def from_groups(cls, groups: Mapping[Tuple[str, int], Container[str]],
+                    fp_rate: float = DEFAULT_FP_RATE, confirm: bool = False) -> 'BloomGroups':
+        """Builds filters from an exact backend (frozensets or record tables)"""
+        result = cls(fp_rate, confirm=groups if confirm else None)
+        for key, records in groups.items():
+            result.add_group(key, list(records))
+        return result
+
+    def add_group(self, key: Tuple[str, int], records: List[str]):
+        size, hash_count = filter_size(len(records), self.fp_rate)
+        base = len(self.bits)
+        self.bits.extend(bytes(size // 8))
+        bits = self.bits
+        for record in records:
+            for value in _hashes(record.encode('latin-1'), hash_count):
+                bit = value % size
+                bits[base + (bit >> 3)] |= 1 << (bit & 7)
+        self.index[key] = len(self.offsets)
+        self.offsets.append(base)
+        self.sizes.append(size)
+        self.counts.append(len(records))
+        self.widths.append(key[1])
+        self.hash_counts.append(hash_count)
+
+    def __getitem__(self, key: Tuple[str, int]) -> BloomGroup:
+        index = self.index[key]
+        confirm = self.confirm[key] if self.confirm is not None else None
+        return BloomGroup(self, index, confirm)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the bit array and the per-group arrays"""
+        arrays = (self.offsets, self.sizes, self.counts, self.widths, self.hash_counts)
+        return len(self.bits) + sum(len(values) * values.itemsize for values in arrays)
+
+
+def open_bloom_engine(pac_path: str, fp_rate: float = DEFAULT_FP_RATE, confirm: bool = False,
+                      resolver: Optional[Callable[[str], Optional[str]]] = None) -> PacRuleEngine:
+    """
+    Engine whose domain groups are Bloom filters built from the rule snapshot
+    With confirm, positives are checked against the mapped snapshot tables.
+    """
+    engine = open_engine(pac_path, resolver=resolver)
+    engine.groups = BloomGroups.from_groups(engine.groups, fp_rate, confirm)
+    return engine
+
+
+def footprint(groups: Mapping) -> Tuple[int, int]:
+    """
+    (heap bytes, mapped file bytes) held by a groups backend
+    The (zone, length) keys are shared by all backends and not counted.
+    """
+    heap = sys.getsizeof(groups)
+    if isinstance(groups, BloomGroups):
+        heap = sys.getsizeof(groups.index) + groups.nbytes
+        if groups.confirm is None:
+            return heap, 0
+        confirm_heap, mapped = footprint(groups.confirm)
+        return heap + confirm_heap, mapped
+    mapped = 0
+    for records in groups.values():
+        heap += sys.getsizeof(records)
+        if isinstance(records, SortedRecordTable):
+            if isinstance(records.buffer, mmap.mmap):
+                mapped += records.nbytes
+            else:
+                heap += sys.getsizeof(records.buffer)
+        else:
+            heap += sum(map(sys.getsizeof, records))
+    return heap, mapped
+
+
+def false_positive_rate(groups: Mapping, exact: Mapping, probes: int = 200000,
+                        seed: int = 1) -> float:
+    """Share of random unlisted records a backend reports as listed"""
+    rng = random.Random(seed)
+    keys = [key for key in exact if len(exact[key])]
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789-'
+    positives = tested = 0
+    for _ in range(probes):
+        key = rng.choice(keys)
+        record = ''.join(rng.choices(alphabet, k=key[1]))
+        if record in exact[key]:
+            continue
+        tested += 1
+        positives += record in groups[key]
+    return positives / tested if tested else 0.0
+
+
+def lookup_time(groups: Mapping, records: List[Tuple[Tuple[str, int], str]]) -> float:
+    """Mean microseconds per membership test"""
+    start = time.perf_counter()
+    for key, record in records:
+        record in groups[key]
+    return (time.perf_counter() - start) / len(records) * 1e6
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Compare memory of exact and Bloom filter domain group backends")
+    parser.add_argument('pac_file', help="PAC file")
+    parser.add_argument('--fp-rate', type=float, nargs='+', default=[0.01, DEFAULT_FP_RATE, 0.0001],
+                        help="false-positive rates to build (default: 0.01 0.001 0.0001)")
+    args = parser.parse_args()
+
+    if ensure_snapshot(args.pac_file) is None:
+        sys.exit(1)
+    snapshot = load_snapshot(args.pac_file).groups
+    exact = {key: frozenset(table) for key, table in snapshot.items()}
+    record_count = sum(map(len, exact.values()))
+    rng = random.Random(2)
+    listed = rng.sample([(key, record) for key, records in exact.items() for record in records],
+                        20000)
+
+    print(f"{record_count:,} records in {len(exact):,} groups\n")
+    print(f"{'backend':<24} {'heap':>12} {'mapped':>10} {'B/record':>9} "
+          f"{'false pos.':>10} {'lookup':>9}")
+
+    def row(name, groups):
+        heap, mapped = footprint(groups)
+        fp = false_positive_rate(groups, exact) if isinstance(groups, BloomGroups) else 0.0
+        print(f"{name:<24} {heap:>12,} {mapped:>10,} {(heap + mapped) / record_count:>9.1f} "
+              f"{fp:>10.4%} {lookup_time(groups, listed):>7.2f}µs")
+
+    row('exact (frozenset)', exact)
+    row('exact (tables)', PacRuleEngine.build_groups(iter_domain_groups(args.pac_file)))
+    row('exact (snapshot)', snapshot)
+    for fp_rate in args.fp_rate:
+        row(f"bloom p={fp_rate:g}", BloomGroups.from_groups(snapshot, fp_rate))
+    row(f"bloom p={args.fp_rate[-1]:g} + confirm",
+        BloomGroups.from_groups(snapshot, args.fp_rate[-1], confirm=True))
+
+
+if __name__ == "__main__":
+    main()
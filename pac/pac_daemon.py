@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+PAC Classification Daemon
+Answers host queries over a Unix socket from rules loaded once
+
+Tools that call pac_rule_engine or pac_classify per invocation pay for
+loading the rules every time. The daemon loads them once (from the rule
+snapshot) and answers newline-delimited queries with the same
+`host<TAB>PROXY|DIRECT|FBTW` lines as pac_classify, one per query line and
+in order, so clients can pipeline any number of queries:
+
+    printf 'rutracker.org\\nexample.com\\n' | socat - UNIX-CONNECT:/tmp/pac.sock
+
+Everything that arrives in one read is answered in one batch and one
+write. Two LRU caches (functools.lru_cache) sit in front of the engine:
+- host -> domain verdict: skips shost normalization for repeated hosts
+- shost -> domain verdict: skips patternreplace and the group lookup for
+  different hosts with the same shost (cdn1.example.com, cdn2.example.com)
+
+Resolved-address verdicts (--resolve) are never cached, DNS answers
+change; batches that may resolve run in a worker thread. A `!stats` line
+returns the request and cache hit/miss counters as one JSON line. A URL
+that cannot be parsed is answered with `line<TAB>ERROR` and the
+connection stays open.
+
+Usage:
+    python3 pac_daemon.py pac.pac --socket /tmp/pac.sock
+    verdicts = query('/tmp/pac.sock', ['rutracker.org', 'example.com'])
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pac_classify import extract_host
+from pac_rule_engine import PacRuleEngine, dns_resolve
+from pac_snapshot import open_engine
+
+DEFAULT_SOCKET = '/tmp/pac.sock'
+DEFAULT_CACHE_SIZE = 65536
+
+STATS_COMMAND = '!stats'
+# Verdict for query lines that cannot be parsed
+VERDICT_ERROR = 'ERROR'
+
+READ_SIZE = 65536
+# A longer line without a newline closes the connection (after answering
+# the complete lines before it)
+MAX_LINE = 8192
+
+
+class ClassifyDaemon:
+    """Cached classification and the Unix socket protocol around it"""
+
+    def __init__(self, engine: PacRuleEngine, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.engine = engine
+        self.shost_verdict = functools.lru_cache(maxsize=cache_size)(engine.domain_verdict)
+        self.host_verdict = functools.lru_cache(maxsize=cache_size)(self._host_verdict)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.connections = 0
+        self.started_at = time.time()
+        # answer() runs in executor threads with --resolve
+        self._counter_lock = threading.Lock()
+
+    def _host_verdict(self, host: str) -> Optional[str]:
+        return self.shost_verdict(self.engine.short_host(host))
+
+    def classify(self, host: str) -> str:
+        """Same verdict as PacRuleEngine.classify(host)"""
+        verdict = self.host_verdict(host)
+        if verdict is not None:
+            return verdict
+        return self.engine.address_verdict(host)
+
+    def answer(self, lines: List[bytes]) -> bytes:
+        """Response lines for a batch of query lines"""
+        output = []
+        requests = errors = 0
+        for line in lines:
+            text = line.decode('utf-8', 'replace').strip()
+            if text == STATS_COMMAND:
+                self._count(requests, errors)
+                requests = errors = 0
+                output.append(json.dumps(self.stats()) + '\n')
+                continue
+            requests += 1
+            host = extract_host(text)
+            if host is None:
+                errors += 1
+                output.append(f"{text}\t{VERDICT_ERROR}\n")
+                continue
+            output.append(f"{host}\t{self.classify(host)}\n")
+        self._count(requests, errors, batches=1)
+        return ''.join(output).encode('utf-8')
+
+    def _count(self, requests: int, errors: int, batches: int = 0):
+        with self._counter_lock:
+            self.requests += requests
+            self.errors += errors
+            self.batches += batches
+
+    def stats(self) -> Dict[str, object]:
+        """Query counters and hit/miss counters of both caches"""
+        result = {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'connections': self.connections,
+            'uptime': round(time.time() - self.started_at, 1),
+        }
+        for name, cache in (('host_cache', self.host_verdict), ('shost_cache', self.shost_verdict)):
+            info = cache.cache_info()
+            result[name] = {'hits': info.hits, 'misses': info.misses,
+                            'size': info.currsize, 'max_size': info.maxsize}
+        return result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answers one client until it closes its side"""
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        pending = b''
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                too_long = False
+                if data:
+                    *lines, pending = (pending + data).split(b'\n')
+                    too_long = len(pending) > MAX_LINE
+                else:
+                    # A last query without a newline is still answered
+                    lines, pending = ([pending] if pending.strip() else []), b''
+                if lines:
+                    if self.engine.resolver is not None:
+                        # dnsResolve blocks; keep the event loop free
+                        response = await loop.run_in_executor(None, self.answer, lines)
+                    else:
+                        response = self.answer(lines)
+                    writer.write(response)
+                    await writer.drain()
+                if not data or too_long:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str, mode: int = 0o660,
+                    stop: Optional[asyncio.Event] = None):
+        """Serves on a Unix socket until SIGINT/SIGTERM or until stop is set"""
+        remove_stale_socket(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        os.chmod(path, mode)
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(signum)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    pass
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def remove_stale_socket(path: str):
+    """Removes a socket left by a previous run (never a regular file)"""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"not a socket: {path}")
+    os.remove(path)
+
+
+def query(path: str, hosts: Iterable[str], timeout: float = 10.0) -> List[str]:
+    """Sends hosts to a running daemon; returns the verdicts in order"""
+    payload = ''.join(f"{host}\n" for host in hosts).encode('utf-8')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+
+        def send():
+            sock.sendall(payload)
+            sock.shutdown(socket.SHUT_WR)
+
+        # Read while sending: with a long list both sides' buffers fill up
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+        chunks = []
+        while True:
+            chunk = sock.recv(READ_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        sender.join()
+    lines = b''.join(chunks).decode('utf-8').splitlines()
+    return [line.rpartition('\t')[2] for line in lines]
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Answer host classification queries over a Unix socket")
+    parser.add_argument('pac_file', help="PAC file")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--mode', type=lambda value: int(value, 8), default=0o660,
+                        help="socket permissions, octal (default: 660)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"entries per LRU cache (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument('--bloom', type=float, metavar='FP_RATE',
+                        help="keep domain groups as Bloom filters with this false-positive rate")
+    parser.add_argument('--confirm', action='store_true',
+                        help="with --bloom, check positives against the rule snapshot")
+    parser.add_argument('--resolve', action='store_true',
+                        help="resolve unlisted hosts and apply the IP rules, like dnsResolve()")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    resolver = dns_resolve if args.resolve else None
+    if args.bloom is not None:
+        from pac_bloom import open_bloom_engine
+        engine = open_bloom_engine(args.pac_file, args.bloom, args.confirm, resolver)
+    else:
+        engine = open_engine(args.pac_file, resolver=resolver)
+    daemon = ClassifyDaemon(engine, args.cache_size)
+    print(f"✓ Rules loaded in {time.perf_counter() - start:.2f}s, "
+          f"listening on {args.socket}", file=sys.stderr)
+    try:
+        asyncio.run(daemon.serve(args.socket, args.mode))
+    except FileExistsError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ Stopped: {json.dumps(daemon.stats())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import zlib
 import sys
 from typing import Dict, List, Tuple, Any
 
+from pac_sections import parse_js_literal
+
 
 class PACDecompiler:
     def __init__(self, pac_file_path: str):
@@ -41,7 +43,7 @@ class PACDecompiler:
             if domains_match:
                 domains_str = domains_match.group(1)
                 # Преобразуем в Python dict
-                self.domains = eval(domains_str)
+                self.domains = parse_js_literal(domains_str)
                 print(f"✓ Извлечено {len(self.domains)} зон с доменами")
             else:
                 print("⚠ Секция domains не найдена")
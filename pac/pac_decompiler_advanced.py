@@ -11,6 +11,8 @@ import zlib
 import sys
 from typing import Dict, List, Tuple, Any
 
+from pac_sections import parse_js_literal
+
 
 class LZPDecompressor:
     """Простая реализация LZP декомпрессии"""
@@ -120,7 +122,7 @@ class AdvancedPACDecompiler:
             if domains_match:
                 domains_str = domains_match.group(1)
                 # Преобразуем в Python dict
-                self.domains = eval(domains_str)
+                self.domains = parse_js_literal(domains_str)
                 print(f"✓ Извлечено {len(self.domains)} зон с доменами")
             else:
                 print("⚠ Секция domains не найдена")
@@ -21,6 +21,9 @@ import sys
 import struct
 from typing import List, Tuple, Dict, Any, Optional
 
+from pac_lzp import CursorLZPDecoder
+from pac_sections import parse_js_literal
+
 
 class FixedLZPDecompressor:
     """
@@ -185,7 +188,8 @@ class FixedLZPDecompressor:
         dpos = 0
         out = [''] * 8  # Buffer for 8 characters
         outpos = 0
-        outfinal = ''
+        chunks = []     # Joined once at the end (string += is quadratic)
+        outlen = 0
 
         # Reset hash state for each decompression
         # Note: JavaScript uses global hash, but resets in FindProxyForURL
@@ -240,20 +244,21 @@ class FixedLZPDecompressor:
 
                 # Join buffer to output if we have 8 characters
                 if outpos == 8:
-                    outfinal += ''.join(out)
+                    chunks.append(''.join(out))
+                    outlen += 8
 
                 # Check if we've reached the limit
-                if len(outfinal) >= lim:
+                if outlen >= lim:
                     break
 
             # Handle partial buffer (less than 8 characters)
             if outpos < 8 and outpos > 0:
-                outfinal += ''.join(out[:outpos])
+                chunks.append(''.join(out[:outpos]))
 
         except Exception as e:
             print(f"⚠ Warning: LZP decompression error: {e}")
 
-        return outfinal, dpos, maskpos
+        return ''.join(chunks), dpos, maskpos
 
 
 class IPAddressDecoder:
@@ -350,7 +355,7 @@ class FixedPACDecompiler:
 
             if match:
                 domains_str = '{' + match.group(1) + '}'
-                self.domains = eval(domains_str)
+                self.domains = parse_js_literal(domains_str)
 
                 self.stats['total_zones'] = len(self.domains)
                 self.stats['total_domain_groups'] = sum(
@@ -471,10 +476,8 @@ class FixedPACDecompiler:
             print("\n🔄 Decompressing domains using FIXED LZP algorithm...")
             print("=" * 60)
 
-            # Working copies - JavaScript slices these after each unlzp call
-            remaining_data = self.domains_lzp
-            remaining_mask = self.mask_lzp_decoded
-            leftover = ''
+            # Cursor-based decoder: no re-slicing of data, mask or leftover
+            decoder = CursorLZPDecoder(self.domains_lzp, self.mask_lzp_decoded)
 
             # Process each TLD zone in order (matching JavaScript iteration)
             for zone_idx, (zone, domain_dict) in enumerate(self.domains.items(), 1):
@@ -489,34 +492,16 @@ class FixedPACDecompiler:
                     # dmnl = domains[dmn][dcnt] (line 903)
                     dmnl = count
 
-                    # Check if we need more data from LZP stream (line 904)
-                    if len(leftover) < dmnl:
-                        # Calculate request size (line 905)
-                        reqd = 8192 if dmnl <= 8192 else dmnl
-
-                        try:
-                            # Decompress next chunk (line 906)
-                            decompressed, data_used, mask_used = self.lzp_decompressor.unlzp(
-                                remaining_data, remaining_mask, reqd
-                            )
-
-                            # Update streams (line 907-908)
-                            remaining_data = remaining_data[data_used:]
-                            remaining_mask = remaining_mask[mask_used:]
-                            leftover += decompressed
-
-                        except Exception as e:
-                            print(f"  ✗ Zone {zone}, length {length_key}: LZP error: {e}")
-                            self.stats['decompression_errors'] += 1
-                            zone_success = False
-                            break
-
-                    # Extract required characters from leftover (line 914)
-                    if len(leftover) >= dmnl:
-                        # Extract the compressed domain data
-                        compressed_data = leftover[:dmnl]
-                        leftover = leftover[dmnl:]
+                    # unlzp when leftover is short, then take dmnl chars (lines 904-914)
+                    try:
+                        compressed_data = decoder.read(dmnl).decode('latin-1')
+                    except Exception as e:
+                        print(f"  ✗ Zone {zone}, length {length_key}: LZP error: {e}")
+                        self.stats['decompression_errors'] += 1
+                        zone_success = False
+                        break
 
+                    if len(compressed_data) == dmnl:
                         # CRITICAL FIX: Expand patterns to get readable domains
                         # The decompressed data still contains compressed patterns that must be expanded
                         expanded_data = self.lzp_decompressor.patternexpand(compressed_data)
@@ -526,7 +511,7 @@ class FixedPACDecompiler:
                         self.stats['total_domains_decompressed'] += len(expanded_data)
                     else:
                         # Not enough data
-                        self.domains[zone][length_key] = f"<LZP_ERROR: need {dmnl}, got {len(leftover)}>"
+                        self.domains[zone][length_key] = f"<LZP_ERROR: need {dmnl}, got {len(compressed_data)}>"
                         self.stats['decompression_errors'] += 1
                         zone_success = False
 
@@ -9,33 +9,70 @@ This decompiler properly handles:
 - CIDR range extraction with proper mask conversion
 - LZP decompression with pattern replacement
 - Complete data validation and error handling
+- One tokenizer pass over the file for all sections (pac_sections), no eval
 
 Based on analysis of:
 - pac.pac structure
-- JavaScript functions: patternreplace, a2b, unlzp, nmfc
+- JavaScript functions: patternreplace, a2b, unlzp (pac_lzp), nmfc
 - Existing decompilers: lzp_decompiler_final.py, pac_decompiler_advanced.py
 """
 
-import base64
 import re
 import json
 import sys
 import struct
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Dict, Any, Optional
+
+from pac_ip_index import IPAddressIndex
+from pac_lzp import CursorLZPDecoder
+from pac_mask_index import decode_mask
+from pac_patterns import PatternTable
+from pac_sections import parse_js_literal, parse_pac_sections
+
+
+# Domain patterns from the PAC file's patternreplace (KEY -> VALUE)
+# Order matters: two-character patterns first to avoid partial replacements
+DOMAIN_PATTERNS = [
+    ('!A', 'porn'), ('!B', 'film'), ('!C', 'lord'), ('!D', 'kino'), ('!E', 'oker'), ('!F', 'trad'),
+    ('!G', 'line'), ('!H', 'game'), ('!I', 'pdom'), ('!J', 'tion'), ('!K', '.com'), ('!L', 'leon'),
+    ('!M', 'port'), ('!N', 'shop'), ('!O', 'club'), ('!P', 'prav'), ('!Q', 'vest'), ('!R', 'inco'),
+    ('!S', 'mark'), ('!T', 'ital'), ('!U', 'slot'), ('!V', 'play'), ('!W', 'eria'), ('!X', 'russ'),
+    ('!Y', 'vide'), ('!Z', 'tube'), ('!@', 'medi'), ('!#', 'ster'), ('!$', 'star'), ('!%', 'nter'),
+    ('!^', 'scho'), ('!&', 'free'), ('!*', 'enta'), ('!(', 'best'), ('!)', 'mega'), ('!=', 'gama'),
+    ('!+', 'prof'), ('!/', 'oney'), ('!,', 'rypt'), ('!<', 'kra3'), ('!>', 'stor'), ('!~', 'ture'),
+    ('![', 'tech'), ('!]', 'ance'), ('!{', 'coin'), ('!}', 'seed'), ('!`', 'anim'), ('!:', 'stro'),
+    ('!;', 'ment'), ('!?', 'site'),
+    # Single-character patterns last
+    ('A', 'in'), ('B', 'an'), ('C', 'er'), ('D', 'ar'), ('E', 'or'),
+    ('F', 'et'), ('G', 'al'), ('H', 'st'), ('I', 'on'), ('J', 'en'), ('K', 'at'), ('L', 'ro'), ('M', 'es'),
+    ('N', 'as'), ('O', 'el'), ('P', 'it'), ('Q', 'ch'), ('R', 'am'), ('S', 'ol'), ('T', 'om'), ('U', 'ra'),
+    ('V', 'ex'), ('W', 'is'), ('X', 'ic'), ('Y', 're'), ('Z', 'os'), ('@', 'ka'), ('#', 'ot'), ('$', 'us'),
+    ('%', 'ap'), ('^', 'ov'), ('&', 'im'), ('*', '-s'), ('(', 'ad'), (')', 'il'), ('=', 'op'), ('+', 'ed'),
+    ('/', 'em'), (',', 'a-'), ('<', 'od'), ('>', 'ir'), ('~', 'id'), ('[', 'ob'), (']', 'ag'), ('{', 'ig'),
+    ('}', 'ip'), ('`', 'ok'), (':', 'e-'), (';', 'ec'), ('?', 'un')
+]
+
+# Upstream table as a PatternTable (compress / expand)
+DEFAULT_PATTERN_TABLE = PatternTable(DOMAIN_PATTERNS)
+
+
+def expand_patterns(s: str) -> str:
+    """
+    Single-pass equivalent of replacing every DOMAIN_PATTERNS key with its value
+
+    No value contains '!' or a code character, so expanding left to right
+    (see PatternTable.expand) gives the same result as the sequential
+    str.replace passes in DOMAIN_PATTERNS order.
+    """
+    return DEFAULT_PATTERN_TABLE.expand(s)
 
 
 class LZPDecompressor:
     """
-    LZP (Lempel-Ziv-Prediction) Decompressor
-    Implements the algorithm from the PAC file's unlzp function
+    String helpers around LZP decoding: patternreplace, patternexpand, a2b
+    The LZP stream itself is decoded by pac_lzp.CursorLZPDecoder.
     """
 
-    def __init__(self):
-        # Hash table for LZP prediction (2^18 entries)
-        self.table = [0] * 262144
-        self.hash_mask = 262143  # (1 << 18) - 1
-        self.hash_val = 0
-
     def patternreplace(self, s: str, lzpmask: bool = False) -> str:
         """
         Implements JavaScript patternreplace function
@@ -43,7 +80,9 @@ class LZPDecompressor:
         CRITICAL: JavaScript code does s.split(patterns[pattern]).join(pattern)
         This means it replaces the VALUE with the KEY (reverse direction!)
 
-        This function is ONLY used for encoding the mask (lzpmask=True).
+        With lzpmask=True it prepares the mask for base64 decoding.
+        With lzpmask=False it compresses a host name the same way
+        FindProxyForURL does before looking it up in the domain groups.
         For domain decompression, use patternexpand() instead.
         """
         if lzpmask:
@@ -57,7 +96,7 @@ class LZPDecompressor:
             }
         else:
             # Patterns for domain data (encoding direction: VALUE -> KEY)
-            patterns = {}
+            patterns = dict(DOMAIN_PATTERNS)
 
         result = s
         # Replace VALUE with KEY (reversed from typical replacement)
@@ -81,118 +120,27 @@ class LZPDecompressor:
         - '!A' -> 'porn'
         - '@gw' -> 'kagw' (@->ka + g + w)
 
-        This function must be applied AFTER unlzp decompression.
+        This function must be applied AFTER LZP decompression.
+        Runs in one pass over the string (see expand_patterns).
         """
-        # Domain patterns - expand KEY to VALUE (opposite of patternreplace)
-        # Order matters: process longer patterns first to avoid partial replacements
-        patterns_ordered = [
-            # Two-character patterns first (to avoid conflicts)
-            ('!A', 'porn'), ('!B', 'film'), ('!C', 'lord'), ('!D', 'kino'), ('!E', 'oker'), ('!F', 'trad'),
-            ('!G', 'line'), ('!H', 'game'), ('!I', 'pdom'), ('!J', 'tion'), ('!K', '.com'), ('!L', 'leon'),
-            ('!M', 'port'), ('!N', 'shop'), ('!O', 'club'), ('!P', 'prav'), ('!Q', 'vest'), ('!R', 'inco'),
-            ('!S', 'mark'), ('!T', 'ital'), ('!U', 'slot'), ('!V', 'play'), ('!W', 'eria'), ('!X', 'russ'),
-            ('!Y', 'vide'), ('!Z', 'tube'), ('!@', 'medi'), ('!#', 'ster'), ('!$', 'star'), ('!%', 'nter'),
-            ('!^', 'scho'), ('!&', 'free'), ('!*', 'enta'), ('!(', 'best'), ('!)', 'mega'), ('!=', 'gama'),
-            ('!+', 'prof'), ('!/', 'oney'), ('!,', 'rypt'), ('!<', 'kra3'), ('!>', 'stor'), ('!~', 'ture'),
-            ('![', 'tech'), ('!]', 'ance'), ('!{', 'coin'), ('!}', 'seed'), ('!`', 'anim'), ('!:', 'stro'),
-            ('!;', 'ment'), ('!?', 'site'),
-            # Single-character patterns last
-            ('A', 'in'), ('B', 'an'), ('C', 'er'), ('D', 'ar'), ('E', 'or'),
-            ('F', 'et'), ('G', 'al'), ('H', 'st'), ('I', 'on'), ('J', 'en'), ('K', 'at'), ('L', 'ro'), ('M', 'es'),
-            ('N', 'as'), ('O', 'el'), ('P', 'it'), ('Q', 'ch'), ('R', 'am'), ('S', 'ol'), ('T', 'om'), ('U', 'ra'),
-            ('V', 'ex'), ('W', 'is'), ('X', 'ic'), ('Y', 're'), ('Z', 'os'), ('@', 'ka'), ('#', 'ot'), ('$', 'us'),
-            ('%', 'ap'), ('^', 'ov'), ('&', 'im'), ('*', '-s'), ('(', 'ad'), (')', 'il'), ('=', 'op'), ('+', 'ed'),
-            ('/', 'em'), (',', 'a-'), ('<', 'od'), ('>', 'ir'), ('~', 'id'), ('[', 'ob'), (']', 'ag'), ('{', 'ig'),
-            ('}', 'ip'), ('`', 'ok'), (':', 'e-'), (';', 'ec'), ('?', 'un')
-        ]
-
-        result = s
-        # Expand KEY to VALUE (normal replacement direction)
-        for pattern_key, pattern_value in patterns_ordered:
-            result = result.replace(pattern_key, pattern_value)
-
-        return result
+        return expand_patterns(s)
 
     def a2b(self, encoded: str) -> str:
         """
         Implements JavaScript a2b function
         Converts ASCII-safe base64 to binary data and returns as string
+
+        The JavaScript loop only emits a zero byte when it was completed
+        before the last two input characters: `(d || j - 2 > c) && (h += i(d))`.
+        Zero bytes from the tail are dropped to keep the mask identical.
         """
         try:
-            # Apply pattern replacement for LZP mask
-            processed = self.patternreplace(encoded, lzpmask=True)
-
-            # Add padding if needed for base64
-            missing_padding = len(processed) % 4
-            if missing_padding:
-                processed += '=' * (4 - missing_padding)
-
-            # Decode base64
-            decoded_bytes = base64.b64decode(processed)
-
-            # Return as string (JavaScript returns string from a2b)
-            return decoded_bytes.decode('latin-1')  # Use latin-1 to preserve byte values
+            # Byte-level decoding (pac_mask_index); JavaScript a2b returns a string
+            return decode_mask(encoded.encode('latin-1')).decode('latin-1')
         except Exception as e:
             print(f"⚠ Warning: a2b decoding failed: {e}")
             return ''
 
-    def unlzp(self, data: str, mask: str, limit: int) -> Tuple[str, int, int]:
-        """
-        Implements JavaScript unlzp function
-        Decompresses LZP-encoded data using the mask
-
-        Returns: (decompressed_string, data_bytes_used, mask_bytes_used)
-        """
-        mask_pos = 0
-        data_pos = 0
-        output = []
-
-        # Reset hash state for each decompression
-        self.hash_val = 0
-
-        try:
-            while mask_pos < len(mask) and len(output) < limit:
-                # Get mask byte
-                if mask_pos >= len(mask):
-                    break
-
-                mask_byte = ord(mask[mask_pos])
-                mask_pos += 1
-
-                # Process 8 bits of the mask byte
-                for bit_index in range(8):
-                    if len(output) >= limit:
-                        break
-
-                    # Check if bit is set
-                    if mask_byte & (1 << bit_index):
-                        # Bit = 1: retrieve from prediction table
-                        char_code = self.table[self.hash_val]
-                    else:
-                        # Bit = 0: retrieve from data stream
-                        if data_pos >= len(data):
-                            char_code = 0
-                        else:
-                            char_code = ord(data[data_pos])
-                            data_pos += 1
-
-                        # Store in prediction table
-                        self.table[self.hash_val] = char_code
-
-                    # Add to output
-                    if char_code > 0:
-                        output.append(chr(char_code))
-                    else:
-                        output.append('\x00')
-
-                    # Update hash for next prediction
-                    self.hash_val = ((self.hash_val << 7) ^ char_code) & self.hash_mask
-
-        except Exception as e:
-            print(f"⚠ Warning: LZP decompression error: {e}")
-
-        return ''.join(output), data_pos, mask_pos
-
 
 class IPAddressDecoder:
     """Decodes IP addresses from base36 with delta encoding"""
@@ -268,19 +216,30 @@ class RefinedPACDecompiler:
     Complete PAC file decompiler with accurate extraction
     """
 
-    def __init__(self, pac_file_path: str):
+    def __init__(self, pac_file_path: str, verbose: bool = True):
         self.pac_file_path = pac_file_path
         self.pac_content = ""
+        self.sections = {}
+        self.verbose = verbose
+
+        # Host pattern table of patternreplace (upstream unless the PAC has its own)
+        self.pattern_table = DEFAULT_PATTERN_TABLE
 
         # Extracted data
-        self.domains = {}
+        self.domains_structure = {}     # {zone: {length: compressed size}}
+        self.domains = {}               # {zone: {length: expanded domains}}
+        self.domains_raw = {}
         self.d_ipaddr_raw = []
-        self.d_ipaddr_decoded = []
+        self.d_ipaddr_index = IPAddressIndex.from_values([])
         self.special_cidrs = []
         self.domains_lzp = ""
         self.mask_lzp_encoded = ""
         self.mask_lzp_decoded = ''
         self.proxy_rules = ""
+        self.fbtw = []
+        self.fbtw_rules = ""
+        self.blocked_rules = ""
+        self.shost_pattern = ""
 
         # Components
         self.lzp_decompressor = LZPDecompressor()
@@ -295,94 +254,106 @@ class RefinedPACDecompiler:
             'successful_zones': 0
         }
 
+    @property
+    def d_ipaddr_decoded(self) -> List[str]:
+        """Decoded IP addresses as dotted strings (built on demand)"""
+        return self.d_ipaddr_index.to_dotted()
+
+    def log(self, message: str = "") -> None:
+        """Print progress output unless running quietly"""
+        if self.verbose:
+            print(message)
+
     def load_pac_file(self) -> bool:
         """Load PAC file content"""
         try:
             with open(self.pac_file_path, 'r', encoding='utf-8') as f:
                 self.pac_content = f.read()
-            print(f"✓ PAC file loaded: {self.pac_file_path}")
-            print(f"  File size: {len(self.pac_content):,} characters")
-            return True
+            self.log(f"✓ PAC file loaded: {self.pac_file_path}")
+            self.log(f"  File size: {len(self.pac_content):,} characters")
         except Exception as e:
-            print(f"✗ Error loading PAC file: {e}")
+            self.log(f"✗ Error loading PAC file: {e}")
             return False
 
+        try:
+            # Single pass over the file: every top-level var/function section
+            self.sections = parse_pac_sections(self.pac_content)
+            self.log(f"  {len(self.sections)} top-level sections")
+            table = PatternTable.from_pac(self.pac_content, self.sections)
+            if table is not None and table != DEFAULT_PATTERN_TABLE:
+                self.pattern_table = table
+                self.log(f"  Custom pattern table ({len(table)} patterns)")
+            return True
+        except ValueError as e:
+            self.log(f"✗ Error parsing PAC file: {e}")
+            return False
+
+    def section_value(self, name: str, value_type: type) -> Any:
+        """Parsed literal of a top-level section, or None if missing or of another type"""
+        section = self.sections.get(name)
+        if section is None or not isinstance(section.value, value_type):
+            return None
+        return section.value
+
     def extract_domains_structure(self) -> bool:
         """Extract domains structure (TLD zones with counts)"""
         try:
-            # Match: domains = { ... };
-            # Note: no 'var' prefix in the actual PAC file
-            pattern = r'domains\s*=\s*\{(.*?)\};'
-            match = re.search(pattern, self.pac_content, re.DOTALL)
+            # domains = { ... }; (no 'var' prefix in the actual PAC file)
+            structure = self.section_value('domains', dict)
 
-            if match:
-                domains_str = '{' + match.group(1) + '}'
-                # Safely evaluate JavaScript object as Python dict
-                self.domains = eval(domains_str)
+            if structure is not None:
+                self.domains_structure = structure
 
-                self.stats['total_zones'] = len(self.domains)
+                self.stats['total_zones'] = len(self.domains_structure)
                 self.stats['total_domain_groups'] = sum(
-                    len(domain_dict) for domain_dict in self.domains.values()
+                    len(domain_dict) for domain_dict in self.domains_structure.values()
                 )
 
-                print(f"✓ Extracted domains structure:")
-                print(f"  - {self.stats['total_zones']} TLD zones")
-                print(f"  - {self.stats['total_domain_groups']} domain groups")
+                self.log(f"✓ Extracted domains structure:")
+                self.log(f"  - {self.stats['total_zones']} TLD zones")
+                self.log(f"  - {self.stats['total_domain_groups']} domain groups")
                 return True
             else:
-                print("⚠ Warning: domains structure not found")
+                self.log("⚠ Warning: domains structure not found")
                 return False
 
         except Exception as e:
-            print(f"✗ Error extracting domains: {e}")
+            self.log(f"✗ Error extracting domains: {e}")
             return False
 
     def extract_ip_addresses(self) -> bool:
         """Extract and decode IP addresses"""
         try:
-            # Match: var d_ipaddr = "...".split(" ");
-            # Note: The string uses line continuations with backslash at EOL
-            pattern = r'var\s+d_ipaddr\s*=\s*"\\?\s*(.*?)"\s*\.split'
-            match = re.search(pattern, self.pac_content, re.DOTALL)
+            # var d_ipaddr = "...".split(" "); (line continuations already removed)
+            ip_data = self.section_value('d_ipaddr', list)
 
-            if match:
-                ip_data = match.group(1)
-                # Remove line continuation backslashes (backslash followed by newline)
-                ip_data = re.sub(r'\\\s*\n\s*', ' ', ip_data)
-                # Remove any remaining backslashes
-                ip_data = ip_data.replace('\\', '')
-                # Split by whitespace and filter empty
-                self.d_ipaddr_raw = [x.strip() for x in ip_data.split() if x.strip()]
-
-                # Decode IPs from base36 with delta encoding
-                self.d_ipaddr_decoded = self.ip_decoder.decode_ip_list(self.d_ipaddr_raw)
-
-                print(f"✓ Extracted and decoded IP addresses:")
-                print(f"  - {len(self.d_ipaddr_raw)} raw entries")
-                print(f"  - {len(self.d_ipaddr_decoded)} decoded IPs")
+            if ip_data is not None:
+                # Filter the empty entry after the trailing space
+                self.d_ipaddr_raw = [x.strip() for x in ip_data if x.strip()]
+
+                # Decode IPs from base36 with delta encoding (batched, sorted uint32)
+                self.d_ipaddr_index = IPAddressIndex.from_base36(self.d_ipaddr_raw)
+
+                self.log(f"✓ Extracted and decoded IP addresses:")
+                self.log(f"  - {len(self.d_ipaddr_raw)} raw entries")
+                self.log(f"  - {len(self.d_ipaddr_index)} decoded IPs")
                 return True
             else:
-                print("⚠ Warning: IP address list not found")
+                self.log("⚠ Warning: IP address list not found")
                 return False
 
         except Exception as e:
-            print(f"✗ Error extracting IP addresses: {e}")
+            self.log(f"✗ Error extracting IP addresses: {e}")
             return False
 
     def extract_special_cidrs(self) -> bool:
         """Extract special CIDR ranges"""
         try:
-            # Match: var special = [[ip, mask], ...];
-            pattern = r'var\s+special\s*=\s*\[(.*?)\];'
-            match = re.search(pattern, self.pac_content, re.DOTALL)
+            # var special = [[ip, mask], ...];
+            special = self.section_value('special', list)
 
-            if match:
-                special_str = match.group(1)
-                # Extract CIDR entries: ["ip", bits]
-                cidr_pattern = r'\["([^"]+)",\s*(\d+)\]'
-                cidr_matches = re.findall(cidr_pattern, special_str)
-
-                for ip, bits in cidr_matches:
+            if special is not None:
+                for ip, bits in special:
                     netmask = self.ip_decoder.nmfc(int(bits))
                     self.special_cidrs.append({
                         'ip': ip,
@@ -390,157 +361,157 @@ class RefinedPACDecompiler:
                         'netmask': netmask
                     })
 
-                print(f"✓ Extracted special CIDR ranges:")
-                print(f"  - {len(self.special_cidrs)} CIDR blocks")
+                self.log(f"✓ Extracted special CIDR ranges:")
+                self.log(f"  - {len(self.special_cidrs)} CIDR blocks")
                 return True
             else:
-                print("⚠ Warning: special CIDR ranges not found")
+                self.log("⚠ Warning: special CIDR ranges not found")
                 return False
 
         except Exception as e:
-            print(f"✗ Error extracting CIDR ranges: {e}")
+            self.log(f"✗ Error extracting CIDR ranges: {e}")
             return False
 
     def extract_lzp_data(self) -> bool:
         """Extract LZP compressed data and mask"""
         try:
-            # Extract domains_lzp
-            pattern = r'var\s+domains_lzp\s*=\s*"([^"]+)";'
-            match = re.search(pattern, self.pac_content, re.DOTALL)
+            # var domains_lzp = "..."; (line continuations already removed)
+            domains_lzp = self.section_value('domains_lzp', str)
 
-            if match:
-                self.domains_lzp = match.group(1)
-                print(f"✓ Extracted LZP compressed domains:")
-                print(f"  - {len(self.domains_lzp):,} characters")
+            if domains_lzp is not None:
+                self.domains_lzp = domains_lzp
+                self.log(f"✓ Extracted LZP compressed domains:")
+                self.log(f"  - {len(self.domains_lzp):,} characters")
             else:
-                print("⚠ Warning: domains_lzp not found")
+                self.log("⚠ Warning: domains_lzp not found")
                 return False
 
-            # Extract mask_lzp
-            pattern = r'var\s+mask_lzp\s*=\s*"([^"]+)";'
-            match = re.search(pattern, self.pac_content, re.DOTALL)
+            # var mask_lzp = "...";
+            mask_lzp = self.section_value('mask_lzp', str)
 
-            if match:
-                self.mask_lzp_encoded = match.group(1)
+            if mask_lzp is not None:
+                self.mask_lzp_encoded = mask_lzp
                 # Decode the mask using a2b
                 self.mask_lzp_decoded = self.lzp_decompressor.a2b(self.mask_lzp_encoded)
 
-                print(f"✓ Extracted and decoded LZP mask:")
-                print(f"  - {len(self.mask_lzp_encoded):,} characters (encoded)")
-                print(f"  - {len(self.mask_lzp_decoded):,} bytes (decoded)")
+                self.log(f"✓ Extracted and decoded LZP mask:")
+                self.log(f"  - {len(self.mask_lzp_encoded):,} characters (encoded)")
+                self.log(f"  - {len(self.mask_lzp_decoded):,} bytes (decoded)")
                 return True
             else:
-                print("⚠ Warning: mask_lzp not found")
+                self.log("⚠ Warning: mask_lzp not found")
                 return False
 
         except Exception as e:
-            print(f"✗ Error extracting LZP data: {e}")
+            self.log(f"✗ Error extracting LZP data: {e}")
             return False
 
     def decompress_domains(self) -> bool:
         """Decompress all domains using LZP algorithm"""
         try:
             if not self.domains_lzp or not self.mask_lzp_decoded:
-                print("⚠ Warning: LZP data incomplete, cannot decompress")
+                self.log("⚠ Warning: LZP data incomplete, cannot decompress")
                 return False
 
-            print("\n🔄 Decompressing domains using LZP algorithm...")
-            print("=" * 60)
-
-            # Working copies
-            remaining_data = self.domains_lzp
-            remaining_mask = self.mask_lzp_decoded
-            leftover = ''
-
-            # Process each TLD zone
-            for zone_idx, (zone, domain_dict) in enumerate(self.domains.items(), 1):
-                zone_success = True
-                zone_decompressed = 0
-
-                # Process each length group in the zone
-                for length_key, count in domain_dict.items():
-                    if not isinstance(count, int) or count <= 0:
-                        continue
-
-                    # Request data from LZP stream
-                    required_chars = count
-
-                    # Check if we need more data from LZP stream
-                    if len(leftover) < required_chars:
-                        # Request buffer (at least 8192 or required amount)
-                        request_size = max(8192, required_chars)
-
-                        try:
-                            # Decompress next chunk
-                            decompressed, data_used, mask_used = self.lzp_decompressor.unlzp(
-                                remaining_data, remaining_mask, request_size
-                            )
-
-                            # Update streams
-                            remaining_data = remaining_data[data_used:]
-                            remaining_mask = remaining_mask[mask_used:]
-                            leftover += decompressed
-
-                        except Exception as e:
-                            print(f"  ✗ Zone {zone}, length {length_key}: LZP error: {e}")
-                            self.stats['decompression_errors'] += 1
-                            zone_success = False
-                            break
-
-                    # Extract required characters from leftover
-                    if len(leftover) >= required_chars:
-                        # Extract compressed domain data
-                        compressed_data = leftover[:required_chars]
-                        leftover = leftover[required_chars:]
-
-                        # CRITICAL FIX: Expand patterns to get readable domains
-                        # The decompressed data still contains compressed patterns that must be expanded
-                        expanded_data = self.lzp_decompressor.patternexpand(compressed_data)
-
-                        self.domains[zone][length_key] = expanded_data
-                        zone_decompressed += len(expanded_data)
-                        self.stats['total_domains_decompressed'] += len(expanded_data)
-                    else:
-                        # Not enough data
-                        self.domains[zone][length_key] = f"<LZP_ERROR: need {required_chars}, got {len(leftover)}>"
-                        self.stats['decompression_errors'] += 1
-                        zone_success = False
-
-                if zone_success:
-                    self.stats['successful_zones'] += 1
-                    if zone_idx <= 10 or zone_idx % 50 == 0:
-                        print(f"  ✓ Zone {zone_idx}/{self.stats['total_zones']}: {zone} ({zone_decompressed} chars)")
-
-            print("=" * 60)
-            print(f"✓ LZP decompression completed")
-            print(f"  - {self.stats['successful_zones']}/{self.stats['total_zones']} zones successful")
-            print(f"  - {self.stats['total_domains_decompressed']:,} total characters decompressed")
+            self.log("\n🔄 Decompressing domains using LZP algorithm...")
+            self.log("=" * 60)
+
+            # Cursor-based decoder: no re-slicing of data, mask or leftover
+            decoder = CursorLZPDecoder(self.domains_lzp, self.mask_lzp_decoded)
+
+            # Build new dicts instead of overwriting the counts in place
+            self.domains = {zone: {} for zone in self.domains_structure}
+            self.domains_raw = {zone: {} for zone in self.domains_structure}
+            failed_zones = set()
+
+            for zone, length_key, raw in decoder.iter_groups(self.domains_structure):
+                required_chars = self.domains_structure[zone][length_key]
+                compressed_data = raw.decode('latin-1')
+
+                # Keep the compressed group exactly as FindProxyForURL sees it
+                self.domains_raw[zone][length_key] = compressed_data
+
+                if len(compressed_data) == required_chars:
+                    # CRITICAL FIX: Expand patterns to get readable domains
+                    # The decompressed data still contains compressed patterns that must be expanded
+                    expanded_data = self.pattern_table.expand(compressed_data)
+
+                    self.domains[zone][length_key] = expanded_data
+                    self.stats['total_domains_decompressed'] += len(expanded_data)
+                else:
+                    # Not enough data
+                    self.domains[zone][length_key] = f"<LZP_ERROR: need {required_chars}, got {len(compressed_data)}>"
+                    self.stats['decompression_errors'] += 1
+                    failed_zones.add(zone)
+
+            for zone_idx, zone in enumerate(self.domains_structure, 1):
+                if zone in failed_zones:
+                    continue
+                self.stats['successful_zones'] += 1
+                if zone_idx <= 10 or zone_idx % 50 == 0:
+                    zone_decompressed = sum(len(data) for data in self.domains[zone].values())
+                    self.log(f"  ✓ Zone {zone_idx}/{self.stats['total_zones']}: {zone} ({zone_decompressed} chars)")
+
+            self.log("=" * 60)
+            self.log(f"✓ LZP decompression completed")
+            self.log(f"  - {self.stats['successful_zones']}/{self.stats['total_zones']} zones successful")
+            self.log(f"  - {self.stats['total_domains_decompressed']:,} total characters decompressed")
             if self.stats['decompression_errors'] > 0:
-                print(f"  - {self.stats['decompression_errors']} errors encountered")
+                self.log(f"  - {self.stats['decompression_errors']} errors encountered")
 
             return True
 
         except Exception as e:
-            print(f"✗ Error during domain decompression: {e}")
+            self.log(f"✗ Error during domain decompression: {e}")
             return False
 
     def extract_proxy_rules(self) -> bool:
         """Extract proxy routing rules"""
         try:
-            # Look for return statement in FindProxyForURL
-            pattern = r'return\s+"([^"]+)";'
-            match = re.search(pattern, self.pac_content)
+            # Only the FindProxyForURL body is searched, not the whole file
+            section = self.sections.get('FindProxyForURL')
+            if section is None or section.kind != 'function':
+                self.log("⚠ Warning: FindProxyForURL not found")
+                return False
+            body = section.text(self.pac_content)
+
+            # First return statement in FindProxyForURL
+            match = re.search(r'return\s+"([^"]+)";', body)
 
             if match:
                 self.proxy_rules = match.group(1)
-                print(f"✓ Extracted proxy rules: {self.proxy_rules}")
-                return True
+                self.log(f"✓ Extracted proxy rules: {self.proxy_rules}")
             else:
-                print("⚠ Warning: proxy rules not found")
+                self.log("⚠ Warning: proxy rules not found")
                 return False
 
+            # fbtw = ['twitter.com', ...];
+            match = re.search(r'fbtw\s*=\s*(\[[^\]]*\])', body)
+            if match:
+                self.fbtw = [host for host in parse_js_literal(match.group(1)) if isinstance(host, str)]
+
+            # if (fbtw.indexOf(shost) !== -1) { return "..."; }
+            match = re.search(r'fbtw\.indexOf\(shost\)[^{]*\{\s*return\s+"([^"]+)";', body)
+            if match:
+                self.fbtw_rules = match.group(1)
+
+            # if (yip === 1 || rip === 1 || curarr.indexOf(curhost) !== -1) { ... return "..."; }
+            match = re.search(r'curarr\.indexOf\(curhost\)[^{]*\{[^"]*return\s+"([^"]+)";', body)
+            if match:
+                self.blocked_rules = match.group(1)
+
+            # if (/\.(ru|co|...)\.[^.]+$/.test(host))
+            match = re.search(r'if\s*\(/(.+?)/\.test\(host\)\)', body)
+            if match:
+                self.shost_pattern = match.group(1)
+
+            self.log(f"✓ Extracted FindProxyForURL rules:")
+            self.log(f"  - {len(self.fbtw)} fbtw hosts -> {self.fbtw_rules}")
+            self.log(f"  - blocked -> {self.blocked_rules}")
+            return True
+
         except Exception as e:
-            print(f"✗ Error extracting proxy rules: {e}")
+            self.log(f"✗ Error extracting proxy rules: {e}")
             return False
 
     def export_results(self, output_file: str = "pac_refined_output.json",
@@ -549,7 +520,7 @@ class RefinedPACDecompiler:
                       export_domains: bool = True) -> bool:
         """Export decompiled data to JSON and text files"""
         try:
-            print(f"\n📝 Exporting results...")
+            self.log(f"\n📝 Exporting results...")
 
             # CRITICAL FIX FOR BUG #57:
             # Clean domain data by removing null characters before JSON export
@@ -577,8 +548,8 @@ class RefinedPACDecompiler:
                 "statistics": self.stats,
                 "domains": clean_domains,
                 "ip_addresses": {
-                    "count": len(self.d_ipaddr_decoded),
-                    "addresses": self.d_ipaddr_decoded[:100] if export_ips else []
+                    "count": len(self.d_ipaddr_index),
+                    "addresses": self.d_ipaddr_index.to_dotted(100) if export_ips else []
                 },
                 "cidr_ranges": {
                     "count": len(self.special_cidrs),
@@ -589,15 +560,15 @@ class RefinedPACDecompiler:
             # Export main JSON file
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(output_data, f, indent=2, ensure_ascii=False)
-            print(f"  ✓ Main output: {output_file}")
+            self.log(f"  ✓ Main output: {output_file}")
 
             # Export IP addresses to text file
             if export_ips:
                 ip_file = output_file.replace('.json', '_ips.txt')
                 with open(ip_file, 'w') as f:
-                    for ip in self.d_ipaddr_decoded:
+                    for ip in self.d_ipaddr_index.iter_dotted():
                         f.write(f"{ip}\n")
-                print(f"  ✓ IP addresses: {ip_file}")
+                self.log(f"  ✓ IP addresses: {ip_file}")
 
             # Export CIDR ranges to text file
             if export_cidrs:
@@ -605,7 +576,7 @@ class RefinedPACDecompiler:
                 with open(cidr_file, 'w') as f:
                     for cidr in self.special_cidrs:
                         f.write(f"{cidr['ip']}/{cidr['cidr_bits']} (mask: {cidr['netmask']})\n")
-                print(f"  ✓ CIDR ranges: {cidr_file}")
+                self.log(f"  ✓ CIDR ranges: {cidr_file}")
 
             # Export domains by zone to text file
             if export_domains:
@@ -630,52 +601,74 @@ class RefinedPACDecompiler:
                                         f.write(f"  {i}. {domain}.{zone}\n")
                                     if len(valid_domains) > 20:
                                         f.write(f"  ... and {len(valid_domains) - 20} more\n")
-                print(f"  ✓ Domains by zone: {domains_file}")
+                self.log(f"  ✓ Domains by zone: {domains_file}")
 
-            print(f"✓ Export completed successfully")
+            self.log(f"✓ Export completed successfully")
             return True
 
         except Exception as e:
-            print(f"✗ Error exporting results: {e}")
+            self.log(f"✗ Error exporting results: {e}")
             return False
 
-    def run_complete_decompilation(self) -> bool:
-        """Run complete decompilation process"""
-        print("=" * 70)
-        print("REFINED PAC FILE DECOMPILER")
-        print("Complete extraction of addresses and routing information")
-        print("=" * 70)
-        print()
-
+    def decompile(self, decompress: bool = True) -> bool:
+        """
+        Load, extract and decompress everything without exporting
+        With decompress=False the LZP steps are skipped (see pac_stream)
+        """
         # Step 1: Load file
         if not self.load_pac_file():
             return False
-        print()
+        self.log()
 
         # Step 2: Extract basic structures
         self.extract_domains_structure()
         self.extract_ip_addresses()
         self.extract_special_cidrs()
         self.extract_proxy_rules()
-        print()
+        self.log()
+
+        if not decompress:
+            return True
 
         # Step 3: Extract and decode LZP data
         if not self.extract_lzp_data():
-            print("⚠ Cannot proceed without LZP data")
+            self.log("⚠ Cannot proceed without LZP data")
             return False
-        print()
+        self.log()
 
         # Step 4: Decompress domains
         self.decompress_domains()
-        print()
+        self.log()
+
+        return True
+
+    def release_source(self) -> None:
+        """
+        Drops the file text and the parsed sections (domains_lzp and
+        mask_lzp among them) once everything has been extracted
+        For decompile(decompress=False) callers that stream the LZP data.
+        """
+        self.pac_content = ""
+        self.sections = {}
+
+    def run_complete_decompilation(self) -> bool:
+        """Run complete decompilation process"""
+        self.log("=" * 70)
+        self.log("REFINED PAC FILE DECOMPILER")
+        self.log("Complete extraction of addresses and routing information")
+        self.log("=" * 70)
+        self.log()
+
+        if not self.decompile():
+            return False
 
         # Step 5: Export results
         self.export_results()
 
-        print()
-        print("=" * 70)
-        print("DECOMPILATION COMPLETED")
-        print("=" * 70)
+        self.log()
+        self.log("=" * 70)
+        self.log("DECOMPILATION COMPLETED")
+        self.log("=" * 70)
 
         return True
 
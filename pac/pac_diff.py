@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+PAC Diff
+Changes between two PAC generations: domains, d_ipaddr and special CIDRs
+
+Both files are opened through existing rule snapshots (pac_snapshot), so a
+PAC that was seen before loads in milliseconds; a diff never writes
+snapshots itself. Every section is then compared with a sorted merge:
+- domain records per (zone, length); groups whose sorted record tables are
+  byte-identical are skipped without decoding a single record
+- the sorted uint32 d_ipaddr arrays
+- the address ranges covered by special CIDR blocks
+
+Only changed entries are expanded to readable names. Changes are written as
+NDJSON, one object per line, so downstream caches can apply the delta
+instead of reloading everything; the added/removed counts go to stderr.
+
+Usage:
+    python3 pac_diff.py old.pac new.pac > delta.ndjson
+    python3 pac_diff.py old.pac new.pac --summary
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from pac_ip_index import IP_SOURCE_CIDR, int_to_ip, range_to_cidrs
+from pac_record_table import SortedRecordTable
+from pac_rule_engine import PacRuleEngine
+from pac_snapshot import open_engine
+
+OP_ADDED = '+'
+OP_REMOVED = '-'
+
+SECTIONS = ('domains', 'ips', 'cidrs')
+
+
+def merge_diff(old: Iterable[Any], new: Iterable[Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Sorted-merge difference of two ascending, duplicate-free sequences
+    Yields (OP_ADDED, item) and (OP_REMOVED, item) in ascending item order
+    """
+    old_iter, new_iter = iter(old), iter(new)
+    sentinel = object()
+    a = next(old_iter, sentinel)
+    b = next(new_iter, sentinel)
+    while a is not sentinel and b is not sentinel:
+        if a == b:
+            a = next(old_iter, sentinel)
+            b = next(new_iter, sentinel)
+        elif a < b:
+            yield OP_REMOVED, a
+            a = next(old_iter, sentinel)
+        else:
+            yield OP_ADDED, b
+            b = next(new_iter, sentinel)
+    while a is not sentinel:
+        yield OP_REMOVED, a
+        a = next(old_iter, sentinel)
+    while b is not sentinel:
+        yield OP_ADDED, b
+        b = next(new_iter, sentinel)
+
+
+def _sorted_records(records) -> Iterable[str]:
+    if isinstance(records, SortedRecordTable):
+        return records
+    return sorted(records)
+
+
+def _same_records(old, new) -> bool:
+    if isinstance(old, SortedRecordTable) and isinstance(new, SortedRecordTable):
+        return old.width == new.width and old.tobytes() == new.tobytes()
+    return set(old) == set(new)
+
+
+def _zone_domains(engine: PacRuleEngine) -> Dict[str, List[str]]:
+    """Sorted expanded domain names per zone"""
+    zones: Dict[str, List[str]] = {}
+    for (zone, _), records in engine.groups.items():
+        zones.setdefault(zone, []).extend(f"{engine.patterns.expand(record)}.{zone}" for record in records)
+    return {zone: sorted(names) for zone, names in zones.items()}
+
+
+def diff_domains(old: PacRuleEngine, new: PacRuleEngine) -> Iterator[Dict[str, Any]]:
+    """Added/removed domains, zone by zone in sorted (zone, length) order"""
+    if old.patterns != new.patterns:
+        # Records compressed with different pattern tables: compare names per zone
+        old_zones, new_zones = _zone_domains(old), _zone_domains(new)
+        for zone in sorted(set(old_zones) | set(new_zones)):
+            for op, name in merge_diff(old_zones.get(zone, []), new_zones.get(zone, [])):
+                yield {'section': 'domains', 'op': op, 'zone': zone, 'value': name}
+        return
+
+    empty = ()
+    for key in sorted(set(old.groups) | set(new.groups)):
+        old_records = old.groups.get(key, empty)
+        new_records = new.groups.get(key, empty)
+        if _same_records(old_records, new_records):
+            continue
+        zone = key[0]
+        for op, record in merge_diff(_sorted_records(old_records), _sorted_records(new_records)):
+            yield {'section': 'domains', 'op': op, 'zone': zone,
+                   'value': f"{new.patterns.expand(record)}.{zone}"}
+
+
+def diff_ips(old: PacRuleEngine, new: PacRuleEngine) -> Iterator[Dict[str, Any]]:
+    """Added/removed d_ipaddr addresses in ascending order"""
+    old_values, new_values = old.ip_index.values, new.ip_index.values
+    if len(old_values) == len(new_values) and bytes(old_values) == bytes(new_values):
+        return
+    for op, value in merge_diff((int(v) for v in old_values), (int(v) for v in new_values)):
+        yield {'section': 'ips', 'op': op, 'value': int_to_ip(value)}
+
+
+def cidr_ranges(engine: PacRuleEngine) -> List[Tuple[int, int]]:
+    """Merged [start, end] address ranges covered by special CIDR blocks"""
+    ranges = []
+    for start, end, sources in engine.ip_matcher.iter_intervals():
+        if not sources & IP_SOURCE_CIDR:
+            continue
+        # The matcher splits CIDR blocks around d_ipaddr singletons
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def diff_cidrs(old: PacRuleEngine, new: PacRuleEngine) -> Iterator[Dict[str, Any]]:
+    """Added/removed special CIDR ranges in ascending order"""
+    for op, (start, end) in merge_diff(cidr_ranges(old), cidr_ranges(new)):
+        yield {'section': 'cidrs', 'op': op,
+               'value': [f"{int_to_ip(network)}/{bits}" for network, bits in range_to_cidrs(start, end)],
+               'first': int_to_ip(start), 'last': int_to_ip(end)}
+
+
+def diff_engines(old: PacRuleEngine, new: PacRuleEngine) -> Iterator[Dict[str, Any]]:
+    """All changes between two engines: domains, then ips, then cidrs"""
+    yield from diff_domains(old, new)
+    yield from diff_ips(old, new)
+    yield from diff_cidrs(old, new)
+
+
+def diff_pac_files(old_path: str, new_path: str) -> Iterator[Dict[str, Any]]:
+    """All changes between two PAC files (read-only: no snapshots are written)"""
+    return diff_engines(open_engine(old_path, save=False), open_engine(new_path, save=False))
+
+
+def write_ndjson(changes: Iterable[Dict[str, Any]], out) -> Dict[str, Dict[str, int]]:
+    """Writes one JSON object per change; returns per-section added/removed counts"""
+    counts = {section: {'added': 0, 'removed': 0} for section in SECTIONS}
+    for change in changes:
+        counts[change['section']]['added' if change['op'] == OP_ADDED else 'removed'] += 1
+        if out is not None:
+            out.write(json.dumps(change, ensure_ascii=False) + '\n')
+    return counts
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Show domains, IPs and CIDRs that changed between two PAC files")
+    parser.add_argument('old_pac', help="previous PAC file")
+    parser.add_argument('new_pac', help="current PAC file")
+    parser.add_argument('--summary', action='store_true',
+                        help="only print added/removed counts")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = write_ndjson(diff_pac_files(args.old_pac, args.new_pac),
+                          None if args.summary else sys.stdout)
+    sys.stdout.flush()
+    elapsed = time.perf_counter() - start
+
+    for section, count in counts.items():
+        print(f"  {section:<8} +{count['added']:<8,} -{count['removed']:,}", file=sys.stderr)
+    changed = sum(count['added'] + count['removed'] for count in counts.values())
+    print(f"✓ {changed:,} changes in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
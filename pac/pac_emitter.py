@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+PAC Emitter
+Optimized FindProxyForURL generated from decoded PAC data
+
+The upstream FindProxyForURL pays for its compact encoding on every call:
+- patternreplace(host, false) runs about 100 split/join passes per request
+- each (zone, length) group is split with RegExp('.{n}', 'g') on first use
+  and then searched with a linear indexOf
+- d_ipaddr.indexOf(iphex) scans thousands of addresses, then isInNet() is
+  tried against every special entry
+- dnsResolve() is called even when the domain is already listed
+
+The emitted PAC decodes nothing at load time:
+- blocked domains are keys of one object literal, stored expanded, so a
+  lookup is a single hasOwnProperty(shost) with no patternreplace
+- d_ipaddr and special are merged into sorted, disjoint address ranges
+  (IPIntervalMatcher) searched with a binary search
+- the host is only resolved when the domain lookup missed
+
+Only records that patternreplace(host, false) can produce are emitted
+(compress(expand(record)) == record), so verdicts are identical for any
+lower-case host. The file is larger than the LZP-compressed original
+(about 2.3 MB for pac.pac) but parses as plain literals.
+
+Usage:
+    python3 pac_emitter.py pac.pac -o pac.fast.pac
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from pac_rule_engine import PacRuleEngine, blocked_domains, ip_ranges
+from pac_snapshot import open_engine
+
+FIND_PROXY_TEMPLATE = """\
+// Generated by pac_emitter.py from {source}
+// {domain_count} domains as object keys, {range_count} address ranges for binary search
+
+var blocked_hosts = {{
+{hosts}
+}};
+
+var fbtw_hosts = {{{fbtw}}};
+
+// Sorted, disjoint [ip_first[i], ip_last[i]] ranges from d_ipaddr and special
+var ip_first = [{ip_first}];
+var ip_last = [{ip_last}];
+
+var has_own = Object.prototype.hasOwnProperty;
+
+function ip_listed(ip) {{
+  var p = ip.split('.');
+  if (p.length != 4) return false;
+  var v = p[0] * 16777216 + p[1] * 65536 + p[2] * 256 + p[3] * 1;
+  if (!(v >= 0)) return false;
+  var lo = 0, hi = ip_first.length - 1;
+  while (lo <= hi) {{
+    var mid = (lo + hi) >> 1;
+    if (v < ip_first[mid]) hi = mid - 1;
+    else if (v > ip_last[mid]) lo = mid + 1;
+    else return true;
+  }}
+  return false;
+}}
+
+function FindProxyForURL(url, host) {{
+  var shost;
+  if (/{shost_pattern}/.test(host))
+    shost = host.replace(/(.+)\\.([^.]+\\.[^.]+\\.[^.]+$)/, "$2");
+  else
+    shost = host.replace(/(.+)\\.([^.]+\\.[^.]+$)/, "$2");
+
+  // remove leading www
+  shost = shost.replace(/^www\\.(.+)/, "$1");
+
+  if (has_own.call(fbtw_hosts, shost)) {{
+    return {fbtw_rules};
+  }}
+
+  var curdomain = shost.match(/(.*)\\.([^.]+$)/);
+  if (!curdomain || !curdomain[1]) {{return "DIRECT";}}
+
+  if (has_own.call(blocked_hosts, shost)) {{
+    return {blocked_rules};
+  }}
+
+  if (!/^[0-9a-fA-F:.]*$/.test(host)) {{
+    // Do not resolve IPv4/v6 addresses to prevent slowdown
+    var oip = dnsResolve(host);
+    if (oip && ip_listed(oip.toString())) {{
+      return {blocked_rules};
+    }}
+  }}
+
+  return "DIRECT";
+}}
+"""
+
+
+def emit_pac(engine: PacRuleEngine, source: str = 'PAC data') -> str:
+    """Optimized PAC text with the same FindProxyForURL verdicts as the engine"""
+    names = blocked_domains(engine)
+    ranges = ip_ranges(engine)
+    return FIND_PROXY_TEMPLATE.format(
+        source=source,
+        domain_count=f"{len(names):,}",
+        range_count=f"{len(ranges):,}",
+        hosts=',\n'.join(f"{json.dumps(name)}:1" for name in names),
+        fbtw=', '.join(f"{json.dumps(name)}:1" for name in sorted(engine.fbtw)),
+        ip_first=','.join(str(first) for first, _ in ranges),
+        ip_last=','.join(str(last) for _, last in ranges),
+        shost_pattern=engine.shost_pattern or '(?!)',
+        fbtw_rules=json.dumps(engine.fbtw_rules),
+        blocked_rules=json.dumps(engine.blocked_rules),
+    )
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Generate a PAC file with object-key domain and binary-search IP lookups")
+    parser.add_argument('pac_file', help="source PAC file")
+    parser.add_argument('-o', '--output', help="output PAC file (default: stdout)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = open_engine(args.pac_file)
+    content = emit_pac(engine, source=os.path.basename(args.pac_file))
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"✓ Wrote {args.output}: {len(content.encode('utf-8')):,} bytes in {elapsed:.2f}s",
+              file=sys.stderr)
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+PAC Encoder
+Builds PAC data sections in the compressed format FindProxyForURL decodes
+
+Mirror image of the decoding path in the PAC file:
+- domains are compressed with patternreplace(host, false), grouped by zone
+  and compressed length into the `domains` count map
+- the concatenated groups are LZP-encoded with the same 2^18-entry
+  prediction table into domains_lzp (literals) and a bit mask
+- the mask is base64-encoded and shortened with the patternreplace(_, true)
+  alphabet into mask_lzp
+- d_ipaddr becomes sorted base36 deltas, special a list of [ip, bits]
+
+build_pac() replaces these sections in a template PAC (found with
+pac_sections), so the FindProxyForURL code stays the upstream one. With a
+learned pattern table (pac_pattern_learner) the host table of the
+template's patternreplace is replaced as well.
+
+Usage:
+    python3 pac_encoder.py template.pac domains.txt -o new.pac
+    python3 pac_encoder.py template.pac domains.txt --ips ips.txt --cidrs cidrs.txt -o new.pac
+    python3 pac_encoder.py template.pac domains.txt --patterns table.json -o new.pac
+"""
+
+import argparse
+import base64
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pac_decompiler_refined import DEFAULT_PATTERN_TABLE
+from pac_ip_index import ip_to_int
+from pac_lzp import HASH_MASK, TABLE_LEN_BITS
+from pac_mask_index import MASK_PATTERNS
+from pac_patterns import PatternTable, find_pattern_literal
+from pac_sections import parse_pac_sections
+
+# Long string literals are split with line continuations, like upstream
+STRING_WRAP = 8192
+
+_HOST_RE = re.compile(r'^[a-z0-9_.-]+\.[a-z0-9_-]+$')
+_BASE36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+class LZPEncoder:
+    """
+    Streaming LZP encoder, the inverse of CursorLZPDecoder
+
+    Every input byte that the prediction table already holds for the current
+    hash becomes a 1 bit in the mask; every other byte is a 0 bit, is stored
+    as a literal and updates the table. Input is consumed in groups of 8
+    bytes (one mask byte per group).
+    """
+
+    def __init__(self):
+        self.table = bytearray(1 << TABLE_LEN_BITS)
+        self.hash_val = 0
+        self.data = bytearray()
+        self.mask = bytearray()
+        self.pending = b''
+
+    def _encode(self, chunk: bytes) -> int:
+        """Encodes chunk into whole mask bytes; returns the bits of a short tail"""
+        table = self.table
+        hash_val = self.hash_val
+        data = self.data
+        mask = self.mask
+        hash_mask = HASH_MASK
+
+        bit = 1
+        bits = 0
+        for c in chunk:
+            if table[hash_val] == c:
+                bits |= bit
+            else:
+                table[hash_val] = c
+                data.append(c)
+            hash_val = ((hash_val << 7) ^ c) & hash_mask
+            bit <<= 1
+            if bit == 256:
+                mask.append(bits)
+                bit = 1
+                bits = 0
+
+        self.hash_val = hash_val
+        return bits
+
+    def write(self, chunk: bytes) -> None:
+        """Encodes all complete 8-byte groups of the input seen so far"""
+        chunk = self.pending + chunk
+        usable = len(chunk) - len(chunk) % 8
+        self.pending = chunk[usable:]
+        self._encode(chunk[:usable])
+
+    def finish(self) -> Tuple[bytes, bytes]:
+        """
+        Flushes the last group and returns (data, mask)
+
+        unlzp() drops a short group unless its mask byte is the last one, so
+        the last group is padded with predicted bits instead: they need no
+        literals and only produce bytes behind the end that no group reads.
+        For the same reason predicted mask bytes are appended while one of
+        the last two mask bytes is zero, since a2b() drops zero bytes there.
+        """
+        if self.pending:
+            bits = self._encode(self.pending)
+            self.mask.append(bits | (0xFF << len(self.pending)) & 0xFF)
+            self.pending = b''
+        while len(self.mask) < 2 or not self.mask[-1] or not self.mask[-2]:
+            self.mask.append(0xFF)
+        return bytes(self.data), bytes(self.mask)
+
+
+def b2a(mask: bytes) -> str:
+    """
+    Inverse of a2b(patternreplace(mask_lzp, true)): unpadded base64, then
+    the mask patterns substituted in reverse order
+    """
+    encoded = base64.b64encode(mask).decode('ascii').rstrip('=')
+    for key, value in reversed(MASK_PATTERNS):
+        encoded = encoded.replace(key, value)
+    return encoded
+
+
+def _js_key_order(keys: Iterable[str]) -> List[str]:
+    """
+    Order in which JavaScript iterates object keys: integer-like keys
+    ascending first, then the others in insertion order
+    """
+    keys = list(keys)
+    integers = sorted((key for key in keys if key.isdigit() and str(int(key)) == key), key=int)
+    taken = set(integers)
+    return integers + [key for key in keys if key not in taken]
+
+
+def group_domains(domains: Iterable[str],
+                  patterns: Optional[PatternTable] = None) -> Dict[str, Dict[int, List[str]]]:
+    """
+    Compressed records by zone and record length, in FindProxyForURL order
+    ({zone: {length: sorted records}}, zones sorted, lengths ascending)
+    """
+    patterns = DEFAULT_PATTERN_TABLE if patterns is None else patterns
+    groups: Dict[str, Dict[int, set]] = {}
+    for domain in domains:
+        domain = domain.strip().lower()
+        if not _HOST_RE.match(domain):
+            raise ValueError(f"invalid domain name: {domain!r}")
+        host, zone = domain.rsplit('.', 1)
+        record = patterns.compress(host)
+        groups.setdefault(zone, {}).setdefault(len(record), set()).add(record)
+
+    return {zone: {length: sorted(groups[zone][length]) for length in sorted(groups[zone])}
+            for zone in _js_key_order(sorted(groups))}
+
+
+def encode_domains(domains: Iterable[str],
+                   patterns: Optional[PatternTable] = None) -> Tuple[Dict[str, Dict[int, int]], bytes, bytes]:
+    """
+    Encodes a domain list
+    Returns (structure {zone: {length: byte count}}, LZP data, LZP mask)
+    """
+    structure = {}
+    encoder = LZPEncoder()
+    for zone, lengths in group_domains(domains, patterns).items():
+        structure[zone] = {}
+        for length, records in lengths.items():
+            structure[zone][length] = length * len(records)
+            encoder.write(''.join(records).encode('latin-1'))
+    data, mask = encoder.finish()
+    return structure, data, mask
+
+
+def encode_ip_list(ips: Iterable[str]) -> str:
+    """Sorted base36 deltas for d_ipaddr, space-terminated like upstream"""
+    values = set()
+    for ip in ips:
+        value = ip_to_int(ip.strip())
+        if value is None:
+            raise ValueError(f"invalid IPv4 address: {ip!r}")
+        values.add(value)
+
+    tokens = []
+    previous = 0
+    for value in sorted(values):
+        delta = value - previous
+        previous = value
+        digits = ''
+        while True:
+            delta, digit = divmod(delta, 36)
+            digits = _BASE36_DIGITS[digit] + digits
+            if not delta:
+                break
+        tokens.append(digits + ' ')
+    return ''.join(tokens)
+
+
+def parse_cidr(cidr: str) -> Tuple[str, int]:
+    """'a.b.c.d/bits' -> (ip, bits)"""
+    ip, _, bits = cidr.strip().partition('/')
+    if ip_to_int(ip) is None or not bits.isdigit() or int(bits) > 32:
+        raise ValueError(f"invalid CIDR block: {cidr!r}")
+    return ip, int(bits)
+
+
+def js_string(value: str, wrap: int = STRING_WRAP) -> str:
+    """Double-quoted JavaScript string, split with line continuations"""
+    if '"' in value or '\\' in value or '\n' in value:
+        raise ValueError("PAC data strings cannot contain quotes, backslashes or newlines")
+    if len(value) <= wrap:
+        return f'"{value}"'
+    return '"' + '\\\n'.join(value[i:i + wrap] for i in range(0, len(value), wrap)) + '"'
+
+
+def format_structure(structure: Dict[str, Dict[int, int]]) -> str:
+    zones = [f'"{zone}":{{' + ','.join(f'{length}:{count}' for length, count in lengths.items()) + '}'
+             for zone, lengths in structure.items()]
+    return '{\n' + ',\n'.join(zones) + '}'
+
+
+def build_sections(domains: Optional[Iterable[str]] = None,
+                   ips: Optional[Iterable[str]] = None,
+                   cidrs: Optional[Iterable[str]] = None,
+                   patterns: Optional[PatternTable] = None) -> Dict[str, str]:
+    """Source text of the data sections to replace ({section name: value})"""
+    values = {}
+    if domains is not None:
+        structure, data, mask = encode_domains(domains, patterns)
+        values['domains'] = format_structure(structure)
+        values['domains_lzp'] = js_string(data.decode('latin-1'))
+        values['mask_lzp'] = js_string(b2a(mask))
+    if ips is not None:
+        values['d_ipaddr'] = js_string(encode_ip_list(ips)) + '.split(" ")'
+    if cidrs is not None:
+        blocks = [parse_cidr(cidr) for cidr in cidrs]
+        values['special'] = '[\n' + ','.join(f'["{ip}", {bits}]' for ip, bits in blocks) + '\n]'
+    return values
+
+
+def build_pac(template: str,
+              domains: Optional[Iterable[str]] = None,
+              ips: Optional[Iterable[str]] = None,
+              cidrs: Optional[Iterable[str]] = None,
+              patterns: Optional[PatternTable] = None) -> str:
+    """
+    Returns the template PAC with new domain, d_ipaddr and special data
+    Sections given as None keep the template's values. A pattern table
+    requires domains, since the records must be compressed with it.
+    """
+    if patterns is not None and domains is None:
+        raise ValueError("a pattern table needs the domain list to re-encode")
+
+    sections = parse_pac_sections(template)
+    replacements = []
+    for name, value in build_sections(domains, ips, cidrs, patterns).items():
+        if name not in sections:
+            raise ValueError(f"template has no {name} section")
+        replacements.append((sections[name].value_start, sections[name].value_end, value))
+
+    if patterns is not None:
+        span = find_pattern_literal(template, sections)
+        if span is None:
+            raise ValueError("template has no patternreplace host table")
+        replacements.append((span[0], span[1], patterns.to_js()))
+
+    result = template
+    for start, end, value in sorted(replacements, reverse=True):
+        result = result[:start] + value + result[end:]
+    return result
+
+
+def read_list(path: str) -> List[str]:
+    """First word of every non-empty, non-comment line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split()[0] for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Build a compressed PAC file from domain, IP and CIDR lists")
+    parser.add_argument('template', help="PAC file whose code and other sections are kept")
+    parser.add_argument('domains', help="file with one domain per line")
+    parser.add_argument('--ips', help="file with one IPv4 address per line (d_ipaddr)")
+    parser.add_argument('--cidrs', help="file with one a.b.c.d/bits block per line (special)")
+    parser.add_argument('--patterns', help="pattern table JSON (pac_pattern_learner.py)")
+    parser.add_argument('-o', '--output', required=True, help="PAC file to write")
+    args = parser.parse_args()
+
+    with open(args.template, 'r', encoding='utf-8') as f:
+        template = f.read()
+    try:
+        content = build_pac(template, read_list(args.domains),
+                            read_list(args.ips) if args.ips else None,
+                            read_list(args.cidrs) if args.cidrs else None,
+                            PatternTable.load(args.patterns) if args.patterns else None)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(content)
+    print(f"✓ Wrote {args.output} ({len(content.encode('utf-8')):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
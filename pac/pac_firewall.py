@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+PAC Firewall Sets
+nftables interval set and ipset restore files from d_ipaddr and special
+
+Adding the decoded addresses one `nft add element` / `ipset add` at a time
+costs one netlink round trip each. Both files written here load the whole
+list at once:
+- `nft -f pac.nft`: one transaction that creates the interval set if
+  needed, flushes it and adds every prefix, so rules never see a half
+  loaded set
+- `ipset restore < pac.ipset`: fills a temporary hash:net set and swaps
+  it with the live one
+
+Prefixes come from pac_routes (exact, or budgeted with --max-prefixes).
+Element lines are formatted a chunk at a time: networks are packed
+big-endian into one array('I'), their octets are interleaved with the
+prefix lengths in a bytearray and fill one repeated %-template per chunk,
+so no string is built per entry (10^6 prefixes in about 1 s, against
+1.4 s with an f-string per entry).
+
+Usage:
+    python3 pac_firewall.py pac.pac --nft pac.nft --ipset pac.ipset
+    nft -f pac.nft
+    ipset restore < pac.ipset
+"""
+
+import argparse
+import sys
+import time
+from array import array
+from typing import List, Optional, Sequence, TextIO, Tuple
+
+from pac_ip_index import UINT32_TYPECODE
+from pac_routes import collapse_prefixes, exact_prefixes
+from pac_rule_engine import ip_ranges
+from pac_snapshot import open_engine
+
+CHUNK_SIZE = 65536
+
+NFT_HEADER = """\
+#!/usr/sbin/nft -f
+# Generated by pac_firewall.py from {source}: {count} prefixes
+
+table {family} {table} {{
+    set {name} {{
+        type ipv4_addr
+        flags interval
+    }}
+}}
+flush set {family} {table} {name}
+"""
+
+NFT_ELEMENTS = """\
+add element {family} {table} {name} {{
+"""
+
+IPSET_HEADER = """\
+# Generated by pac_firewall.py from {source}: {count} prefixes
+create {name} hash:net family inet hashsize {hashsize} maxelem {maxelem} -exist
+create {temp} hash:net family inet hashsize {hashsize} maxelem {maxelem} -exist
+flush {temp}
+"""
+
+IPSET_FOOTER = """\
+swap {temp} {name}
+destroy {temp}
+"""
+
+
+def prefix_columns(prefixes: Sequence[Tuple[int, int]]) -> Tuple[bytes, bytes]:
+    """(networks as big-endian uint32 bytes, prefix lengths as bytes)"""
+    networks = array(UINT32_TYPECODE, (network for network, _ in prefixes))
+    if sys.byteorder == 'little':
+        networks.byteswap()
+    return networks.tobytes(), bytes(prefix_bits for _, prefix_bits in prefixes)
+
+
+def write_elements(out: TextIO, prefixes: Sequence[Tuple[int, int]], line: str,
+                   chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Writes line % (a, b, c, d, bits) for every (network, bits) prefix
+    Returns the number of lines written.
+    """
+    packed, bits = prefix_columns(prefixes)
+    for offset in range(0, len(bits), chunk_size):
+        chunk_bits = bits[offset:offset + chunk_size]
+        chunk = packed[4 * offset:4 * (offset + len(chunk_bits))]
+        fields = bytearray(5 * len(chunk_bits))
+        for octet in range(4):
+            fields[octet::5] = chunk[octet::4]
+        fields[4::5] = chunk_bits
+        out.write(line * len(chunk_bits) % tuple(fields))
+    return len(bits)
+
+
+def write_nft(out: TextIO, prefixes: Sequence[Tuple[int, int]], name: str = 'pac_blocked',
+              table: str = 'pac', family: str = 'inet', source: str = 'pac.pac') -> int:
+    """nft -f script that replaces the contents of an interval set atomically"""
+    out.write(NFT_HEADER.format(source=source, count=len(prefixes),
+                                family=family, table=table, name=name))
+    if not prefixes:
+        return 0
+    out.write(NFT_ELEMENTS.format(family=family, table=table, name=name))
+    # nft accepts a trailing comma in element lists
+    count = write_elements(out, prefixes, "    %d.%d.%d.%d/%d,\n")
+    out.write("}\n")
+    return count
+
+
+def write_ipset(out: TextIO, prefixes: Sequence[Tuple[int, int]], name: str = 'pac_blocked',
+                source: str = 'pac.pac') -> int:
+    """ipset restore file that fills a temporary hash:net set and swaps it in"""
+    temp = f"{name}-new"
+    # ipset set names are limited to 31 characters
+    if len(temp) > 31:
+        raise ValueError(f"set name too long: {name}")
+    maxelem = max(65536, 1 << (len(prefixes) - 1).bit_length())
+    hashsize = max(1024, 1 << (len(prefixes) // 4).bit_length())
+    params = {'name': name, 'temp': temp, 'hashsize': hashsize, 'maxelem': maxelem}
+    out.write(IPSET_HEADER.format(source=source, count=len(prefixes), **params))
+    count = write_elements(out, prefixes, f"add {temp.replace('%', '%%')} %d.%d.%d.%d/%d\n")
+    out.write(IPSET_FOOTER.format(**params))
+    return count
+
+
+def pac_prefixes(pac_path: str, max_prefixes: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Exact (or budgeted) prefixes of d_ipaddr and special"""
+    prefixes = exact_prefixes(ip_ranges(open_engine(pac_path)))
+    if max_prefixes is not None:
+        # ipset hash:net rejects /0
+        prefixes, _ = collapse_prefixes(prefixes, max_prefixes, min_bits=1)
+    return prefixes
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Write nftables and ipset files that load d_ipaddr and special at once")
+    parser.add_argument('pac_file', help="PAC file")
+    parser.add_argument('--nft', help="nft -f output file")
+    parser.add_argument('--ipset', help="ipset restore output file")
+    parser.add_argument('--name', default='pac_blocked', help="set name (default: pac_blocked)")
+    parser.add_argument('--table', default='pac', help="nftables table (default: pac)")
+    parser.add_argument('--family', default='inet', help="nftables table family (default: inet)")
+    parser.add_argument('--max-prefixes', type=int,
+                        help="merge into at most N prefixes (see pac_routes.py)")
+    args = parser.parse_args()
+    if not (args.nft or args.ipset):
+        parser.error("give --nft and/or --ipset")
+    if args.max_prefixes is not None and args.max_prefixes < 2:
+        parser.error("--max-prefixes must be at least 2 (two /1 prefixes cover everything)")
+
+    start = time.perf_counter()
+    prefixes = pac_prefixes(args.pac_file, args.max_prefixes)
+    source = args.pac_file
+
+    if args.nft:
+        with open(args.nft, 'w', encoding='utf-8') as f:
+            write_nft(f, prefixes, args.name, args.table, args.family, source)
+        print(f"✓ Wrote {args.nft}: {len(prefixes):,} prefixes", file=sys.stderr)
+    if args.ipset:
+        with open(args.ipset, 'w', encoding='utf-8') as f:
+            write_ipset(f, prefixes, args.name, source)
+        print(f"✓ Wrote {args.ipset}: {len(prefixes):,} prefixes", file=sys.stderr)
+    print(f"✓ Done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+IP Address Index
+Batched d_ipaddr decoding into a sorted uint32 array with binary search,
+and a unified interval matcher for d_ipaddr plus special CIDR blocks
+
+The PAC file stores IPv4 addresses as base36 deltas and checks membership
+with a linear d_ipaddr.indexOf(iphex). Here the whole list is decoded in
+one pass (base36 digits -> cumulative sum) into a contiguous uint32 array:
+- NumPy ndarray when NumPy is installed (vectorized decode and lookups)
+- array('I') otherwise (C-level accumulate, bisect lookups)
+
+Dotted strings are only built on export (to_dotted / iter_dotted).
+"""
+
+import bisect
+import itertools
+import socket
+import struct
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# array typecode with 4-byte items (uint32)
+UINT32_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+_BASE36_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def ip_to_int(ip: str) -> Optional[int]:
+    """Converts a dotted IPv4 address to an integer (None if malformed)"""
+    parts = ip.split('.')
+    if len(parts) != 4:
+        return None
+    try:
+        octets = [int(part) for part in parts]
+    except ValueError:
+        return None
+    if any(octet < 0 or octet > 255 for octet in octets):
+        return None
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+
+def int_to_ip(value: int) -> str:
+    """Converts a 32-bit integer to a dotted IPv4 address"""
+    return socket.inet_ntoa(struct.pack('>I', value))
+
+
+def _decode_base36_numpy(ip_strings: Sequence[str]):
+    """Vectorized base36 parsing: one column of digits at a time"""
+    lut = np.full(256, 255, dtype=np.int64)
+    for digit, char in enumerate(_BASE36_DIGITS):
+        lut[ord(char)] = digit
+        lut[ord(char.upper())] = digit
+
+    encoded = np.array(ip_strings, dtype=np.bytes_)
+    width = encoded.dtype.itemsize
+    chars = encoded.view(np.uint8).reshape(len(ip_strings), width)
+    lengths = np.char.str_len(encoded)
+    digits = lut[chars]
+
+    values = np.zeros(len(ip_strings), dtype=np.int64)
+    for column in range(width):
+        active = column < lengths
+        if np.any(digits[active, column] == 255):
+            raise ValueError("invalid base36 digit in d_ipaddr")
+        values = np.where(active, values * 36 + digits[:, column], values)
+    return values
+
+
+class IPAddressIndex:
+    """
+    Sorted uint32 IPv4 index with O(log n) membership
+
+    Supports single lookups (contains / `in`) and bulk lookups
+    (contains_many) that check a whole array of addresses in one call.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def from_base36(cls, ip_strings: Sequence[str]) -> 'IPAddressIndex':
+        """
+        Decodes PAC d_ipaddr entries (base36 with delta encoding)
+
+        JavaScript equivalent:
+            cur_ipval = parseInt(d_ipaddr[i], 36) + prev_ipval;
+        """
+        if np is not None and len(ip_strings) > 0:
+            values = np.cumsum(_decode_base36_numpy(ip_strings))
+        else:
+            values = list(itertools.accumulate(int(s, 36) for s in ip_strings))
+        return cls.from_values(values)
+
+    @classmethod
+    def from_values(cls, values: Iterable[int]) -> 'IPAddressIndex':
+        """Builds an index from integer addresses (any order, duplicates allowed)"""
+        if np is not None:
+            if not isinstance(values, np.ndarray):
+                values = list(values)
+            values = np.asarray(values, dtype=np.int64)
+            if len(values) and (values.min() < 0 or values.max() > 0xFFFFFFFF):
+                raise ValueError("IPv4 value out of 32-bit range")
+            if len(values) > 1 and not np.all(values[1:] > values[:-1]):
+                values = np.unique(values)
+            return cls(values.astype(np.uint32))
+
+        values = list(values)
+        if values and (min(values) < 0 or max(values) > 0xFFFFFFFF):
+            raise ValueError("IPv4 value out of 32-bit range")
+        if any(a >= b for a, b in zip(values, values[1:])):
+            values = sorted(set(values))
+        return cls(array(UINT32_TYPECODE, values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, ip: Union[int, str]) -> bool:
+        if isinstance(ip, str):
+            ip = ip_to_int(ip)
+            if ip is None:
+                return False
+        return self.contains(ip)
+
+    def contains(self, value: int) -> bool:
+        """Binary search for one integer address"""
+        index = bisect.bisect_left(self.values, value)
+        return index < len(self.values) and bool(self.values[index] == value)
+
+    def contains_many(self, ips) -> Union[List[bool], 'np.ndarray']:
+        """
+        Checks many integer addresses at once
+        Returns a bool ndarray with NumPy, a list of bools otherwise
+        """
+        if np is not None:
+            queries = np.asarray(ips, dtype=np.int64)
+            positions = np.searchsorted(self.values, queries)
+            found = positions < len(self.values)
+            found[found] = self.values[positions[found]] == queries[found]
+            return found
+
+        values = self.values
+        size = len(values)
+        result = []
+        for value in ips:
+            index = bisect.bisect_left(values, value)
+            result.append(index < size and values[index] == value)
+        return result
+
+    def iter_dotted(self) -> Iterator[str]:
+        """Yields dotted IPv4 strings in ascending order"""
+        if np is not None and isinstance(self.values, np.ndarray):
+            raw = self.values.astype('>u4').tobytes()
+        else:
+            packed = array(UINT32_TYPECODE, self.values)
+            if struct.pack('=I', 1) != struct.pack('>I', 1):
+                packed.byteswap()
+            raw = packed.tobytes()
+        for offset in range(0, len(raw), 4):
+            yield socket.inet_ntoa(raw[offset:offset + 4])
+
+    def to_dotted(self, limit: Optional[int] = None) -> List[str]:
+        """Returns dotted IPv4 strings (optionally only the first `limit`)"""
+        return list(itertools.islice(self.iter_dotted(), limit))
+
+
+# Provenance flags of an IPIntervalMatcher interval
+IP_SOURCE_LIST = 1   # exact address from d_ipaddr
+IP_SOURCE_CIDR = 2   # covered by a `special` CIDR block
+
+
+def cidr_to_range(ip: str, cidr_bits: int) -> Tuple[int, int]:
+    """
+    First and last address of a CIDR block as integers
+    Same test as isInNet(host, ip, nmfc(bits)): (host & mask) == (ip & mask)
+    """
+    value = ip_to_int(ip)
+    if value is None:
+        raise ValueError(f"invalid IPv4 address: {ip}")
+    netmask = (0xFFFFFFFF << (32 - cidr_bits)) & 0xFFFFFFFF
+    start = value & netmask
+    return start, start | (~netmask & 0xFFFFFFFF)
+
+
+def range_to_cidrs(start: int, end: int) -> List[Tuple[int, int]]:
+    """Smallest list of (network, prefix_bits) CIDR blocks covering [start, end]"""
+    blocks = []
+    while start <= end:
+        # Largest aligned block starting at `start` that does not pass `end`
+        size = start & -start if start else 1 << 32
+        while size > end - start + 1:
+            size >>= 1
+        blocks.append((start, 33 - size.bit_length()))
+        start += size
+    return blocks
+
+
+class IPIntervalMatcher:
+    """
+    Single sorted array of non-overlapping [start, end] intervals
+
+    Merges d_ipaddr singletons and special CIDR blocks so that an IP verdict
+    is one bisect instead of an exact-match scan plus a loop of isInNet
+    checks. Overlaps are split so every interval carries the exact set of
+    sources (IP_SOURCE_LIST / IP_SOURCE_CIDR flags) covering it.
+    """
+
+    def __init__(self, starts, ends, sources):
+        self.starts = starts
+        self.ends = ends
+        self.sources = sources
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[int, int, int]]) -> 'IPIntervalMatcher':
+        """Builds a matcher from (start, end, source_flag) triples (any order)"""
+        # Sweep over boundaries, counting active intervals per source flag
+        events = []
+        for start, end, source in intervals:
+            events.append((start, source, 1))
+            events.append((end + 1, source, -1))
+        events.sort()
+
+        starts, ends, sources = [], [], []
+        active = {IP_SOURCE_LIST: 0, IP_SOURCE_CIDR: 0}
+        position = 0
+        for point, source, delta in events:
+            if point > position:
+                flags = (IP_SOURCE_LIST if active[IP_SOURCE_LIST] else 0) | \
+                        (IP_SOURCE_CIDR if active[IP_SOURCE_CIDR] else 0)
+                if flags:
+                    if ends and ends[-1] + 1 == position and sources[-1] == flags:
+                        ends[-1] = point - 1
+                    else:
+                        starts.append(position)
+                        ends.append(point - 1)
+                        sources.append(flags)
+                position = point
+            active[source] += delta
+
+        if np is not None:
+            return cls(np.array(starts, dtype=np.uint32),
+                       np.array(ends, dtype=np.uint32),
+                       np.array(sources, dtype=np.uint8))
+        return cls(array(UINT32_TYPECODE, starts),
+                   array(UINT32_TYPECODE, ends),
+                   array('B', sources))
+
+    @classmethod
+    def from_sources(cls, ip_index: IPAddressIndex,
+                     special_cidrs: Iterable[dict]) -> 'IPIntervalMatcher':
+        """Merges a decoded d_ipaddr index with extracted special CIDRs"""
+        intervals = [(int(value), int(value), IP_SOURCE_LIST) for value in ip_index.values]
+        for cidr in special_cidrs:
+            start, end = cidr_to_range(cidr['ip'], cidr['cidr_bits'])
+            intervals.append((start, end, IP_SOURCE_CIDR))
+        return cls.from_intervals(intervals)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def lookup(self, value: int) -> int:
+        """Source flags of the interval containing value (0 if none)"""
+        index = bisect.bisect_right(self.starts, value) - 1
+        if index >= 0 and value <= self.ends[index]:
+            return int(self.sources[index])
+        return 0
+
+    def lookup_many(self, ips) -> Union[List[int], 'np.ndarray']:
+        """
+        Source flags for many integer addresses at once
+        Returns a uint8 ndarray with NumPy, a list of ints otherwise
+        """
+        if np is not None:
+            queries = np.asarray(ips, dtype=np.int64)
+            positions = np.searchsorted(self.starts, queries, side='right') - 1
+            result = np.zeros(len(queries), dtype=np.uint8)
+            valid = positions >= 0
+            hit = valid.copy()
+            hit[valid] = queries[valid] <= self.ends[positions[valid]]
+            result[hit] = self.sources[positions[hit]]
+            return result
+        return [self.lookup(value) for value in ips]
+
+    def iter_intervals(self) -> Iterator[Tuple[int, int, int]]:
+        """Yields (start, end, source_flags) in ascending order"""
+        for start, end, source in zip(self.starts, self.ends, self.sources):
+            yield int(start), int(end), int(source)
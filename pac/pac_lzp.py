@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Cursor-based LZP Decoder
+Linear-time replacement for the slice-and-concatenate unlzp loop
+
+The PAC file decodes domains with:
+    var u = unlzp(domains_lzp, mask_lzp, reqd);
+    domains_lzp = domains_lzp.slice(u[1]);
+    mask_lzp = mask_lzp.slice(u[2]);
+    leftover += u[0];
+
+Ported literally, every call copies the remaining data, mask and leftover
+strings, so decoding is quadratic in the input size. This decoder keeps
+integer cursors into immutable bytes, the 2^18 prediction table in a
+bytearray, and writes each call's output into a preallocated buffer.
+Output is byte-identical to the JavaScript unlzp call sequence.
+"""
+
+from typing import Dict, Iterator, Tuple, Union
+
+TABLE_LEN_BITS = 18
+HASH_MASK = (1 << TABLE_LEN_BITS) - 1
+
+# Minimum unlzp request size used by FindProxyForURL
+MIN_REQUEST = 8192
+
+BytesLike = Union[bytes, bytearray, memoryview, str]
+
+# Mask bits of every byte value, least significant first (1 = predicted)
+_MASK_BITS = [tuple(bool(value & (1 << i)) for i in range(8)) for value in range(256)]
+
+
+def _as_bytes(value: BytesLike) -> bytes:
+    """PAC strings are 8-bit: str is encoded as latin-1"""
+    if isinstance(value, str):
+        return value.encode('latin-1')
+    return bytes(value)
+
+
+class CursorLZPDecoder:
+    """
+    Stateful LZP decoder over a whole domains_lzp / mask_lzp pair
+
+    unlzp() has the JavaScript semantics but reads from the current cursors.
+    read() reproduces FindProxyForURL's leftover buffering: it requests
+    max(8192, count) more output only when fewer than count bytes are left.
+    """
+
+    def __init__(self, data: BytesLike, mask: BytesLike):
+        self.data = _as_bytes(data)
+        self.mask = _as_bytes(mask)
+        self.data_pos = 0
+        self.mask_pos = 0
+        self.table = bytearray(1 << TABLE_LEN_BITS)
+        self.hash_val = 0
+
+        # Decoded but not yet consumed output (FindProxyForURL's `leftover`)
+        self.leftover = bytearray()
+        self.leftover_pos = 0
+
+    def restore(self, data_pos: int, mask_pos: int, hash_val: int,
+                table: BytesLike, leftover: BytesLike = b'') -> None:
+        """Resets the decoder to a saved state (see pac_lzp_index)"""
+        if len(table) != 1 << TABLE_LEN_BITS:
+            raise ValueError("prediction table must have 2^18 entries")
+        self.data_pos = data_pos
+        self.mask_pos = mask_pos
+        self.hash_val = hash_val
+        self.table = bytearray(table)
+        self.leftover = bytearray(leftover)
+        self.leftover_pos = 0
+
+    @property
+    def available(self) -> int:
+        """Number of decoded bytes not yet returned by read()"""
+        return len(self.leftover) - self.leftover_pos
+
+    def unlzp(self, limit: int) -> Tuple[bytes, int, int]:
+        """
+        Decodes at least `limit` bytes (whole mask bytes) from the cursors
+
+        Returns: (output, data_bytes_used, mask_bytes_used)
+        """
+        data = self.data
+        mask = self.mask
+        table = self.table
+        data_pos = start_data = self.data_pos
+        mask_pos = start_mask = self.mask_pos
+        hash_val = self.hash_val
+        data_len = len(data)
+        mask_len = len(mask)
+
+        # The limit is checked after each mask byte: at most limit + 7 bytes
+        out = bytearray(limit + 8)
+        outpos = 0
+        chunk_len = 0
+
+        mask_bits = _MASK_BITS
+        hash_mask = HASH_MASK
+
+        while mask_pos < mask_len:
+            bits = mask_bits[mask[mask_pos]]
+            mask_pos += 1
+            chunk_start = outpos
+
+            for predicted in bits:
+                if predicted:
+                    c = table[hash_val]
+                else:
+                    if data_pos >= data_len:
+                        break
+                    c = data[data_pos]
+                    data_pos += 1
+                    table[hash_val] = c
+                out[outpos] = c
+                outpos += 1
+                hash_val = ((hash_val << 7) ^ c) & hash_mask
+
+            chunk_len = outpos - chunk_start
+            if chunk_len < 8:
+                # Partial groups are dropped unless this is the last mask byte
+                outpos = chunk_start
+            if outpos >= limit:
+                break
+
+        if 0 < chunk_len < 8:
+            # JavaScript: if (outpos < 8) outfinal += out.slice(0, outpos)
+            outpos += chunk_len
+
+        self.data_pos = data_pos
+        self.mask_pos = mask_pos
+        self.hash_val = hash_val
+        del out[outpos:]
+        return bytes(out), data_pos - start_data, mask_pos - start_mask
+
+    def read(self, count: int) -> bytes:
+        """
+        Returns the next `count` decoded bytes (fewer at end of stream)
+        Same buffering as the domains loop in FindProxyForURL
+        """
+        if self.available < count:
+            output, _, _ = self.unlzp(count if count > MIN_REQUEST else MIN_REQUEST)
+            # Compact consumed bytes once they dominate the buffer
+            if self.leftover_pos > len(self.leftover) // 2:
+                del self.leftover[:self.leftover_pos]
+                self.leftover_pos = 0
+            self.leftover += output
+
+        start = self.leftover_pos
+        end = min(start + count, len(self.leftover))
+        self.leftover_pos = end
+        return bytes(self.leftover[start:end])
+
+    def iter_groups(self, structure: Dict[str, Dict[int, int]]) -> Iterator[Tuple[str, int, bytes]]:
+        """
+        Yields (zone, length, raw_bytes) for every group of a domains structure
+        ({zone: {length: count}}) in FindProxyForURL order, as soon as it is decoded
+
+        raw_bytes is still pattern-compressed and shorter than count only when
+        the stream runs out. Groups with a non-positive count are skipped.
+        """
+        for zone, domain_dict in structure.items():
+            for length, count in domain_dict.items():
+                if not isinstance(count, int) or count <= 0:
+                    continue
+                yield zone, length, self.read(count)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+LZP Checkpoint Index
+Random-access zone decoding for the sequential LZP domain stream
+
+LZP output depends on everything decoded before it, so reading one zone
+normally means decoding every zone in front of it. The index records the
+CursorLZPDecoder state at every zone boundary:
+- data cursor, mask cursor and hash value
+- the leftover buffer (decoded but not yet consumed bytes)
+- the prediction table as a sparse diff against the previous boundary,
+  with a full keyframe whenever the diffs since the last one grow large
+
+decode_zone() restores the state in front of a zone and decodes only that
+zone. The index is saved next to the PAC file (pac.pac.lzpidx) and keyed by
+the SHA-256 of the PAC content, so a changed PAC is re-indexed on open().
+
+Usage:
+    index = LZPCheckpointIndex.open('pac.pac')
+    index.decode_zone('de')     # {length: raw_bytes}
+"""
+
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from pac_decompiler_refined import RefinedPACDecompiler
+from pac_ip_index import UINT32_TYPECODE
+from pac_lzp import TABLE_LEN_BITS, CursorLZPDecoder
+from pac_stream import file_sha256, read_lzp_sections
+
+INDEX_SUFFIX = '.lzpidx'
+INDEX_MAGIC = b'PACLZPI1'
+
+# Store a full table once this many entries changed since the last keyframe
+KEYFRAME_INTERVAL = 32768
+
+_TABLE_SIZE = 1 << TABLE_LEN_BITS
+_NONZERO_RE = re.compile(b'[^\x00]')
+_LITTLE_ENDIAN = struct.pack('=I', 1) == struct.pack('<I', 1)
+
+
+def table_diff(old: bytes, new: bytes) -> Tuple[bytes, bytes]:
+    """
+    Changed entries between two prediction tables
+    Returns (positions as little-endian uint32, new values)
+    """
+    # XOR as big integers, then let the regex engine find non-zero bytes
+    changed = (int.from_bytes(old, 'little') ^ int.from_bytes(new, 'little')).to_bytes(len(new), 'little')
+    positions = array(UINT32_TYPECODE, (match.start() for match in _NONZERO_RE.finditer(changed)))
+    values = bytes(new[position] for position in positions)
+    if not _LITTLE_ENDIAN:
+        positions.byteswap()
+    return positions.tobytes(), values
+
+
+def apply_table_diff(table: bytearray, positions: bytes, values: bytes) -> None:
+    """Writes a table_diff() result into a prediction table"""
+    packed = array(UINT32_TYPECODE)
+    packed.frombytes(positions)
+    if not _LITTLE_ENDIAN:
+        packed.byteswap()
+    for position, value in zip(packed, values):
+        table[position] = value
+
+
+class LZPCheckpointIndex:
+    """
+    Decoder checkpoints at zone boundaries of one PAC file
+
+    Each checkpoint is a dict with data_pos, mask_pos, hash_val, leftover and
+    either keyframe (full 2^18-byte table) or positions/values (diff against
+    the previous checkpoint's table).
+    """
+
+    def __init__(self, pac_path: str, content_hash: bytes,
+                 structure: Dict[str, Dict[int, int]], checkpoints: List[Dict]):
+        self.pac_path = pac_path
+        self.content_hash = content_hash
+        self.structure = structure
+        self.checkpoints = checkpoints
+        self.zone_positions = {zone: i for i, zone in enumerate(structure)}
+        self._decoder = None
+
+    @staticmethod
+    def index_path(pac_path: str) -> str:
+        return pac_path + INDEX_SUFFIX
+
+    @classmethod
+    def build(cls, pac_path: str) -> 'LZPCheckpointIndex':
+        """Decodes the whole stream once, recording a checkpoint per zone"""
+        content_hash = file_sha256(pac_path)
+        structure, data, mask = read_lzp_sections(pac_path)
+        decoder = CursorLZPDecoder(data, mask)
+
+        checkpoints = []
+        previous_table = bytes(_TABLE_SIZE)
+        changed_since_keyframe = KEYFRAME_INTERVAL
+        for domain_dict in structure.values():
+            table = bytes(decoder.table)
+            checkpoint = {
+                'data_pos': decoder.data_pos,
+                'mask_pos': decoder.mask_pos,
+                'hash_val': decoder.hash_val,
+                'leftover': bytes(decoder.leftover[decoder.leftover_pos:]),
+                'keyframe': None,
+                'positions': b'',
+                'values': b'',
+            }
+            if table != previous_table:
+                positions, values = table_diff(previous_table, table)
+                changed_since_keyframe += len(values)
+                if changed_since_keyframe >= KEYFRAME_INTERVAL:
+                    checkpoint['keyframe'] = table
+                    changed_since_keyframe = 0
+                else:
+                    checkpoint['positions'] = positions
+                    checkpoint['values'] = values
+            elif not checkpoints:
+                checkpoint['keyframe'] = table
+                changed_since_keyframe = 0
+            checkpoints.append(checkpoint)
+            previous_table = table
+
+            # Same group order and skipping as CursorLZPDecoder.iter_groups()
+            for count in domain_dict.values():
+                if isinstance(count, int) and count > 0:
+                    decoder.read(count)
+
+        return cls(pac_path, content_hash, structure, checkpoints)
+
+    @classmethod
+    def load(cls, pac_path: str, content_hash: Optional[bytes] = None) -> Optional['LZPCheckpointIndex']:
+        """Loads the saved index; None if missing, unreadable or for other content"""
+        if content_hash is None:
+            content_hash = file_sha256(pac_path)
+        try:
+            with open(cls.index_path(pac_path), 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC or f.read(32) != content_hash:
+                    return None
+                payload = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+        header_len, = struct.unpack_from('<I', payload)
+        header = json.loads(payload[4:4 + header_len].decode('utf-8'))
+        blob = memoryview(payload)[4 + header_len:]
+
+        def piece(span):
+            return bytes(blob[span[0]:span[0] + span[1]])
+
+        structure = {zone: {int(length): count for length, count in groups}
+                     for zone, groups in header['structure']}
+        checkpoints = []
+        for entry in header['checkpoints']:
+            checkpoints.append({
+                'data_pos': entry['data_pos'],
+                'mask_pos': entry['mask_pos'],
+                'hash_val': entry['hash_val'],
+                'leftover': piece(entry['leftover']),
+                'keyframe': piece(entry['keyframe']) if entry['keyframe'] else None,
+                'positions': piece(entry['positions']),
+                'values': piece(entry['values']),
+            })
+        return cls(pac_path, content_hash, structure, checkpoints)
+
+    @classmethod
+    def open(cls, pac_path: str) -> 'LZPCheckpointIndex':
+        """Loads the index saved next to the PAC file, rebuilding it when stale"""
+        content_hash = file_sha256(pac_path)
+        index = cls.load(pac_path, content_hash)
+        if index is None:
+            index = cls.build(pac_path)
+            try:
+                index.save()
+            except OSError as e:
+                print(f"⚠ Warning: cannot save LZP index: {e}", file=sys.stderr)
+        return index
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Writes the index atomically (default: next to the PAC file)"""
+        path = path or self.index_path(self.pac_path)
+        blob = bytearray()
+
+        def span(data: Optional[bytes]):
+            if data is None:
+                return None
+            start = len(blob)
+            blob.extend(data)
+            return [start, len(data)]
+
+        entries = []
+        for checkpoint in self.checkpoints:
+            entries.append({
+                'data_pos': checkpoint['data_pos'],
+                'mask_pos': checkpoint['mask_pos'],
+                'hash_val': checkpoint['hash_val'],
+                'leftover': span(checkpoint['leftover']),
+                'keyframe': span(checkpoint['keyframe']),
+                'positions': span(checkpoint['positions']),
+                'values': span(checkpoint['values']),
+            })
+        header = json.dumps({
+            # Lists keep zone and length order through JSON
+            'structure': [[zone, list(groups.items())] for zone, groups in self.structure.items()],
+            'checkpoints': entries,
+        }).encode('utf-8')
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(self.content_hash)
+            f.write(zlib.compress(struct.pack('<I', len(header)) + header + bytes(blob)))
+        os.replace(tmp_path, path)
+        return path
+
+    def table_at(self, position: int) -> bytearray:
+        """Rebuilds the prediction table of a checkpoint from its keyframe"""
+        start = position
+        while self.checkpoints[start]['keyframe'] is None:
+            start -= 1
+        table = bytearray(self.checkpoints[start]['keyframe'])
+        for checkpoint in self.checkpoints[start + 1:position + 1]:
+            apply_table_diff(table, checkpoint['positions'], checkpoint['values'])
+        return table
+
+    def decode_zone(self, zone: str) -> Dict[int, bytes]:
+        """Decodes only one zone: {length: raw_bytes} (pattern-compressed)"""
+        if zone not in self.zone_positions:
+            raise KeyError(f"zone not in PAC file: {zone}")
+
+        if self._decoder is None:
+            _, data, mask = read_lzp_sections(self.pac_path)
+            self._decoder = CursorLZPDecoder(data, mask)
+
+        position = self.zone_positions[zone]
+        checkpoint = self.checkpoints[position]
+        self._decoder.restore(checkpoint['data_pos'], checkpoint['mask_pos'],
+                              checkpoint['hash_val'], self.table_at(position),
+                              checkpoint['leftover'])
+        return {length: raw for _, length, raw in
+                self._decoder.iter_groups({zone: self.structure[zone]})}
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 3:
+        print("Usage: python pac_lzp_index.py <pac_file> <zone> [zone ...]")
+        print("Example: python pac_lzp_index.py pac.pac de")
+        sys.exit(1)
+
+    # Records are expanded with the PAC's own pattern table
+    decompiler = RefinedPACDecompiler(sys.argv[1], verbose=False)
+    if not decompiler.load_pac_file():
+        print(f"✗ Cannot read PAC file: {sys.argv[1]}", file=sys.stderr)
+        sys.exit(1)
+    patterns = decompiler.pattern_table
+    decompiler.release_source()
+
+    index = LZPCheckpointIndex.open(sys.argv[1])
+    for zone in sys.argv[2:]:
+        for length, raw in index.decode_zone(zone).items():
+            data = raw.decode('latin-1')
+            for i in range(0, len(data) - length + 1, length):
+                record = data[i:i + length]
+                if '\x00' not in record:
+                    print(f"{patterns.expand(record)}.{zone}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+LZP Mask Index
+Bit-unpacked mask_lzp with prefix sums of literal counts
+
+Every output byte of unlzp consumes one mask bit: set means the byte comes
+from the prediction table, clear means it is the next byte of domains_lzp.
+How far the data cursor has moved after N output bytes therefore follows
+from the mask alone. The index unpacks all mask bits in one step:
+- NumPy unpackbits and cumsum when NumPy is installed
+- bytes.translate and itertools.accumulate into array('I') otherwise
+
+and keeps literal_prefix[n] = literal bytes needed for the first n output
+bytes, so data cursors for any output offset are one array lookup. With
+the group sizes from the domains structure this gives the stream position
+of every group without decoding, and validate() shows where the data or
+the mask runs out (in pac.pac the mask ends inside the last group).
+
+decode_mask() turns the mask_lzp literal into the mask bytes the decoder
+reads, staying in bytes throughout: patternreplace(mask_lzp, true) becomes
+bytes.replace passes and a2b() is base64 plus the JavaScript tail quirk.
+
+Usage:
+    index = MaskIndex(decode_mask(mask_lzp))
+    index.data_offset(8192)         # domains_lzp bytes behind 8192 output bytes
+    index.validate(structure, len(data))
+"""
+
+import base64
+import bisect
+import itertools
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pac_ip_index import UINT32_TYPECODE
+
+# patternreplace(mask_lzp, true): each character stands for two base64 characters
+MASK_PATTERNS = [
+    ('AA', '!'), ('gA', '@'), ('AB', '#'), ('AQ', '$'),
+    ('AE', '%'), ('AC', '^'), ('AI', '*'), ('Ag', '('),
+    ('AD', ')'), ('Aw', '['), ('AM', ']'), ('Bg', '-'),
+    ('CA', ','), ('IA', '.'), ('BA', '?'),
+]
+_MASK_PATTERNS_BYTES = [(key.encode('ascii'), value.encode('ascii')) for key, value in MASK_PATTERNS]
+
+# Mask bits of every byte value, least significant first (1 = predicted)
+_BIT_BYTES = [bytes((value >> i) & 1 for i in range(8)) for value in range(256)]
+# 0 <-> 1 on unpacked bits: literal flags
+_INVERT_BITS = bytes([1, 0]) + bytes(254)
+
+
+def decode_mask(encoded: bytes) -> bytes:
+    """
+    a2b(patternreplace(mask_lzp, true)) on bytes
+
+    The JavaScript a2b only emits a zero byte when it was completed before
+    the last two input characters, so zero bytes from the tail are dropped.
+    """
+    # Codes are not base64 characters, so the order of the passes is free;
+    # these run in C and beat a single-pass table lookup
+    for key, value in _MASK_PATTERNS_BYTES:
+        encoded = encoded.replace(value, key)
+    encoded_len = len(encoded)
+    decoded = base64.b64decode(encoded + b'=' * (-encoded_len % 4))
+
+    # Byte k is completed by input character ceil(8 * (k + 1) / 6) - 1
+    end = len(decoded)
+    while end > 0 and (8 * end + 5) // 6 - 1 >= encoded_len - 2:
+        end -= 1
+    tail = decoded[end:].replace(b'\x00', b'')
+    return decoded[:end] + tail
+
+
+class MaskIndex:
+    """
+    Unpacked mask bits and cumulative literal counts
+
+    bits[i] is 1 when output byte i is predicted; literal_prefix has one more
+    entry than bits. Both are NumPy arrays, or bytes and array('I').
+    """
+
+    def __init__(self, mask: bytes):
+        self.mask = bytes(mask)
+        if np is not None:
+            packed = np.frombuffer(self.mask, dtype=np.uint8)
+            self.bits = np.unpackbits(packed, bitorder='little')
+            self.literal_prefix = np.zeros(len(self.bits) + 1, dtype=np.uint32)
+            np.cumsum(self.bits == 0, out=self.literal_prefix[1:])
+        else:
+            self.bits = b''.join(map(_BIT_BYTES.__getitem__, self.mask))
+            self.literal_prefix = array(UINT32_TYPECODE, itertools.accumulate(
+                self.bits.translate(_INVERT_BITS), initial=0))
+
+    @property
+    def output_size(self) -> int:
+        """Output bytes the whole mask describes"""
+        return len(self.bits)
+
+    @property
+    def literal_count(self) -> int:
+        """domains_lzp bytes the whole mask consumes"""
+        return int(self.literal_prefix[-1])
+
+    def data_offset(self, output_offset: int) -> int:
+        """domains_lzp bytes consumed by the first output_offset output bytes"""
+        if not 0 <= output_offset <= len(self.bits):
+            raise IndexError(f"output offset out of range: {output_offset}")
+        return int(self.literal_prefix[output_offset])
+
+    def cursors(self, output_offset: int) -> Tuple[int, int, int]:
+        """(data_pos, mask_pos, bit) of the decoder in front of an output byte"""
+        mask_pos, bit = divmod(output_offset, 8)
+        return self.data_offset(output_offset), mask_pos, bit
+
+    def output_limit(self, data_len: int) -> int:
+        """
+        Output bytes decodable before a data_len-byte domains_lzp runs out
+        (the whole mask when the data is long enough)
+        """
+        if np is not None:
+            end = int(np.searchsorted(self.literal_prefix, data_len, side='right')) - 1
+        else:
+            end = bisect.bisect_right(self.literal_prefix, data_len) - 1
+        return min(end, len(self.bits))
+
+    def group_offsets(self, structure: Dict[str, Dict[int, int]]
+                      ) -> Iterator[Tuple[str, int, int, int]]:
+        """
+        Yields (zone, length, output_offset, data_offset) at the start of every
+        group, in FindProxyForURL order and with the same skipping as
+        CursorLZPDecoder.iter_groups()
+        """
+        offset = 0
+        end = len(self.bits)
+        for zone, domain_dict in structure.items():
+            for length, count in domain_dict.items():
+                if not isinstance(count, int) or count <= 0:
+                    continue
+                yield zone, length, offset, int(self.literal_prefix[min(offset, end)])
+                offset += count
+
+    def validate(self, structure: Dict[str, Dict[int, int]], data_len: int) -> List[str]:
+        """
+        Consistency problems between mask, data length and domains structure
+        An empty list means every group can be decoded in full.
+        """
+        problems = []
+        total = sum(count for domain_dict in structure.values()
+                    for count in domain_dict.values() if isinstance(count, int) and count > 0)
+        if total > len(self.bits):
+            problems.append(f"mask describes {len(self.bits):,} output bytes, "
+                            f"structure needs {total:,}")
+        if self.literal_count != data_len:
+            problems.append(f"mask consumes {self.literal_count:,} data bytes, "
+                            f"domains_lzp has {data_len:,}")
+
+        # A group cut short by the end of data loses its whole mask byte group
+        limit = self.output_limit(data_len)
+        if limit < len(self.bits):
+            limit -= limit % 8
+        offsets = list(self.group_offsets(structure))
+        for i, (zone, length, start, _) in enumerate(offsets):
+            end = offsets[i + 1][2] if i + 1 < len(offsets) else total
+            if end > limit:
+                problems.append(f"group ({zone}, {length}) at output {start:,} is cut "
+                                f"short: the stream ends at output {limit:,}")
+        return problems
+
+
+def main():
+    """Main entry point"""
+    from pac_stream import read_lzp_sections
+
+    if len(sys.argv) < 2:
+        print("Usage: python pac_mask_index.py <pac_file> [output_offset ...]")
+        print("Example: python pac_mask_index.py pac.pac 8192")
+        sys.exit(1)
+
+    structure, data, mask = read_lzp_sections(sys.argv[1])
+    index = MaskIndex(mask)
+    print(f"✓ {len(mask):,} mask bytes: {index.output_size:,} output bytes, "
+          f"{index.literal_count:,} literals ({len(data):,} data bytes)")
+    for offset in sys.argv[2:]:
+        data_pos, mask_pos, bit = index.cursors(int(offset))
+        print(f"  output {int(offset):,}: data_pos {data_pos:,}, mask_pos {mask_pos:,}, bit {bit}")
+    for problem in index.validate(structure, len(data)):
+        print(f"⚠ {problem}")
+
+
+if __name__ == "__main__":
+    main()
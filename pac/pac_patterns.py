@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+PAC Pattern Tables
+Substitution dictionaries of patternreplace(host, false) as data
+
+FindProxyForURL compresses a host with one `s.split(value).join(code)` pass
+per table entry, in table order, and compares the result with records that
+were compressed the same way. A table maps codes to values:
+- single-character codes (`A` -> `in`)
+- two-character codes, `!` plus a single-code character (`!A` -> `porn`)
+
+Values only contain host characters and codes never do, so expanding is
+one left-to-right pass whatever the table order. The upstream table is
+DOMAIN_PATTERNS in pac_decompiler_refined; generated PAC files may carry a
+learned one (pac_pattern_learner), which from_pac() reads back.
+
+Usage:
+    table = PatternTable.from_pac(content) or PatternTable(DOMAIN_PATTERNS)
+    table.compress('pornhub')           # '!Ahub'
+    table.expand('!Ahub')               # 'pornhub'
+"""
+
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pac_sections import PacSection, parse_js_literal, parse_pac_sections, tokenize
+
+# Code characters available to a table (the upstream alphabet)
+SINGLE_CODES = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ@#$%^&*()=+/,<>~[]{}`:;?'
+BANG_CODES = tuple('!' + code for code in SINGLE_CODES)
+
+# Characters a value may contain: host name characters, never a code
+VALUE_RE = re.compile(r'^[a-z0-9._-]+$')
+
+
+class PatternTable:
+    """Ordered (code, value) substitutions with compress and expand"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        self.patterns: List[Tuple[str, str]] = [(code, value) for code, value in patterns]
+        codes = [code for code, _ in self.patterns]
+        if len(set(codes)) != len(codes):
+            raise ValueError("duplicate code in pattern table")
+        for code, value in self.patterns:
+            if code not in BANG_CODES and (len(code) != 1 or code not in SINGLE_CODES):
+                raise ValueError(f"invalid pattern code: {code!r}")
+            if not VALUE_RE.match(value):
+                raise ValueError(f"invalid pattern value for {code!r}: {value!r}")
+
+        # Dispatch tables for expand(), built once
+        self._bang = {code[1]: value for code, value in self.patterns if len(code) == 2}
+        self._single = str.maketrans({code: value for code, value in self.patterns if len(code) == 1})
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PatternTable) and self.patterns == other.patterns
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.patterns)
+
+    def compress(self, host: str) -> str:
+        """patternreplace(host, false): every value replaced by its code, in order"""
+        for code, value in self.patterns:
+            if value in host:
+                host = host.replace(value, code)
+        return host
+
+    def expand(self, s: str) -> str:
+        """
+        Replaces every code with its value in one pass
+
+        Splitting on '!' gives the two-character codes: each piece after a
+        '!' starts with the code character, or the '!' was a literal.
+        Everything else goes through str.translate for the single codes.
+        """
+        if '!' not in s:
+            return s.translate(self._single)
+
+        pieces = s.split('!')
+        result = [pieces[0].translate(self._single)]
+        for piece in pieces[1:]:
+            value = self._bang.get(piece[:1])
+            if value is None:
+                result.append('!')
+                result.append(piece.translate(self._single))
+            else:
+                result.append(value)
+                result.append(piece[1:].translate(self._single))
+        return ''.join(result)
+
+    def to_js(self) -> str:
+        """Object literal for `var patterns = {...}` in patternreplace"""
+        return '{' + ', '.join(f"'{code}': '{value}'" for code, value in self.patterns) + '}'
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'patterns': self.patterns}, f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'PatternTable':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['patterns'])
+
+    @classmethod
+    def from_pac(cls, content: str,
+                 sections: Optional[Dict[str, PacSection]] = None) -> Optional['PatternTable']:
+        """Host table of the PAC's patternreplace function (None if not found)"""
+        span = find_pattern_literal(content, sections)
+        if span is None:
+            return None
+        patterns = parse_js_literal(content[span[0]:span[1]])
+        if not isinstance(patterns, dict):
+            return None
+        return cls(patterns.items())
+
+
+def find_pattern_literal(content: str,
+                         sections: Optional[Dict[str, PacSection]] = None) -> Optional[Tuple[int, int]]:
+    """
+    Offsets of the host table object in patternreplace: the first
+    `patterns = {...}` in the function body (the second one is the mask table)
+    """
+    if sections is None:
+        sections = parse_pac_sections(content)
+    section = sections.get('patternreplace')
+    if section is None or section.kind != 'function':
+        return None
+
+    tokens = tokenize(content, section.value_start, section.value_end)
+    for i in range(len(tokens) - 2):
+        if tokens[i][1] == 'patterns' and tokens[i + 1][1] == '=' and tokens[i + 2][1] == '{':
+            depth = 0
+            for kind, text, _, end in tokens[i + 2:]:
+                if kind != 'punct':
+                    continue
+                if text == '{':
+                    depth += 1
+                elif text == '}':
+                    depth -= 1
+                    if depth == 0:
+                        return tokens[i + 2][2], end
+            return None
+    return None
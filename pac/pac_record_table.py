@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Sorted Record Tables
+Fixed-width domain records kept as one sorted bytes block per group
+
+A decoded group is a run of fixed-width compressed records. Splitting it
+into a frozenset makes one str object per record (about 50 bytes plus the
+hash table slot on top of the record itself). SortedRecordTable keeps the
+records sorted and deduplicated in one contiguous buffer instead and
+binary-searches it in place by record offset:
+- memory is the record bytes plus one small object per group
+- from_block sorts a decoded group in one pass (numpy when available),
+  so loading creates no long-lived per-record objects
+- the same class reads the memory-mapped rule snapshot (pac_snapshot)
+
+Usage:
+    table = SortedRecordTable.from_block('abcabdzzz', 3)
+    'abd' in table
+"""
+
+from typing import Iterator, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class SortedRecordTable:
+    """
+    Sorted, deduplicated fixed-width records in one bytes-like buffer
+    Membership is a binary search over record slices
+    """
+
+    __slots__ = ('buffer', 'offset', 'count', 'width')
+
+    def __init__(self, buffer, offset: int, count: int, width: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.width = width
+
+    @classmethod
+    def from_block(cls, data: Union[str, bytes], width: int) -> 'SortedRecordTable':
+        """
+        Table from one decoded group (records concatenated, any order)
+        A trailing partial record is dropped, as RegExp('.{n}', 'g') does.
+        """
+        if isinstance(data, str):
+            data = data.encode('latin-1')
+        count = len(data) // width if width > 0 else 0
+        if count == 0:
+            return cls(b'', 0, 0, width)
+        if np is not None:
+            # Equal-width 'S' items sort and compare like the raw bytes
+            block = np.unique(np.frombuffer(data, dtype=f'S{width}', count=count)).tobytes()
+        else:
+            block = b''.join(sorted({data[i:i + width]
+                                     for i in range(0, count * width, width)}))
+        return cls(block, 0, len(block) // width, width)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, record: str) -> bool:
+        try:
+            key = record.encode('latin-1')
+        except UnicodeEncodeError:
+            return False
+        if len(key) != self.width:
+            return False
+
+        buffer, width, base = self.buffer, self.width, self.offset
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * width
+            if buffer[start:start + width] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = base + lo * width
+        return lo < self.count and buffer[start:start + width] == key
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SortedRecordTable):
+            return NotImplemented
+        return self.width == other.width and self.tobytes() == other.tobytes()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"SortedRecordTable(count={self.count}, width={self.width})"
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of record data"""
+        return self.count * self.width
+
+    def tobytes(self) -> bytes:
+        """All records, concatenated in sorted order"""
+        return bytes(self.buffer[self.offset:self.offset + self.count * self.width])
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self.count):
+            start = self.offset + index * self.width
+            yield bytes(self.buffer[start:start + self.width]).decode('latin-1')
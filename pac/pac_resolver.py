@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+PAC Resolver Config
+dnsmasq and unbound configuration for the blocked domains of a PAC file
+
+dnsmasq (nftset=/ipset=/server=) and unbound (local-zone, forward-zone)
+match a listed name and all of its subdomains, so a name below another
+listed name is redundant (blog.i.ua next to i.ua). Decoded names are put
+into a reversed-label suffix trie (ua -> i -> blog) that keeps only the
+topmost names; adding a parent prunes everything below it, whatever the
+order. The remaining names come out sorted by reversed labels, so each
+zone stays together.
+
+dnsmasq takes several domains per option, so names are packed into lines
+of up to DNSMASQ_LINE_LIMIT characters; unbound gets one local-zone line
+or forward-zone stanza per name.
+
+Usage:
+    python3 pac_resolver.py pac.pac --dnsmasq pac.dnsmasq.conf --nftset 4#inet#pac#pac_blocked
+    python3 pac_resolver.py pac.pac --unbound pac.unbound.conf --forward-addr 10.0.0.53
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from pac_rule_engine import blocked_domains
+from pac_snapshot import open_engine
+
+# dnsmasq reads option lines into a 2 * MAXDNAME buffer
+DNSMASQ_LINE_LIMIT = 1024
+
+# Key of the terminal mark in a trie node (labels are never empty)
+_END = ''
+
+
+class SuffixTrie:
+    """
+    Trie over reversed domain labels where a name covers all of its
+    subdomains; only names not covered by another one are kept
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.root: Dict[str, dict] = {}
+        self.count = 0
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> bool:
+        """Adds a name; False when a listed parent (or the name) already covers it"""
+        node = self.root
+        for label in reversed(name.lower().rstrip('.').split('.')):
+            if _END in node:
+                return False
+            node = node.setdefault(label, {})
+        if _END in node:
+            return False
+        # Everything below is now covered
+        self.count -= self._count(node)
+        node.clear()
+        node[_END] = {}
+        self.count += 1
+        return True
+
+    def _count(self, node: dict) -> int:
+        stack = [node]
+        total = 0
+        while stack:
+            node = stack.pop()
+            for label, child in node.items():
+                if label == _END:
+                    total += 1
+                else:
+                    stack.append(child)
+        return total
+
+    def covers(self, name: str) -> bool:
+        """True if the name or one of its parents is listed"""
+        node = self.root
+        for label in reversed(name.lower().rstrip('.').split('.')):
+            if _END in node:
+                return True
+            node = node.get(label)
+            if node is None:
+                return False
+        return _END in node
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        """Kept names, sorted by reversed labels"""
+        stack = [(self.root, ())]
+        while stack:
+            node, labels = stack.pop()
+            if _END in node:
+                yield '.'.join(reversed(labels))
+                continue
+            for label in sorted(node, reverse=True):
+                stack.append((node[label], labels + (label,)))
+
+
+def pack_lines(prefix: str, names: Iterable[str], suffix: str,
+               limit: int = DNSMASQ_LINE_LIMIT) -> Iterator[str]:
+    """prefix/name1/name2/.../suffix lines of at most limit characters"""
+    line = prefix
+    for name in names:
+        if len(line) + len(name) + len(suffix) + 2 > limit and line != prefix:
+            yield f"{line}/{suffix}\n"
+            line = prefix
+        line += '/' + name
+    if line != prefix:
+        yield f"{line}/{suffix}\n"
+
+
+def write_dnsmasq(out: TextIO, names: List[str], nftset: Optional[str] = None,
+                  ipset: Optional[str] = None, servers: Iterable[str] = (),
+                  source: str = 'pac.pac') -> int:
+    """nftset=, ipset= and server= lines; returns the number of lines"""
+    options = []
+    if nftset:
+        options.append(('nftset=', nftset))
+    if ipset:
+        options.append(('ipset=', ipset))
+    options.extend(('server=', server) for server in servers)
+    if not options:
+        raise ValueError("dnsmasq output needs an nftset, ipset or server")
+
+    out.write(f"# Generated by pac_resolver.py from {source}: {len(names)} domains\n")
+    count = 0
+    for prefix, target in options:
+        for line in pack_lines(prefix, names, target):
+            out.write(line)
+            count += 1
+    return count
+
+
+def write_unbound(out: TextIO, names: List[str], zone_type: Optional[str] = None,
+                  forward_addrs: Iterable[str] = (), source: str = 'pac.pac') -> int:
+    """local-zone lines and/or forward-zone stanzas; returns the number of zones"""
+    forward_addrs = list(forward_addrs)
+    if not zone_type and not forward_addrs:
+        raise ValueError("unbound output needs a local-zone type or forward addresses")
+
+    out.write(f"# Generated by pac_resolver.py from {source}: {len(names)} domains\n")
+    count = 0
+    if zone_type:
+        out.write("server:\n")
+        out.writelines(f'    local-zone: "{name}." {zone_type}\n' for name in names)
+        count += len(names)
+    if forward_addrs:
+        addrs = ''.join(f"    forward-addr: {addr}\n" for addr in forward_addrs)
+        out.writelines(f'forward-zone:\n    name: "{name}."\n{addrs}' for name in names)
+        count += len(names)
+    return count
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Generate dnsmasq/unbound configuration for the domains of a PAC file")
+    parser.add_argument('pac_file', help="PAC file")
+    parser.add_argument('--dnsmasq', help="dnsmasq output file")
+    parser.add_argument('--nftset', help="dnsmasq nftset target, e.g. 4#inet#pac#pac_blocked")
+    parser.add_argument('--ipset', help="dnsmasq ipset name(s), comma separated")
+    parser.add_argument('--server', action='append', default=[],
+                        help="dnsmasq upstream server for the domains (repeatable)")
+    parser.add_argument('--unbound', help="unbound output file")
+    parser.add_argument('--zone-type', help="unbound local-zone type, e.g. always_nxdomain")
+    parser.add_argument('--forward-addr', action='append', default=[],
+                        help="unbound forward-zone address (repeatable)")
+    args = parser.parse_args()
+    if not (args.dnsmasq or args.unbound):
+        parser.error("give --dnsmasq and/or --unbound")
+    if args.dnsmasq and not (args.nftset or args.ipset or args.server):
+        parser.error("--dnsmasq needs --nftset, --ipset or --server")
+    if args.unbound and not (args.zone_type or args.forward_addr):
+        parser.error("--unbound needs --zone-type or --forward-addr")
+
+    start = time.perf_counter()
+    engine = open_engine(args.pac_file)
+    domains = blocked_domains(engine)
+    names = list(SuffixTrie(domains))
+    print(f"✓ {len(domains):,} domains, {len(names):,} after suffix deduplication",
+          file=sys.stderr)
+
+    if args.dnsmasq:
+        with open(args.dnsmasq, 'w', encoding='utf-8') as f:
+            lines = write_dnsmasq(f, names, args.nftset, args.ipset, args.server, args.pac_file)
+        print(f"✓ Wrote {args.dnsmasq}: {lines:,} lines", file=sys.stderr)
+    if args.unbound:
+        with open(args.unbound, 'w', encoding='utf-8') as f:
+            zones = write_unbound(f, names, args.zone_type, args.forward_addr, args.pac_file)
+        print(f"✓ Wrote {args.unbound}: {zones:,} zones", file=sys.stderr)
+    print(f"✓ Done in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
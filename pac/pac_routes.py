@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+PAC Route Export
+d_ipaddr and special collapsed into the fewest CIDR prefixes, written as
+plain CIDR lists or `ip -batch` route files
+
+Turned into routes one by one, d_ipaddr gives thousands of /32 entries.
+Here both sections are merged into disjoint address ranges (pac_rule_engine
+ip_ranges) and every range is split into aligned blocks (range_to_cidrs):
+- exact mode: the minimal prefix set covering exactly the listed
+  addresses, no more and no less
+- lossy mode (--max-prefixes N): prefixes are merged into supernets until
+  at most N remain, each time taking the merge that adds the fewest
+  unlisted addresses; the number of extra addresses is reported
+
+Route files use `route replace`, so loading the same file twice is safe:
+
+    route replace 1.179.201.18/32 via 10.0.0.1 dev wg0
+    route replace 68.171.224.0/19 via 10.0.0.1 dev wg0
+
+Usage:
+    python3 pac_routes.py pac.pac -o routes.txt
+    python3 pac_routes.py pac.pac --max-prefixes 1000 --format iproute --dev wg0 -o routes.batch
+    ip -batch routes.batch
+"""
+
+import argparse
+import heapq
+import sys
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from pac_ip_index import int_to_ip, range_to_cidrs
+from pac_rule_engine import ip_ranges
+from pac_snapshot import open_engine
+
+FORMATS = ('cidr', 'iproute')
+
+
+def exact_prefixes(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Minimal (network, prefix_bits) list covering sorted, disjoint, merged
+    [first, last] ranges and nothing else
+    """
+    prefixes = []
+    for start, end in ranges:
+        prefixes.extend(range_to_cidrs(start, end))
+    return prefixes
+
+
+def _size(bits: int) -> int:
+    return 1 << (32 - bits)
+
+
+def _supernet(first: int, last: int) -> Tuple[int, int]:
+    """Smallest prefix containing both addresses"""
+    bits = 32 - (first ^ last).bit_length()
+    mask = (0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF
+    return first & mask, bits
+
+
+def collapse_prefixes(prefixes: List[Tuple[int, int]], max_prefixes: int,
+                      min_bits: int = 0) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Merges sorted, disjoint prefixes into at most max_prefixes supernets
+
+    Greedy: candidates are the smallest supernets of neighbouring prefixes,
+    taken in order of unlisted addresses they add (ties: most prefixes
+    absorbed first). No supernet is shorter than /min_bits; ValueError if
+    the budget can't be met that way. Returns (prefixes, extra addresses covered).
+    """
+    if max_prefixes < 1:
+        raise ValueError("max_prefixes must be at least 1")
+    count = len(prefixes)
+    if count <= max_prefixes:
+        return list(prefixes), 0
+
+    # Doubly linked list over the prefixes; merged ones are marked dead
+    nets = [net for net, _ in prefixes]
+    bits = [prefix_bits for _, prefix_bits in prefixes]
+    prev = list(range(-1, count - 1))
+    next_ = list(range(1, count + 1))
+    next_[-1] = -1
+    alive = [True] * count
+
+    def candidate(left: int):
+        """(extra, -absorbed, left, network, bits, first, last) for left and its successor"""
+        right = next_[left]
+        network, prefix_bits = _supernet(nets[left], nets[right] + _size(bits[right]) - 1)
+        end = network + _size(prefix_bits)
+        # Every other prefix is either inside the supernet or disjoint from it
+        first, last = left, right
+        while prev[first] >= 0 and nets[prev[first]] >= network:
+            first = prev[first]
+        while next_[last] >= 0 and nets[next_[last]] < end:
+            last = next_[last]
+        covered = absorbed = 0
+        node = first
+        while True:
+            covered += _size(bits[node])
+            absorbed += 1
+            if node == last:
+                break
+            node = next_[node]
+        return _size(prefix_bits) - covered, -absorbed, left, network, prefix_bits, first, last
+
+    heap = [candidate(i) for i in range(count - 1)]
+    heapq.heapify(heap)
+    extra_total = 0
+
+    while count > max_prefixes:
+        if not heap:
+            raise ValueError(f"can't merge into {max_prefixes} prefixes of /{min_bits} or longer")
+        entry = heapq.heappop(heap)
+        left = entry[2]
+        if not alive[left] or next_[left] < 0:
+            continue
+        # Merges since the entry was pushed may have changed its cost
+        fresh = candidate(left)
+        if fresh != entry:
+            heapq.heappush(heap, fresh)
+            continue
+        # Later merges only widen this supernet
+        if fresh[4] < min_bits:
+            continue
+
+        extra, absorbed, _, network, prefix_bits, first, last = fresh
+        after = next_[last]
+        node = next_[first]
+        while node != after:
+            alive[node] = False
+            node = next_[node]
+        next_[first] = after
+        if after >= 0:
+            prev[after] = first
+        nets[first], bits[first] = network, prefix_bits
+        count -= -absorbed - 1
+        extra_total += extra
+
+        if prev[first] >= 0:
+            heapq.heappush(heap, candidate(prev[first]))
+        if after >= 0:
+            heapq.heappush(heap, candidate(first))
+
+    result = [(nets[i], bits[i]) for i in range(len(prefixes)) if alive[i]]
+    return result, extra_total
+
+
+def format_cidrs(prefixes: Iterable[Tuple[int, int]]) -> Iterable[str]:
+    """Lines of a plain CIDR list"""
+    for network, prefix_bits in prefixes:
+        yield f"{int_to_ip(network)}/{prefix_bits}\n"
+
+
+def format_ip_route(prefixes: Iterable[Tuple[int, int]], via: Optional[str] = None,
+                    dev: Optional[str] = None, table: Optional[str] = None) -> Iterable[str]:
+    """Lines of an `ip -batch` file with one idempotent route per prefix"""
+    if not via and not dev:
+        raise ValueError("ip route output needs a gateway (via) or a device (dev)")
+    suffix = ''.join(f" {key} {value}" for key, value in
+                     (('via', via), ('dev', dev), ('table', table)) if value)
+    for cidr in format_cidrs(prefixes):
+        yield f"route replace {cidr[:-1]}{suffix}\n"
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Collapse d_ipaddr and special into CIDR prefixes for routes and firewalls")
+    parser.add_argument('pac_file', help="PAC file")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=FORMATS, default='cidr',
+                        help="plain CIDR list or `ip -batch` routes (default: cidr)")
+    parser.add_argument('--max-prefixes', type=int,
+                        help="merge into at most N prefixes, covering extra addresses")
+    parser.add_argument('--via', help="gateway for ip route output")
+    parser.add_argument('--dev', help="device for ip route output")
+    parser.add_argument('--table', help="routing table for ip route output")
+    args = parser.parse_args()
+    if args.format == 'iproute' and not (args.via or args.dev):
+        parser.error("--format iproute needs --via or --dev")
+
+    start = time.perf_counter()
+    engine = open_engine(args.pac_file)
+    ranges = ip_ranges(engine)
+    prefixes = exact_prefixes(ranges)
+    listed = sum(end - first + 1 for first, end in ranges)
+    print(f"✓ {listed:,} addresses in {len(ranges):,} ranges: {len(prefixes):,} exact prefixes",
+          file=sys.stderr)
+
+    if args.max_prefixes is not None:
+        prefixes, extra = collapse_prefixes(prefixes, args.max_prefixes)
+        print(f"⚠ Collapsed to {len(prefixes):,} prefixes, "
+              f"covering {extra:,} addresses not in the PAC", file=sys.stderr)
+
+    if args.format == 'iproute':
+        lines = format_ip_route(prefixes, args.via, args.dev, args.table)
+    else:
+        lines = format_cidrs(prefixes)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        print(f"✓ Wrote {args.output} in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    else:
+        sys.stdout.writelines(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+PAC Rule Engine
+Native Python implementation of the PAC file's FindProxyForURL function
+
+Lookup structures are built once from RefinedPACDecompiler output:
+- Compressed domain groups as sorted fixed-width record tables keyed by
+  (zone, length), consumed group by group from
+  pac_stream.iter_domain_groups()
+- Decoded d_ipaddr values and special CIDR blocks merged into one
+  IPIntervalMatcher (one bisect, with provenance of the hit)
+- fbtw host list, shost regex and return strings from FindProxyForURL
+
+The JavaScript version splits every group with RegExp('.{n}', 'g') on first
+use and runs a linear indexOf over d_ipaddr on every call. Here each group
+stays one bytes block searched in place (pac_record_table) and each lookup
+is one binary search plus one bisect, with identical results.
+
+Usage:
+    engine = PacRuleEngine.from_pac_file('pac.pac')
+    engine.find_proxy('https://example.com/', 'example.com')
+"""
+
+import re
+import socket
+import sys
+from typing import (Callable, Container, Dict, Iterable, List, Mapping, Optional, Tuple,
+                    Union)
+
+from pac_decompiler_refined import DEFAULT_PATTERN_TABLE, RefinedPACDecompiler
+from pac_ip_index import (IP_SOURCE_CIDR, IP_SOURCE_LIST, IPAddressIndex,
+                          IPIntervalMatcher, ip_to_int)
+from pac_patterns import PatternTable
+from pac_record_table import SortedRecordTable
+from pac_stream import iter_domain_groups
+
+
+# Verdict names for the three FindProxyForURL outcomes
+VERDICT_PROXY = 'PROXY'
+VERDICT_DIRECT = 'DIRECT'
+VERDICT_FBTW = 'FBTW'
+
+# FindProxyForURL skips dnsResolve for hosts that already look like addresses
+_ADDRESS_HOST_RE = re.compile(r'^[0-9a-fA-F:.]*$')
+_THREE_LABELS_RE = re.compile(r'(.+)\.([^.]+\.[^.]+\.[^.]+$)')
+_TWO_LABELS_RE = re.compile(r'(.+)\.([^.]+\.[^.]+$)')
+_WWW_RE = re.compile(r'^www\.(.+)')
+_CURDOMAIN_RE = re.compile(r'(.*)\.([^.]+$)')
+
+
+def dns_resolve(host: str) -> Optional[str]:
+    """Resolver matching PAC dnsResolve(): IPv4 string or None"""
+    try:
+        return socket.gethostbyname(host)
+    except (OSError, UnicodeError):
+        return None
+
+
+class PacRuleEngine:
+    """
+    Answers FindProxyForURL(url, host) from decoded PAC data
+
+    IP rules only apply when a resolver is given, because the PAC file
+    resolves host names with dnsResolve() before checking d_ipaddr and
+    special. Without a resolver the engine behaves like a PAC host whose
+    dnsResolve() always fails, which is what offline batch audits want.
+    """
+
+    def __init__(self,
+                 groups: Mapping[Tuple[str, int], Container[str]],
+                 ip_index: IPAddressIndex,
+                 ip_matcher: IPIntervalMatcher,
+                 fbtw: Iterable[str],
+                 fbtw_rules: str,
+                 blocked_rules: str,
+                 shost_pattern: str,
+                 resolver: Optional[Callable[[str], Optional[str]]] = None,
+                 patterns: Optional[PatternTable] = None):
+        # (zone, length) -> compressed records: sorted fixed-width tables,
+        # in memory or mapped from a snapshot (pac_snapshot); any container
+        # of record strings works
+        self.groups = groups
+        self.ip_index = ip_index
+        self.ip_matcher = ip_matcher
+
+        self.fbtw = frozenset(fbtw)
+        self.fbtw_rules = fbtw_rules
+        self.blocked_rules = blocked_rules
+        self.shost_pattern = shost_pattern
+        self.shost_re = re.compile(shost_pattern) if shost_pattern else None
+        self.resolver = resolver
+        # patternreplace(host, false) table the records were compressed with
+        self.patterns = DEFAULT_PATTERN_TABLE if patterns is None else patterns
+
+    @staticmethod
+    def build_groups(domains: Iterable[Tuple[str, int, Union[str, bytes]]]
+                     ) -> Dict[Tuple[str, int], SortedRecordTable]:
+        """Sorts decoded (zone, length, data) groups into record tables"""
+        groups = {}
+        for zone, length, data in domains:
+            length = int(length)
+            groups[(zone, length)] = SortedRecordTable.from_block(data, length)
+        return groups
+
+    @classmethod
+    def from_decompiler(cls, decompiler: RefinedPACDecompiler,
+                        resolver: Optional[Callable[[str], Optional[str]]] = None,
+                        domains: Optional[Iterable[Tuple[str, int, Union[str, bytes]]]] = None
+                        ) -> 'PacRuleEngine':
+        """
+        Builds an engine from a decompiler that has already run decompile()
+        `domains` overrides the decompiler's decoded groups (e.g. a stream)
+        """
+        if domains is None:
+            domains = ((zone, length, data)
+                       for zone, domain_dict in decompiler.domains_raw.items()
+                       for length, data in domain_dict.items())
+        return cls(
+            groups=cls.build_groups(domains),
+            ip_index=decompiler.d_ipaddr_index,
+            ip_matcher=IPIntervalMatcher.from_sources(decompiler.d_ipaddr_index,
+                                                      decompiler.special_cidrs),
+            fbtw=decompiler.fbtw,
+            fbtw_rules=decompiler.fbtw_rules,
+            blocked_rules=decompiler.blocked_rules,
+            shost_pattern=decompiler.shost_pattern,
+            resolver=resolver,
+            patterns=decompiler.pattern_table,
+        )
+
+    @classmethod
+    def from_pac_file(cls, pac_file_path: str,
+                      resolver: Optional[Callable[[str], Optional[str]]] = None) -> 'PacRuleEngine':
+        """
+        Builds an engine from a PAC file
+        Domain groups are streamed; only the small sections are decompiled
+        """
+        decompiler = RefinedPACDecompiler(pac_file_path, verbose=False)
+        if not decompiler.decompile(decompress=False):
+            raise ValueError(f"Cannot decompile PAC file: {pac_file_path}")
+        decompiler.release_source()
+        return cls.from_decompiler(decompiler, resolver=resolver,
+                                   domains=iter_domain_groups(pac_file_path))
+
+    def short_host(self, host: str) -> str:
+        """Reduces a host to the shost FindProxyForURL looks up"""
+        if self.shost_re is not None and self.shost_re.search(host):
+            shost = _THREE_LABELS_RE.sub(r'\2', host, count=1)
+        else:
+            shost = _TWO_LABELS_RE.sub(r'\2', host, count=1)
+
+        # remove leading www
+        return _WWW_RE.sub(r'\1', shost, count=1)
+
+    def compress_host(self, host: str) -> str:
+        """Implements patternreplace(host, false) with the engine's pattern table"""
+        return self.patterns.compress(host)
+
+    def match_domain(self, shost: str) -> Optional[bool]:
+        """
+        Checks shost against the domain groups
+        Returns None when shost has no usable zone (FindProxyForURL returns DIRECT)
+        """
+        curdomain = _CURDOMAIN_RE.match(shost)
+        if not curdomain or not curdomain.group(1):
+            return None
+
+        curhost = self.compress_host(curdomain.group(1))
+        group = self.groups.get((curdomain.group(2), len(curhost)))
+        return group is not None and curhost in group
+
+    def ip_source(self, ip: str) -> int:
+        """
+        Where a dotted IPv4 address is listed: IP_SOURCE_LIST (d_ipaddr),
+        IP_SOURCE_CIDR (special), both flags, or 0 when not listed
+        """
+        value = ip_to_int(ip)
+        if value is None:
+            return 0
+        return self.ip_matcher.lookup(value)
+
+    def match_ip(self, ip: str) -> bool:
+        """Checks a dotted IPv4 address against d_ipaddr and special"""
+        return self.ip_source(ip) != 0
+
+    def classify(self, host: str) -> str:
+        """Returns VERDICT_PROXY, VERDICT_DIRECT or VERDICT_FBTW for a host"""
+        verdict = self.domain_verdict(self.short_host(host))
+        if verdict is not None:
+            return verdict
+        return self.address_verdict(host)
+
+    def domain_verdict(self, shost: str) -> Optional[str]:
+        """
+        Verdict decided by shost alone
+        None when the domain is not listed and the IP rules decide.
+        """
+        if shost in self.fbtw:
+            return VERDICT_FBTW
+
+        domain_hit = self.match_domain(shost)
+        if domain_hit is None:
+            return VERDICT_DIRECT
+
+        if domain_hit:
+            return VERDICT_PROXY
+        return None
+
+    def address_verdict(self, host: str) -> str:
+        """Verdict from the resolved address of a host with an unlisted domain"""
+        if self.resolver is not None and not _ADDRESS_HOST_RE.match(host):
+            # Do not resolve IPv4/v6 addresses, same as the PAC file
+            oip = self.resolver(host)
+            if oip and self.match_ip(oip):
+                return VERDICT_PROXY
+
+        return VERDICT_DIRECT
+
+    def find_proxy(self, url: str, host: str) -> str:
+        """Same return value as FindProxyForURL(url, host) in the PAC file"""
+        verdict = self.classify(host)
+        if verdict == VERDICT_FBTW:
+            return self.fbtw_rules
+        if verdict == VERDICT_PROXY:
+            return self.blocked_rules
+        return 'DIRECT'
+
+
+def blocked_domains(engine: PacRuleEngine) -> List[str]:
+    """
+    Sorted expanded names of all records FindProxyForURL can match
+    Non-canonical records (never produced by patternreplace) are skipped.
+    """
+    patterns = engine.patterns
+    names = []
+    for (zone, _), records in engine.groups.items():
+        for record in records:
+            name = patterns.expand(record)
+            if patterns.compress(name) == record:
+                names.append(f"{name}.{zone}")
+    names.sort()
+    return names
+
+
+def ip_ranges(engine: PacRuleEngine) -> List[Tuple[int, int]]:
+    """Merged [first, last] address ranges of d_ipaddr and special"""
+    ranges = []
+    for start, end, _ in engine.ip_matcher.iter_intervals():
+        if ranges and ranges[-1][1] + 1 >= start:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 3:
+        print("Usage: python pac_rule_engine.py <pac_file> <host> [host ...]")
+        print("Example: python pac_rule_engine.py pac.pac rutracker.org")
+        sys.exit(1)
+
+    engine = PacRuleEngine.from_pac_file(sys.argv[1])
+    for host in sys.argv[2:]:
+        print(f"{host}\t{engine.find_proxy('http://' + host + '/', host)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+PAC Section Parser
+Single-pass tokenizer for the top-level sections of a PAC file, without eval
+
+One left-to-right scan splits the file into top-level statements:
+- `var NAME = ...;` and `NAME = ...;` assignments
+- `function NAME(...) {...}` declarations
+
+Every section records its offsets in the content. Object, array, string and
+number literals (and a trailing `.split("sep")`, as used by d_ipaddr) are
+parsed into Python values; other expressions keep value None. Nothing is
+ever evaluated, so an untrusted PAC file cannot run Python code.
+
+Usage:
+    sections = parse_pac_sections(content)
+    sections['domains'].value              # {'ru': {5: 12, ...}, ...}
+    sections['FindProxyForURL'].text(content)
+"""
+
+import re
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+  | (?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<punct>===|!==|==|!=|<=|>=|&&|\|\||<<|>>>|>>|[-{}\[\]();,.:=+*/%<>!?&|^~])
+''', re.DOTALL | re.VERBOSE)
+
+_REGEX_LITERAL_RE = re.compile(r'/(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*')
+
+# A '/' after these tokens starts a regex literal rather than a division
+_REGEX_PREFIX = {'(', ',', '=', ':', '[', '!', '&&', '||', '?', '{', '}', ';',
+                 '==', '===', '!=', '!==', 'return', 'typeof', None}
+
+_STRING_ESCAPE_RE = re.compile(r'\\(?:\r\n|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)', re.DOTALL)
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+
+_KEYWORD_VALUES = {'true': True, 'false': False, 'null': None}
+
+# Nesting limit for array/object literals, far below the recursion limit
+MAX_LITERAL_DEPTH = 100
+
+
+class PacSyntaxError(ValueError):
+    """Raised when the PAC content cannot be tokenized or parsed"""
+
+
+class PacSection:
+    """One top-level statement: var/assignment or function declaration"""
+
+    def __init__(self, name: str, kind: str, start: int, end: int,
+                 value_start: int, value_end: int, value: Any = None):
+        self.name = name
+        self.kind = kind                # 'var', 'assign' or 'function'
+        self.start = start              # offsets of the whole statement
+        self.end = end
+        self.value_start = value_start  # offsets of the value / function body
+        self.value_end = value_end
+        self.value = value              # parsed literal, or None
+
+    def text(self, content: str) -> str:
+        """Source of the value (or function body)"""
+        return content[self.value_start:self.value_end]
+
+    def __repr__(self) -> str:
+        return f"PacSection({self.name!r}, {self.kind}, {self.start}:{self.end})"
+
+
+def decode_js_string(token: str) -> str:
+    """Decodes a quoted JavaScript string literal (line continuations removed)"""
+    def replace(match):
+        escape = match.group(0)[1:]
+        if escape in ('\n', '\r\n', '\r', '\u2028', '\u2029'):
+            return ''
+        if escape[0] in 'xu' and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        return _SIMPLE_ESCAPES.get(escape, escape)
+
+    body = token[1:-1]
+    if '\\' not in body:
+        return body
+    return _STRING_ESCAPE_RE.sub(replace, body)
+
+
+def tokenize(content: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[str, str, int, int]]:
+    """Returns (kind, text, start, end) tokens, skipping spaces and comments"""
+    end = len(content) if end is None else end
+    tokens = []
+    previous = None
+    pos = start
+    match_token = _TOKEN_RE.match
+    while pos < end:
+        if content[pos] == '/' and content[pos + 1:pos + 2] not in ('/', '*') and previous in _REGEX_PREFIX:
+            match = _REGEX_LITERAL_RE.match(content, pos, end)
+            if match:
+                tokens.append(('regex', match.group(0), pos, match.end()))
+                previous = 'regex'
+                pos = match.end()
+                continue
+
+        match = match_token(content, pos, end)
+        if not match:
+            raise PacSyntaxError(f"unexpected character {content[pos]!r} at offset {pos}")
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            text = match.group(0)
+            tokens.append((kind, text, pos, match.end()))
+            previous = text if kind in ('punct', 'name') else kind
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser over a token list"""
+
+    def __init__(self, tokens: List[Tuple[str, str, int, int]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str, int, int]:
+        index = self.pos + offset
+        if index < len(self.tokens):
+            return self.tokens[index]
+        return ('eof', '', -1, -1)
+
+    def next(self) -> Tuple[str, str, int, int]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, text: str) -> Tuple[str, str, int, int]:
+        token = self.next()
+        if token[1] != text:
+            raise PacSyntaxError(f"expected {text!r} at offset {token[2]}, got {token[1]!r}")
+        return token
+
+    def skip_balanced(self, stop: Tuple[str, ...]) -> None:
+        """Skips tokens up to (not including) a stop token at nesting depth 0"""
+        depth = 0
+        while True:
+            kind, text, _, _ = self.peek()
+            if kind == 'eof' or (depth == 0 and text in stop):
+                return
+            if text in ('(', '[', '{'):
+                depth += 1
+            elif text in (')', ']', '}'):
+                if depth == 0:
+                    return
+                depth -= 1
+            self.pos += 1
+
+    def literal(self, depth: int = 0) -> Any:
+        """Parses an object, array, string, number or keyword literal"""
+        kind, text, offset, _ = self.next()
+        if depth > MAX_LITERAL_DEPTH:
+            raise PacSyntaxError(f"literal nested deeper than {MAX_LITERAL_DEPTH} at offset {offset}")
+        if kind == 'string':
+            value = decode_js_string(text)
+            # "...".split("sep")
+            if self.peek()[1] == '.' and self.peek(1)[1] == 'split' and self.peek(2)[1] == '(':
+                self.pos += 3
+                separator = self.literal()
+                self.expect(')')
+                if not isinstance(separator, str):
+                    raise PacSyntaxError(f"unsupported split() argument at offset {offset}")
+                value = value.split(separator) if separator else list(value)
+            return value
+        if kind == 'number':
+            return float(text) if any(c in text for c in '.eE') else int(text)
+        if text == '-' and self.peek()[0] == 'number':
+            return -self.literal()
+        if kind == 'name' and text in _KEYWORD_VALUES:
+            return _KEYWORD_VALUES[text]
+        if text == '[':
+            items = []
+            while self.peek()[1] != ']':
+                items.append(self.literal(depth + 1))
+                if self.peek()[1] != ']':
+                    self.expect(',')
+            self.next()
+            return items
+        if text == '{':
+            result = {}
+            while self.peek()[1] != '}':
+                key_kind, key, key_offset, _ = self.next()
+                if key_kind == 'string':
+                    key = decode_js_string(key)
+                elif key_kind == 'number':
+                    key = int(key) if key.isdigit() else float(key)
+                elif key_kind != 'name':
+                    raise PacSyntaxError(f"bad object key {key!r} at offset {key_offset}")
+                self.expect(':')
+                result[key] = self.literal(depth + 1)
+                if self.peek()[1] != '}':
+                    self.expect(',')
+            self.next()
+            return result
+        raise PacSyntaxError(f"not a literal: {text!r} at offset {offset}")
+
+    def value(self) -> Tuple[Any, int, int]:
+        """Parses an assignment value up to ';', returning (value, start, end)"""
+        start_index = self.pos
+        start = self.peek()[2]
+        try:
+            value = self.literal()
+            if self.peek()[1] not in (';', 'eof'):
+                raise PacSyntaxError("expression continues after literal")
+        except PacSyntaxError:
+            # Not a plain literal (e.g. `(1 << TABLE_LEN_BITS) - 1`): keep offsets only
+            self.pos = start_index
+            value = None
+            self.skip_balanced((';',))
+        end = self.tokens[self.pos - 1][3] if self.pos > start_index else start
+        return value, start, end
+
+
+def parse_js_literal(source: str) -> Any:
+    """Parses one JavaScript literal (object, array, string or number) without eval"""
+    parser = _Parser(tokenize(source))
+    value = parser.literal()
+    if parser.peek()[0] != 'eof':
+        raise PacSyntaxError(f"trailing data at offset {parser.peek()[2]}")
+    return value
+
+
+def parse_pac_sections(content: str) -> Dict[str, PacSection]:
+    """Splits PAC content into its top-level sections in one pass"""
+    parser = _Parser(tokenize(content))
+    sections: Dict[str, PacSection] = {}
+
+    while parser.peek()[0] != 'eof':
+        kind, text, start, _ = parser.peek()
+
+        if text == 'function' and parser.peek(1)[0] == 'name':
+            parser.pos += 1
+            name = parser.next()[1]
+            parser.expect('(')
+            parser.skip_balanced((')',))
+            parser.expect(')')
+            body_start = parser.expect('{')[3]
+            parser.skip_balanced(('}',))
+            body_end = parser.peek()[2]
+            end = parser.expect('}')[3]
+            sections[name] = PacSection(name, 'function', start, end, body_start, body_end)
+            continue
+
+        section_kind = 'assign'
+        if text == 'var':
+            section_kind = 'var'
+            parser.pos += 1
+        if parser.peek()[0] == 'name' and parser.peek(1)[1] == '=':
+            name = parser.next()[1]
+            parser.next()
+            value, value_start, value_end = parser.value()
+            end = value_end
+            if parser.peek()[1] == ';':
+                end = parser.next()[3]
+            sections[name] = PacSection(name, section_kind, start, end, value_start, value_end, value)
+            continue
+
+        # Any other top-level statement is skipped
+        parser.skip_balanced((';',))
+        parser.next()
+
+    return sections
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 2:
+        print("Usage: python pac_sections.py <pac_file>")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        content = f.read()
+    for section in parse_pac_sections(content).values():
+        value = type(section.value).__name__ if section.value is not None else '-'
+        print(f"{section.start:>8} {section.end:>8}  {section.kind:<8} {section.name:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
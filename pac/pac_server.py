@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+PAC Server
+Local HTTP server for PAC files built from the decoded rules
+
+Browsers fetch the PAC at startup and on every proxy reconfiguration;
+with every LAN client going upstream the server rate-limits them. This
+server answers from memory, with everything done once per rule set:
+- variants: 'fast' (pac_emitter output) and 'upstream' (the PAC file as
+  downloaded); User-Agent rules choose one per client, and the choice is
+  cached per distinct User-Agent string
+- each variant body is kept plain and gzip-compressed, each with its own
+  strong ETag (SHA-256 of the body sent)
+- If-None-Match / If-Modified-Since are answered with 304 and no body
+- HTTP/1.1 keep-alive, so a polling client reuses its connection
+
+With --url the PAC is also kept up to date through PacUpdater (same
+throttling rules); new rules replace all variants at once.
+
+Paths: / /proxy.pac /wpad.dat serve the variant chosen for the client,
+/fast.pac and /upstream.pac a fixed one.
+
+Usage:
+    python3 pac_server.py pac.pac --port 8080
+    python3 pac_server.py pac.pac --url https://example.org/proxy.pac --rule 'MSIE|Trident=upstream'
+"""
+
+import argparse
+import gzip
+import hashlib
+import re
+import sys
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pac_emitter import emit_pac
+from pac_rule_engine import PacRuleEngine
+from pac_snapshot import open_engine
+
+CONTENT_TYPE = 'application/x-ns-proxy-autoconfig'
+
+PAC_PATHS = ('/', '/proxy.pac', '/wpad.dat')
+
+VARIANT_FAST = 'fast'
+VARIANT_UPSTREAM = 'upstream'
+VARIANTS = (VARIANT_FAST, VARIANT_UPSTREAM)
+
+DEFAULT_MAX_AGE = 300
+
+# Distinct User-Agent strings whose variant is remembered
+USER_AGENT_CACHE_SIZE = 4096
+
+
+class Body(NamedTuple):
+    """One encoded representation of a variant"""
+    data: bytes
+    etag: str
+
+
+class Variant(NamedTuple):
+    """A PAC body, plain and gzip-compressed"""
+    plain: Body
+    gzip: Body
+
+
+def make_variant(content: bytes) -> Variant:
+    """Precomputes both encodings and their strong ETags"""
+    # mtime=0 keeps the gzip body (and its ETag) stable across restarts
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    return Variant(Body(content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'),
+                   Body(compressed, f'"{hashlib.sha256(compressed).hexdigest()[:32]}"'))
+
+
+def parse_rules(rules: Sequence[str]) -> List[Tuple['re.Pattern', str]]:
+    """'REGEX=VARIANT' strings to (compiled regex, variant) pairs"""
+    parsed = []
+    for rule in rules:
+        pattern, sep, variant = rule.rpartition('=')
+        if not sep or not pattern:
+            raise ValueError(f"rule must be REGEX=VARIANT: {rule}")
+        parsed.append((re.compile(pattern), variant))
+    return parsed
+
+
+def accepts_gzip(header: str) -> bool:
+    """
+    Accept-Encoding test: gzip (or x-gzip), else *, with a non-zero q-value
+    Elements with an invalid q-value are ignored.
+    """
+    qualities = {}
+    for element in header.split(','):
+        coding, *params = [part.strip() for part in element.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = None
+        if quality is not None:
+            qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match test (weak comparison, as RFC 9110 requires for it)"""
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class PacStore:
+    """
+    Current PAC variants and the User-Agent -> variant choice
+
+    Variants are replaced as one dict, so request threads always see a
+    complete set without locking. Rules and the default may only name
+    VARIANTS (ValueError otherwise).
+    """
+
+    def __init__(self, rules: Sequence[Tuple['re.Pattern', str]] = (),
+                 default_variant: str = VARIANT_FAST):
+        for _, variant in rules:
+            if variant not in VARIANTS:
+                raise ValueError(f"unknown variant in rule: {variant}")
+        if default_variant not in VARIANTS:
+            raise ValueError(f"unknown default variant: {default_variant}")
+        self.rules = list(rules)
+        self.default_variant = default_variant
+        self.variants: Dict[str, Variant] = {}
+        self.last_modified = ''
+        self.modified_at = 0
+        self._user_agents: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, engine: PacRuleEngine, upstream: bytes, source: str = 'pac.pac'):
+        """Builds every variant from one rule set, then swaps them in"""
+        variants = {
+            VARIANT_FAST: make_variant(emit_pac(engine, source).encode('utf-8')),
+            VARIANT_UPSTREAM: make_variant(upstream),
+        }
+        # Last-Modified has one-second resolution
+        self.modified_at = int(time.time())
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+        self.variants = variants
+
+    def variant_for(self, user_agent: str) -> str:
+        """Variant name for a User-Agent: first matching rule, else the default"""
+        name = self._user_agents.get(user_agent)
+        if name is None:
+            name = next((variant for pattern, variant in self.rules
+                         if pattern.search(user_agent)), self.default_variant)
+            with self._lock:
+                if len(self._user_agents) >= USER_AGENT_CACHE_SIZE:
+                    self._user_agents.clear()
+                self._user_agents[user_agent] = name
+        return name
+
+
+class PacRequestHandler(BaseHTTPRequestHandler):
+    """Serves the variants of server.store"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'pac_server'
+
+    def do_GET(self):
+        self.send_pac(head=False)
+
+    def do_HEAD(self):
+        self.send_pac(head=True)
+
+    def send_pac(self, head: bool):
+        store = self.server.store
+        variants = store.variants
+        if not variants:
+            self.send_error(503, "PAC not loaded yet")
+            return
+        path = self.path.split('?', 1)[0]
+        if path in PAC_PATHS:
+            name = store.variant_for(self.headers.get('User-Agent', ''))
+        elif path.endswith('.pac') and path[1:-4] in variants:
+            name = path[1:-4]
+        else:
+            self.send_error(404)
+            return
+
+        variant = variants[name]
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        body = variant.gzip if use_gzip else variant.plain
+
+        if self.not_modified(body.etag, store.modified_at):
+            self.send_response(304)
+            self.send_common_headers(body.etag, store.last_modified)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body.data)))
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_common_headers(body.etag, store.last_modified)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body.data)
+
+    def not_modified(self, etag: str, modified_at: int) -> bool:
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= modified_at
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_common_headers(self, etag: str, last_modified: str):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', f"max-age={self.server.max_age}")
+        self.send_header('Vary', 'User-Agent, Accept-Encoding')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PacServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a PacStore"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], store: PacStore,
+                 max_age: int = DEFAULT_MAX_AGE, verbose: bool = False):
+        super().__init__(address, PacRequestHandler)
+        self.store = store
+        self.max_age = max_age
+        self.verbose = verbose
+
+
+def load_pac_file(store: PacStore, pac_path: str, engine: Optional[PacRuleEngine] = None):
+    """Loads a local PAC file (and its rules) into a store"""
+    if engine is None:
+        engine = open_engine(pac_path)
+    with open(pac_path, 'rb') as f:
+        upstream = f.read()
+    store.load(engine, upstream, source=pac_path)
+
+
+def refresh_loop(updater, stop: threading.Event):
+    """Runs PacUpdater.update() whenever allowed; new rules reload the store"""
+    while not stop.is_set():
+        try:
+            updater.update()
+        except (OSError, ValueError) as e:
+            print(f"⚠ Update failed: {e}", file=sys.stderr)
+        stop.wait(max(updater.seconds_until_allowed(), 1.0))
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Serve PAC variants from memory")
+    parser.add_argument('pac_file', help="local PAC file (kept up to date with --url)")
+    parser.add_argument('--host', default='0.0.0.0', help="bind address (default: 0.0.0.0)")
+    parser.add_argument('--port', type=int, default=8080, help="port (default: 8080)")
+    parser.add_argument('--url', help="upstream PAC URL to refresh from")
+    parser.add_argument('--rule', action='append', default=[],
+                        help="User-Agent rule REGEX=VARIANT (repeatable, first match wins)")
+    parser.add_argument('--default-variant', default=VARIANT_FAST, choices=VARIANTS,
+                        help="variant when no rule matches (default: fast)")
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help="Cache-Control max-age in seconds (default: 300)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    try:
+        store = PacStore(parse_rules(args.rule), args.default_variant)
+    except (re.error, ValueError) as e:
+        parser.error(str(e))
+
+    stop = threading.Event()
+    if args.url:
+        from pac_update import PacUpdater
+        updater = PacUpdater(args.url, args.pac_file, verbose=True,
+                             on_update=lambda engine: load_pac_file(store, args.pac_file, engine))
+        if updater.engine is not None:
+            load_pac_file(store, args.pac_file, updater.engine)
+        threading.Thread(target=refresh_loop, args=(updater, stop), daemon=True).start()
+    else:
+        start = time.perf_counter()
+        load_pac_file(store, args.pac_file)
+        print(f"✓ Loaded {args.pac_file} in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    for name, variant in store.variants.items():
+        print(f"  {name}: {len(variant.plain.data):,} bytes, "
+              f"{len(variant.gzip.data):,} gzip", file=sys.stderr)
+
+    server = PacServer((args.host, args.port), store, args.max_age, args.verbose)
+    print(f"✓ Serving on http://{args.host}:{server.server_address[1]}/proxy.pac",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
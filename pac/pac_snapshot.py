@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Compiled Rule Snapshot
+Warm-start PacRuleEngine from a memory-mapped, content-hash keyed file
+
+Building an engine re-reads the PAC file, decodes the LZP stream and splits
+every group into records. The snapshot stores the result once per PAC
+SHA-256 next to the PAC file (pac.pac.pacsnap):
+- one sorted fixed-width record table per (zone, length)
+- the uint32 d_ipaddr array
+- the IPIntervalMatcher arrays (starts, ends, sources)
+- fbtw hosts, return strings, the shost pattern and the host pattern
+  table (JSON header)
+
+Loading maps the file read-only and searches it in place: record tables are
+binary-searched and the uint32 arrays are zero-copy views, so a warm start
+takes milliseconds and worker processes share the same page-cache pages.
+
+Usage:
+    engine = open_engine('pac.pac')     # loads or builds pac.pac.pacsnap
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Dict, Optional, Tuple
+
+from pac_ip_index import UINT32_TYPECODE, IPAddressIndex, IPIntervalMatcher, np
+from pac_patterns import PatternTable
+from pac_record_table import SortedRecordTable
+from pac_rule_engine import PacRuleEngine
+from pac_stream import file_sha256
+
+SNAPSHOT_SUFFIX = '.pacsnap'
+SNAPSHOT_MAGIC = b'PACSNAP2'
+
+# magic, SHA-256 of the PAC file, header length
+_PREFIX = struct.Struct('<8s32sI')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def snapshot_path(pac_path: str) -> str:
+    return pac_path + SNAPSHOT_SUFFIX
+
+
+def _uint32_bytes(values) -> bytes:
+    packed = array(UINT32_TYPECODE, (int(value) for value in values))
+    if not _LITTLE_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def write_snapshot(engine: PacRuleEngine, path: str, content_hash: bytes) -> str:
+    """Serializes an engine's lookup structures (written atomically)"""
+    body = bytearray()
+    header = {'groups': []}
+
+    def add(data: bytes, align: int = 1) -> int:
+        body.extend(b'\x00' * (-len(body) % align))
+        offset = len(body)
+        body.extend(data)
+        return offset
+
+    for (zone, length), records in sorted(engine.groups.items()):
+        if not isinstance(records, SortedRecordTable):
+            records = SortedRecordTable.from_block(''.join(records), length)
+        header['groups'].append([zone, length, add(records.tobytes()), len(records)])
+
+    matcher = engine.ip_matcher
+    for name, values in (('ip_values', engine.ip_index.values),
+                         ('starts', matcher.starts), ('ends', matcher.ends)):
+        header[name] = [add(_uint32_bytes(values), 4), len(values)]
+    header['sources'] = [add(bytes(int(source) for source in matcher.sources)), len(matcher.sources)]
+
+    header['fbtw'] = sorted(engine.fbtw)
+    header['fbtw_rules'] = engine.fbtw_rules
+    header['blocked_rules'] = engine.blocked_rules
+    header['shost_pattern'] = engine.shost_pattern
+    header['patterns'] = engine.patterns.patterns
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    # Body offsets are relative to the first 8-byte aligned position after the header
+    body_start = _PREFIX.size + len(header_bytes)
+    padding = -body_start % 8
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(SNAPSHOT_MAGIC, content_hash, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\x00' * padding)
+        f.write(body)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _uint32_view(buffer, offset: int, count: int):
+    """Zero-copy uint32 view of the mapped file (a copy on big-endian hosts)"""
+    if np is not None:
+        return np.frombuffer(buffer, dtype='<u4', count=count, offset=offset)
+    if _LITTLE_ENDIAN:
+        return memoryview(buffer)[offset:offset + 4 * count].cast(UINT32_TYPECODE)
+    values = array(UINT32_TYPECODE)
+    values.frombytes(buffer[offset:offset + 4 * count])
+    values.byteswap()
+    return values
+
+
+def load_snapshot(pac_path: str, content_hash: Optional[bytes] = None,
+                  resolver: Optional[Callable[[str], Optional[str]]] = None
+                  ) -> Optional[PacRuleEngine]:
+    """Maps the snapshot of a PAC file; None if missing or for other content"""
+    if content_hash is None:
+        content_hash = file_sha256(pac_path)
+    try:
+        with open(snapshot_path(pac_path), 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < _PREFIX.size:
+        return None
+    magic, stored_hash, header_len = _PREFIX.unpack_from(buffer)
+    if magic != SNAPSHOT_MAGIC or stored_hash != content_hash:
+        return None
+
+    header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_len].decode('utf-8'))
+    base = _PREFIX.size + header_len
+    base += -base % 8
+
+    groups: Dict[Tuple[str, int], SortedRecordTable] = {
+        (zone, length): SortedRecordTable(buffer, base + offset, count, length)
+        for zone, length, offset, count in header['groups']
+    }
+
+    def view(name):
+        offset, count = header[name]
+        return _uint32_view(buffer, base + offset, count)
+
+    offset, count = header['sources']
+    if np is not None:
+        sources = np.frombuffer(buffer, dtype=np.uint8, count=count, offset=base + offset)
+    else:
+        sources = memoryview(buffer)[base + offset:base + offset + count]
+
+    return PacRuleEngine(
+        groups=groups,
+        ip_index=IPAddressIndex(view('ip_values')),
+        ip_matcher=IPIntervalMatcher(view('starts'), view('ends'), sources),
+        fbtw=header['fbtw'],
+        fbtw_rules=header['fbtw_rules'],
+        blocked_rules=header['blocked_rules'],
+        shost_pattern=header['shost_pattern'],
+        resolver=resolver,
+        patterns=PatternTable(header['patterns']),
+    )
+
+
+def ensure_snapshot(pac_path: str) -> Optional[str]:
+    """Writes the snapshot if it is missing or stale; None if it cannot be written"""
+    content_hash = file_sha256(pac_path)
+    path = snapshot_path(pac_path)
+    if load_snapshot(pac_path, content_hash) is not None:
+        return path
+    try:
+        return write_snapshot(PacRuleEngine.from_pac_file(pac_path), path, content_hash)
+    except OSError as e:
+        print(f"⚠ Warning: cannot save rule snapshot: {e}", file=sys.stderr)
+        return None
+
+
+def open_engine(pac_path: str,
+                resolver: Optional[Callable[[str], Optional[str]]] = None,
+                save: bool = True) -> PacRuleEngine:
+    """
+    Warm start from the snapshot, building (and saving) it on first use
+    With save=False an existing snapshot is used but none is written.
+    """
+    content_hash = file_sha256(pac_path)
+    engine = load_snapshot(pac_path, content_hash, resolver)
+    if engine is not None:
+        return engine
+
+    engine = PacRuleEngine.from_pac_file(pac_path, resolver=resolver)
+    if not save:
+        return engine
+    try:
+        write_snapshot(engine, snapshot_path(pac_path), content_hash)
+    except OSError as e:
+        print(f"⚠ Warning: cannot save rule snapshot: {e}", file=sys.stderr)
+    return engine
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 2:
+        print("Usage: python pac_snapshot.py <pac_file>")
+        sys.exit(1)
+
+    path = ensure_snapshot(sys.argv[1])
+    if path is None:
+        sys.exit(1)
+    print(f"✓ Snapshot: {path} ({os.path.getsize(path):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
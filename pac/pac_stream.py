@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+PAC Stream
+Generator-based domain decoding with bounded memory
+
+iter_domain_groups() memory-maps the PAC file, copies out only the three
+sections the domains loop needs (domains structure, domains_lzp, mask_lzp;
+the structure is parsed with pac_sections, without eval; the two string
+literals are unescaped with the same decode_js_string) and yields every
+group as soon as it leaves the LZP stream:
+
+    for zone, length, raw in iter_domain_groups('pac.pac'):
+        ...
+
+raw is the group exactly as FindProxyForURL sees it (pattern-compressed,
+`length` characters per record). Nothing is accumulated between groups, so
+peak memory is the compressed input plus the 256 KB prediction table and
+one leftover buffer, whatever the size of the decoded domain list.
+"""
+
+import hashlib
+import mmap
+import re
+from typing import Dict, Iterator, Tuple
+
+from pac_lzp import CursorLZPDecoder
+from pac_mask_index import decode_mask
+from pac_sections import decode_js_string, parse_js_literal
+
+_STRUCTURE_RE = re.compile(rb'domains\s*=\s*(\{.*?\});', re.DOTALL)
+# Whole quoted literal, escapes (line continuations included) left in place
+_DOMAINS_LZP_RE = re.compile(rb'var\s+domains_lzp\s*=\s*("[^"\\]*(?:\\.[^"\\]*)*")\s*;', re.DOTALL)
+_MASK_LZP_RE = re.compile(rb'var\s+mask_lzp\s*=\s*("[^"\\]*(?:\\.[^"\\]*)*")\s*;', re.DOTALL)
+
+
+def file_sha256(path: str) -> bytes:
+    """SHA-256 digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def decode_string_literal(token: bytes, name: str) -> bytes:
+    """
+    Decodes a quoted JavaScript string literal the way pac_sections does
+    (decode_js_string), so both paths read the same characters
+    """
+    if b'\\' not in token:
+        return token[1:-1]
+    value = decode_js_string(token.decode('latin-1'))
+    try:
+        return value.encode('latin-1')
+    except UnicodeEncodeError:
+        raise ValueError(f"{name} has characters outside latin-1 after unescaping") from None
+
+
+def read_lzp_sections(pac_path: str) -> Tuple[Dict[str, Dict[int, int]], bytes, bytes]:
+    """
+    Extracts (domains structure, domains_lzp, decoded mask) from a PAC file
+    without loading the whole file into a string
+    """
+    with open(pac_path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            raise ValueError(f"Empty PAC file: {pac_path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            sections = []
+            for name, pattern in (('domains', _STRUCTURE_RE),
+                                  ('domains_lzp', _DOMAINS_LZP_RE),
+                                  ('mask_lzp', _MASK_LZP_RE)):
+                match = pattern.search(content)
+                if not match:
+                    raise ValueError(f"{name} not found in {pac_path}")
+                sections.append(match.group(1))
+
+    source, data, mask = sections
+    data = decode_string_literal(data, 'domains_lzp')
+    mask = decode_mask(decode_string_literal(mask, 'mask_lzp'))
+    return parse_js_literal(source.decode('latin-1')), data, mask
+
+
+def iter_domain_groups(pac_path: str) -> Iterator[Tuple[str, int, bytes]]:
+    """Yields (zone, length, raw_bytes) for every domain group in stream order"""
+    structure, data, mask = read_lzp_sections(pac_path)
+    decoder = CursorLZPDecoder(data, mask)
+    yield from decoder.iter_groups(structure)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+PAC Updater
+Conditional PAC downloads with ETag/If-Modified-Since and rate limiting
+
+The PAC server varies the file by User-Agent, bans some User-Agents with an
+empty response and asks clients not to fetch more than once a minute. The
+updater keeps the validators of the last response next to the PAC file
+(pac.pac.pacmeta) and on every update():
+- does nothing when the minimum interval (or a Retry-After) has not passed
+- sends If-None-Match / If-Modified-Since and a configurable User-Agent
+- stops on 304 Not Modified without reading or decoding anything
+- on 200 compares the SHA-256 with the current file; identical content
+  only refreshes the validators
+- otherwise decodes the download into a PacRuleEngine first, then replaces
+  the PAC file and its rule snapshot atomically and swaps `engine`
+
+A failed download or an undecodable file never touches the current PAC.
+
+Usage:
+    updater = PacUpdater('https://example.org/proxy.pac', 'pac.pac')
+    updater.update()            # UPDATE_UPDATED, UPDATE_NOT_MODIFIED, ...
+    updater.engine.classify('rutracker.org')
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+from pac_rule_engine import PacRuleEngine
+from pac_snapshot import open_engine, snapshot_path, write_snapshot
+from pac_stream import file_sha256
+
+META_SUFFIX = '.pacmeta'
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0'
+
+# "Do not request PAC file faster than once a minute"
+DEFAULT_MIN_INTERVAL = 60.0
+
+# Results of PacUpdater.update()
+UPDATE_THROTTLED = 'throttled'        # not fetched: too early
+UPDATE_NOT_MODIFIED = 'not_modified'  # 304, nothing decoded
+UPDATE_UNCHANGED = 'unchanged'        # 200 with the same content hash
+UPDATE_UPDATED = 'updated'            # new rules are active
+
+
+def parse_retry_after(value: str, now: float) -> Optional[float]:
+    """Seconds to wait from a Retry-After value (delay-seconds or HTTP-date)"""
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, retry_at - now)
+
+
+class PacUpdater:
+    """Keeps a local PAC file and its compiled rules in sync with a URL"""
+
+    def __init__(self, url: str, pac_path: str,
+                 user_agent: str = DEFAULT_USER_AGENT,
+                 min_interval: float = DEFAULT_MIN_INTERVAL,
+                 timeout: float = 30.0,
+                 on_update: Optional[Callable[[PacRuleEngine], None]] = None,
+                 verbose: bool = False):
+        self.url = url
+        self.pac_path = pac_path
+        self.user_agent = user_agent
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.on_update = on_update
+        self.verbose = verbose
+        self.meta = self.load_meta()
+        self._engine: Optional[PacRuleEngine] = None
+
+    def log(self, message: str):
+        if self.verbose:
+            print(message, file=sys.stderr)
+
+    @property
+    def meta_path(self) -> str:
+        return self.pac_path + META_SUFFIX
+
+    def load_meta(self) -> Dict:
+        """Validators and timestamps of the last fetch ({} if none)"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    @property
+    def engine(self) -> Optional[PacRuleEngine]:
+        """Rules of the current PAC file (None before the first download)"""
+        if self._engine is None and os.path.exists(self.pac_path):
+            self._engine = open_engine(self.pac_path)
+        return self._engine
+
+    def seconds_until_allowed(self, now: Optional[float] = None) -> float:
+        """Time left before the server may be asked again (0 if allowed)"""
+        now = time.time() if now is None else now
+        allowed_at = max(self.meta.get('fetched_at', 0.0) + self.min_interval,
+                         self.meta.get('retry_at', 0.0))
+        return max(0.0, allowed_at - now)
+
+    def build_request(self) -> urllib.request.Request:
+        headers = {'User-Agent': self.user_agent, 'Accept-Encoding': 'gzip'}
+        # Validators only apply to the file we still have
+        if os.path.exists(self.pac_path):
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+        return urllib.request.Request(self.url, headers=headers)
+
+    def update(self, force: bool = False) -> str:
+        """
+        Fetches the PAC file if allowed and activates changed rules
+        Raises urllib.error.URLError/OSError on network errors and ValueError
+        for an empty or undecodable response; the current PAC stays in place.
+        """
+        wait = self.seconds_until_allowed()
+        if wait > 0 and not force:
+            self.log(f"⚠ Next fetch allowed in {wait:.0f}s")
+            return UPDATE_THROTTLED
+
+        self.meta['fetched_at'] = time.time()
+        try:
+            with urllib.request.urlopen(self.build_request(), timeout=self.timeout) as response:
+                body = response.read()
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self.save_meta()
+                self.log("✓ Not modified")
+                return UPDATE_NOT_MODIFIED
+            retry_after = e.headers.get('Retry-After', '') if e.headers else ''
+            delay = parse_retry_after(retry_after, self.meta['fetched_at'])
+            if e.code in (429, 503) and delay is not None:
+                self.meta['retry_at'] = self.meta['fetched_at'] + delay
+            self.save_meta()
+            raise
+
+        if headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        if not body.strip():
+            self.save_meta()
+            raise ValueError("empty PAC response (User-Agent may be banned)")
+
+        validators = {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+        content_hash = hashlib.sha256(body).digest()
+        if os.path.exists(self.pac_path) and file_sha256(self.pac_path) == content_hash:
+            self.meta.update(validators)
+            self.save_meta()
+            self.log("✓ Content unchanged")
+            return UPDATE_UNCHANGED
+
+        self.install(body, content_hash)
+        self.meta.update(validators)
+        self.meta['sha256'] = content_hash.hex()
+        self.save_meta()
+        return UPDATE_UPDATED
+
+    def install(self, body: bytes, content_hash: bytes):
+        """Decodes a downloaded PAC, then swaps file, snapshot and engine"""
+        tmp_path = self.pac_path + '.download'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        try:
+            engine = PacRuleEngine.from_pac_file(tmp_path)
+            os.replace(tmp_path, self.pac_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        try:
+            write_snapshot(engine, snapshot_path(self.pac_path), content_hash)
+        except OSError as e:
+            print(f"⚠ Warning: cannot save rule snapshot: {e}", file=sys.stderr)
+
+        self._engine = engine
+        self.log(f"✓ Updated {self.pac_path} ({len(body):,} bytes)")
+        if self.on_update is not None:
+            self.on_update(engine)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Download a PAC file if it changed and compile its rules")
+    parser.add_argument('url', help="PAC file URL")
+    parser.add_argument('pac_file', help="local PAC file to keep up to date")
+    parser.add_argument('--user-agent', default=DEFAULT_USER_AGENT,
+                        help="User-Agent header (the PAC content depends on it)")
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="minimum seconds between requests (default: 60)")
+    parser.add_argument('--force', action='store_true',
+                        help="ignore the minimum interval")
+    args = parser.parse_args()
+
+    updater = PacUpdater(args.url, args.pac_file, user_agent=args.user_agent,
+                         min_interval=args.min_interval, verbose=True)
+    try:
+        updater.update(force=args.force)
+    except (OSError, ValueError) as e:
+        print(f"✗ Update failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()